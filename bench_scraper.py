@@ -0,0 +1,435 @@
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import datetime, timezone
+from html import escape
+from pathlib import Path
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from get_model import ModelProcessor
+from html_parsers import get_html_parser
+from http_cache import HttpCache
+from http_client import HttpClient
+from standin_server import StandinServer, add_fixture_routes
+
+DEFAULT_FIXTURES_DIR = ".cache/bench_fixtures"
+PARSER_BACKENDS = ("html.parser", "strainer", "lxml")
+
+# 指标名中包含这些后缀时数值越大越好，其余指标（耗时、内存）越小越好
+HIGHER_IS_BETTER = ("pages_per_second",)
+
+
+def _filler(kind, index, size):
+    """生成确定性的填充标记，使合成页面接近真实页面的大小和节点数量"""
+    chunk = (
+        f'<div class="flex items-center space-x-2 text-sm"><a href="/{kind}/{index}" class="hover:underline">'
+        f'<span class="truncate">{kind} {index}</span></a><svg class="h-4 w-4"><path d="M0 0h24v24H0z"/></svg></div>'
+    )
+    return f'<div class="hidden">{chunk * max(1, size // len(chunk))}</div>'
+
+
+def _page(body, kind, index, filler_size):
+    return (
+        f'<!DOCTYPE html><html><head><title>{kind}</title>'
+        f'<script>window.__bench = {index};</script></head><body>'
+        f'{_filler(kind, index, filler_size // 2)}{body}{_filler(kind, index, filler_size // 2)}</body></html>'
+    )
+
+
+def _main_page(models, filler_size):
+    """主页面：下拉列表中的默认模型"""
+    links = "".join(
+        f'<a href="{urlparse(model["url"]).path}"><span title="{escape(model["model"])}">{escape(model["model"])}</span></a>'
+        for model in models if model.get("is_default") and "latest" not in model["model"]
+    )
+    nav = f'<nav id="tags-nav">{links}<a href="/tags">View all</a></nav>'
+    return _page(nav, "main", 0, filler_size)
+
+
+def _tags_page(models, filler_size):
+    """tags 页面：每个标签一行，包含 model_id 和文件大小"""
+    rows = "".join(
+        f'<div class="flex px-4 py-3"><a class="group" href="{urlparse(model["url"]).path}">'
+        f'<div class="break-all">{escape(model["model"])}</div></a>'
+        f'<div class="flex items-baseline space-x-1 text-[13px] text-neutral-500">'
+        f'<span>{model.get("model_id", "")} • {model.get("file_size", "")} • 32K context window</span></div></div>'
+        for model in models
+    )
+    return _page(rows, "tags", 0, filler_size)
+
+
+def _detail_page(model, index, filler_size):
+    """详情页：模型信息区域和描述"""
+    items = "".join(
+        f'<div class="flex sm:space-x-2 items-center"><span class="hidden sm:block">{label}</span>'
+        f'<span class="text-neutral-400">{escape(model.get(label, ""))}</span></div>'
+        for label in ("arch", "parameters", "quantization") if model.get(label)
+    )
+    description = escape(model.get("description", ""))
+    body = (
+        f'<div class="min-w-full divide-y divide-gray-200">{items}</div>'
+        f'<div class="prose dark:prose-invert"><p>{description}</p></div>'
+    )
+    return _page(body, "detail", index, filler_size)
+
+
+def _store_page(cache, url, html):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = html.encode("utf-8")
+    response.encoding = "utf-8"
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    cache.store(url, response)
+
+
+def synthesize_fixtures(config, models_dir, fixtures_dir, filler_kb=40):
+    """
+    根据 config.json 和已抓取的模型 JSON 生成与 ollama.com 结构一致的主页面、tags 页面和详情页，
+    以 HttpCache 格式写入 fixtures_dir，返回生成的页面数
+    """
+    cache = HttpCache(fixtures_dir, ttl_seconds=None, max_size_bytes=0)
+    filler_size = filler_kb * 1024
+    count = 0
+    for model_config in config["models"]:
+        path = Path(models_dir) / model_config["output_file"]
+        if not path.exists():
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            models = json.load(f)
+        tags_url = model_config["tags_url"]
+        _store_page(cache, tags_url.replace("/tags", ""), _main_page(models, filler_size))
+        _store_page(cache, tags_url, _tags_page(models, filler_size))
+        count += 2
+        for index, model in enumerate(models):
+            if model.get("url"):
+                _store_page(cache, model["url"], _detail_page(model, index, filler_size))
+                count += 1
+    return count
+
+
+def record_fixtures(config, fixtures_dir, families=None):
+    """访问 ollama.com 录制配置中各模型家族的主页面、tags 页面和详情页（需要网络），返回录制的页面数"""
+    cache = HttpCache(fixtures_dir, ttl_seconds=None, max_size_bytes=0)
+    processor = ModelProcessor()
+    processor.http_client = HttpClient.from_config(config.get("crawl"), cache=cache)
+    for model_config in _select_families(config, families):
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor.fetch_model_data(model_config)
+        print(f"已录制 {model_config['name']}")
+    return sum(1 for _ in cache.entries())
+
+
+def _select_families(config, families):
+    if not families:
+        return list(config["models"])
+    return [model_config for model_config in config["models"] if model_config["name"] in families]
+
+
+def _summarize(samples):
+    """把一组耗时（秒）汇总为毫秒统计值"""
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[p95_index] * 1000,
+    }
+
+
+def _load_pages(fixtures_dir):
+    """读取 fixtures 中的页面，按类型分组：main、tags、detail"""
+    pages = {"main": [], "tags": [], "detail": []}
+    for url, _, body in HttpCache(fixtures_dir, ttl_seconds=None, max_size_bytes=0).entries():
+        path = urlparse(url).path
+        if path.endswith("/tags"):
+            kind = "tags"
+        elif ":" in path.rsplit("/", 1)[-1]:
+            kind = "detail"
+        else:
+            kind = "main"
+        pages[kind].append((url, body.decode("utf-8", errors="replace")))
+    return pages
+
+
+def bench_throughput(server, pages, workers, client_settings):
+    """并发下载 fixtures 中的所有页面，返回每秒页面数和客户端统计"""
+    client = HttpClient(**client_settings)
+    urls = [f"{server.base_url}{urlparse(url).path}" for kind in pages.values() for url, _ in kind]
+
+    def fetch(url):
+        try:
+            client.get(url).raise_for_status()
+            return True
+        except requests.RequestException:
+            return False
+
+    started_at = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - started_at
+    return {
+        "pages": len(urls),
+        "failed": results.count(False),
+        "seconds": elapsed,
+        "pages_per_second": len(urls) / elapsed if elapsed else 0.0,
+        "retries": client.stats["retries"],
+    }
+
+
+def bench_parsers(pages, backends, repeat):
+    """
+    对每个解析后端测量每类页面的解析耗时；峰值内存在单独的一轮中用 tracemalloc 测量
+    （每类页面取最大的一个），避免 tracemalloc 影响计时
+    """
+    methods = {"main": "default_models", "tags": "tag_rows", "detail": "model_info"}
+    results = {}
+    for backend in backends:
+        parser = get_html_parser(backend)
+        backend_results = {}
+        for kind, method_name in methods.items():
+            method = getattr(parser, method_name)
+            samples = []
+            for _ in range(repeat):
+                for _, html in pages[kind]:
+                    started_at = time.perf_counter()
+                    method(html)
+                    samples.append(time.perf_counter() - started_at)
+            if not samples:
+                continue
+            backend_results[kind] = _summarize(samples)
+
+            largest = max((html for _, html in pages[kind]), key=len)
+            tracemalloc.start()
+            method(largest)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            backend_results[kind]["peak_memory_mb"] = peak / (1024 * 1024)
+        results[backend] = backend_results
+    return results
+
+
+def _bench_processor(server, html_parser, client_settings, concurrency):
+    """创建指向替身服务、不使用磁盘缓存且不限速的 ModelProcessor"""
+    processor = ModelProcessor()
+    processor.config["site_url"] = server.base_url
+    processor.config["html_parser"] = html_parser
+    processor.config.setdefault("crawl", {})["concurrency"] = concurrency
+    processor.config["crawl"]["requests_per_second"] = 0
+    processor.http_cache = None
+    processor.http_client = HttpClient(**client_settings)
+    processor.html_parser = get_html_parser(html_parser)
+    return processor
+
+
+def bench_end_to_end(server, config, families, html_parser, client_settings, concurrency):
+    """测量每个模型家族 fetch_model_data 与 fetch_and_parse_models 的端到端耗时和请求数"""
+    results = {}
+    for model_config in _select_families(config, families):
+        tags_path = urlparse(model_config["tags_url"]).path
+        if tags_path not in server.routes:
+            continue
+        model_config = dict(model_config, tags_url=f"{server.base_url}{tags_path}")
+        model_config.pop("concurrency", None)
+        model_config.pop("requests_per_second", None)
+        family_results = {}
+        for method_name in ("fetch_model_data", "fetch_and_parse_models"):
+            processor = _bench_processor(server, html_parser, client_settings, concurrency)
+            request_count = len(server.requests)
+            started_at = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if method_name == "fetch_model_data":
+                    models = processor.fetch_model_data(model_config)
+                else:
+                    models = processor.fetch_and_parse_models(model_config["tags_url"])
+            family_results[method_name] = {
+                "seconds": time.perf_counter() - started_at,
+                "models": len(models),
+                "requests": len(server.requests) - request_count,
+            }
+        results[model_config["name"]] = family_results
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args):
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    pages = _load_pages(args.fixtures)
+    if not any(pages.values()):
+        raise SystemExit(f"{args.fixtures} 中没有页面，请先运行 synthesize 或 record")
+
+    client_settings = {
+        "pool_size": max(10, args.workers),
+        "max_retries": args.max_retries,
+        "backoff_base": 0.01,
+        "backoff_max": 0.1,
+        "timeout": 10,
+    }
+    server = StandinServer(latency=args.latency, error_rate=args.error_rate)
+    add_fixture_routes(server, args.fixtures)
+    with server:
+        print(f"替身服务: {server.base_url}，页面数: {sum(len(kind) for kind in pages.values())}")
+        throughput = bench_throughput(server, pages, args.workers, client_settings)
+        print(f"下载吞吐: {throughput['pages_per_second']:.1f} 页/秒 (失败 {throughput['failed']}, 重试 {throughput['retries']})")
+        parsers = bench_parsers(pages, args.backends, args.repeat)
+        for backend, backend_results in parsers.items():
+            detail = backend_results.get("detail", {})
+            print(f"解析 {backend}: 详情页平均 {detail.get('mean_ms', 0):.2f} ms, "
+                  f"峰值内存 {detail.get('peak_memory_mb', 0):.1f} MB")
+        end_to_end = bench_end_to_end(
+            server, config, args.families, args.html_parser, client_settings, args.concurrency
+        )
+        for name, family_results in end_to_end.items():
+            print(f"{name}: " + ", ".join(
+                f"{method} {result['seconds']:.2f}s/{result['models']} 个模型"
+                for method, result in family_results.items()
+            ))
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "html_parser": args.html_parser,
+        },
+        "throughput": throughput,
+        "parsers": parsers,
+        "end_to_end": end_to_end,
+    }
+
+
+def flatten_metrics(results):
+    """把结果展开为 {"parsers.lxml.detail.mean_ms": 数值} 形式，供 compare 使用"""
+    metrics = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f"{prefix}.{key}" if prefix else key, child)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[prefix] = float(value)
+
+    for section in ("throughput", "parsers", "end_to_end"):
+        walk(section, results.get(section, {}))
+    return metrics
+
+
+# compare 只检查这些性能指标，计数类字段（页面数、模型数等）不参与回归判断
+COMPARED_SUFFIXES = ("pages_per_second", "mean_ms", "p50_ms", "p95_ms", "seconds", "peak_memory_mb")
+
+
+def compare_results(baseline, current, threshold):
+    """比较两次结果，返回 (指标名, 基准值, 当前值, 变化比例, 是否回归) 列表"""
+    rows = []
+    baseline_metrics = flatten_metrics(baseline)
+    current_metrics = flatten_metrics(current)
+    for name, old in sorted(baseline_metrics.items()):
+        if not name.endswith(COMPARED_SUFFIXES) or name not in current_metrics or not old:
+            continue
+        new = current_metrics[name]
+        change = (new - old) / old
+        if name.endswith(HIGHER_IS_BETTER):
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        rows.append((name, old, new, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    synthesize = subparsers.add_parser("synthesize", help="根据已有模型 JSON 生成离线 fixtures")
+    synthesize.add_argument("--config", default="config.json")
+    synthesize.add_argument("--models-dir", default="modeldata/new")
+    synthesize.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    synthesize.add_argument("--filler-kb", type=int, default=40, help="每个页面附加的填充标记大小（KB）")
+
+    record = subparsers.add_parser("record", help="从 ollama.com 录制 fixtures（需要网络）")
+    record.add_argument("--config", default="config.json")
+    record.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    record.add_argument("--family", dest="families", action="append", help="只录制指定名称的模型家族，可重复")
+
+    run = subparsers.add_parser("run", help="基于 fixtures 和本地替身服务运行基准测试")
+    run.add_argument("--config", default="config.json")
+    run.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    run.add_argument("--family", dest="families", action="append", help="只测量指定名称的模型家族，可重复")
+    run.add_argument("--latency", type=float, default=0.0, help="替身服务每个请求增加的延迟（秒）")
+    run.add_argument("--error-rate", type=float, default=0.0, help="替身服务随机返回 503 的概率")
+    run.add_argument("--workers", type=int, default=8, help="下载吞吐测试的并发数")
+    run.add_argument("--concurrency", type=int, default=4, help="端到端测试中 fetch_model_data 的详情页并发数")
+    run.add_argument("--max-retries", type=int, default=3)
+    run.add_argument("--repeat", type=int, default=1, help="解析测试中每个页面的重复次数")
+    run.add_argument("--backends", nargs="+", default=list(PARSER_BACKENDS), help="参与解析测试的后端")
+    run.add_argument("--html-parser", default="lxml", help="端到端测试使用的解析后端")
+    run.add_argument("--output", help="结果 JSON 文件，默认输出到控制台")
+
+    compare = subparsers.add_parser("compare", help="比较两次结果，存在回归时返回非零退出码")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.2, help="允许的相对变化，默认 0.2 即 20%%")
+
+    args = parser.parse_args()
+
+    if args.command == "synthesize":
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        count = synthesize_fixtures(config, args.models_dir, args.fixtures, args.filler_kb)
+        print(f"已生成 {count} 个页面: {args.fixtures}")
+    elif args.command == "record":
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        count = record_fixtures(config, args.fixtures, args.families)
+        print(f"fixtures 中共有 {count} 个页面: {args.fixtures}")
+    elif args.command == "run":
+        results = run_benchmarks(args)
+        output = json.dumps(results, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+            print(f"结果已写入 {args.output}")
+        else:
+            print(output)
+    elif args.command == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, "r", encoding="utf-8") as f:
+            current = json.load(f)
+        rows = compare_results(baseline, current, args.threshold)
+        print(f"基准 {baseline.get('commit')} -> 当前 {current.get('commit')}")
+        for name, old, new, change, regressed in rows:
+            marker = "  回归" if regressed else ""
+            print(f"{name:<60} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{marker}")
+        regressions = [row for row in rows if row[4]]
+        print(f"共比较 {len(rows)} 项指标，回归 {len(regressions)} 项")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from model_records import ModelRecord, Quantization, records_from_catalog
+
+DEFAULT_CATALOG_PATH = ".cache/catalog.bin"
+
+# 文件头：魔数、格式版本、目录 JSON 长度、源数据 SHA-256
+MAGIC = b"LLMCAT\x00\x01"
+# 版本 2：字符串表按字符串排序，并记录源文件状态
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sII32s")
+ALIGNMENT = 8
+
+STRING_COLUMNS = (
+    "family", "name", "model", "url", "model_id", "file_size_label",
+    "quantization_info", "arch", "size_label", "description",
+)
+# 数值列：名称、dtype、缺失值
+NUMERIC_COLUMNS = (
+    ("file_size", "<i8", -1),
+    ("parameters", "<f8", np.nan),
+    ("size_billions", "<f8", np.nan),
+    ("quantization", "<u1", 0),
+    ("is_default", "<u1", 0),
+)
+QUANTIZATIONS = list(Quantization)
+
+
+class StaleCatalogError(Exception):
+    """编译后的目录与当前 config.json / 模型 JSON 不一致"""
+
+
+def source_files(config_path, models_dir=None):
+    """返回参与编译的源文件：config.json 以及其中配置的、已存在的模型 JSON"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if models_dir is None:
+        models_dir = config.get("output_dirs", {}).get("cleaned", "modeldata/cleaned")
+    paths = [Path(config_path)]
+    for model_config in config["models"]:
+        path = Path(models_dir) / model_config["output_file"]
+        if path.exists():
+            paths.append(path)
+    return config, models_dir, paths
+
+
+def source_stats(config_path, models_dir, config):
+    """
+    config.json 以及其中配置的所有模型 JSON（包括尚不存在的）的 [路径, mtime_ns, 大小]，
+    不存在的文件记为 [路径, None, None]，用于不读取内容就判断源数据是否可能变化
+    """
+    paths = [Path(config_path)] + [Path(models_dir) / model_config["output_file"] for model_config in config["models"]]
+    stats = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            stats.append([str(path), None, None])
+            continue
+        stats.append([str(path), stat.st_mtime_ns, stat.st_size])
+    return stats
+
+
+def source_hash(config_path="config.json", models_dir=None):
+    """对 config.json 和各模型 JSON 的文件名与内容计算 SHA-256，用于判断编译结果是否过期"""
+    _, _, paths = source_files(config_path, models_dir)
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode("utf-8") + b"\x00")
+        digest.update(path.read_bytes())
+        digest.update(b"\x00")
+    return digest.digest()
+
+
+def _pad(buffer):
+    buffer.extend(b"\x00" * (-len(buffer) % ALIGNMENT))
+
+
+def compile_catalog(config_path="config.json", models_dir=None, output_path=DEFAULT_CATALOG_PATH):
+    """
+    把所有模型家族的 JSON 编译为一个列式二进制文件：
+    文件头 + 目录 JSON（各列的 dtype、偏移和长度）+ 按 8 字节对齐的列数据。
+    字符串列存放字符串表中的 uint32 下标，字符串表由偏移数组和 UTF-8 正文组成。
+    返回编译的模型数
+    """
+    config, models_dir, paths = source_files(config_path, models_dir)
+    # 先记录文件状态再读取内容：编译期间被修改的文件在下次打开时状态不一致，会重新计算哈希
+    stats = source_stats(config_path, models_dir, config)
+    digest = source_hash(config_path, models_dir)
+    catalog = []
+    for model_config in config["models"]:
+        path = Path(models_dir) / model_config["output_file"]
+        if path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                catalog.append((model_config, json.load(f)))
+    records = records_from_catalog(catalog)
+
+    # 字符串表按字符串排序，下标的大小关系与字符串一致，读取方不解码也能按字符串列排序
+    strings = sorted({getattr(record, name) or "" for name in STRING_COLUMNS for record in records})
+    string_ids = {text: i for i, text in enumerate(strings)}
+
+    columns = {}
+    for name in STRING_COLUMNS:
+        columns[name] = np.array([string_ids[getattr(record, name) or ""] for record in records], dtype="<u4")
+    quantization_ids = {quantization: i for i, quantization in enumerate(QUANTIZATIONS)}
+    for name, dtype, missing in NUMERIC_COLUMNS:
+        if name == "quantization":
+            values = [quantization_ids[record.quantization] for record in records]
+        else:
+            values = [missing if getattr(record, name) is None else getattr(record, name) for record in records]
+        columns[name] = np.array(values, dtype=dtype)
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    string_offsets[1:] = np.cumsum([len(data) for data in encoded])
+    columns["_string_offsets"] = string_offsets
+    string_data = b"".join(encoded)
+
+    body = bytearray()
+    directory = {
+        "rows": len(records),
+        "quantizations": [q.value for q in QUANTIZATIONS],
+        "sources": {"config_path": str(config_path), "models_dir": str(models_dir), "files": stats},
+        "columns": {},
+    }
+    for name, array in columns.items():
+        _pad(body)
+        directory["columns"][name] = {"dtype": array.dtype.str, "offset": len(body), "length": len(array)}
+        body.extend(array.tobytes())
+    _pad(body)
+    directory["string_data"] = {"offset": len(body), "length": len(string_data)}
+    body.extend(string_data)
+
+    directory_bytes = json.dumps(directory, separators=(",", ":")).encode("utf-8")
+    directory_bytes += b" " * (-(HEADER.size + len(directory_bytes)) % ALIGNMENT)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(directory_bytes), digest))
+        f.write(directory_bytes)
+        f.write(body)
+    os.replace(tmp_path, output_path)
+    return len(records)
+
+
+class CompiledCatalog:
+    """
+    以内存映射方式读取 compile_catalog 生成的文件。数值列是直接指向映射内存的 NumPy 数组（零拷贝），
+    字符串在访问时才解码
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, directory_length, self.source_hash = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} 不是有效的编译目录文件")
+        if version != FORMAT_VERSION:
+            raise StaleCatalogError(f"{self.path} 的格式版本为 {version}，当前版本为 {FORMAT_VERSION}")
+        directory_start = HEADER.size
+        body_start = directory_start + directory_length
+        directory = json.loads(self.mmap[directory_start:body_start])
+        self.rows = directory["rows"]
+        self.sources = directory["sources"]
+        self.quantizations = [Quantization(value) for value in directory["quantizations"]]
+
+        self._buffer = buffer = memoryview(self.mmap)
+        self.columns = {}
+        for name, column in directory["columns"].items():
+            self.columns[name] = np.frombuffer(
+                buffer, dtype=column["dtype"], count=column["length"], offset=body_start + column["offset"]
+            )
+        string_data = directory["string_data"]
+        self._string_data = buffer[body_start + string_data["offset"]:
+                                   body_start + string_data["offset"] + string_data["length"]]
+        self._string_offsets = self.columns.pop("_string_offsets")
+        self._strings = {}
+
+    def __len__(self):
+        return self.rows
+
+    def string(self, string_id):
+        """按下标读取字符串表中的字符串，解码结果会被缓存"""
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = self._string_offsets[string_id:string_id + 2].tolist()
+            text = str(self._string_data[start:end], "utf-8")
+            self._strings[string_id] = text
+        return text
+
+    def codes(self, name):
+        """
+        字符串列的紧凑编码：返回 (codes, values)，values 为该列出现过的不同字符串（已排序），
+        codes[i] 为第 i 行在 values 中的下标。只解码不同的字符串，不逐行生成 Python 对象
+        """
+        string_ids, codes = np.unique(self.columns[name], return_inverse=True)
+        return codes, [self.string(string_id) for string_id in string_ids.tolist()]
+
+    def column(self, name):
+        """返回数值列（NumPy 数组），或字符串列解码后的列表"""
+        if name in STRING_COLUMNS:
+            return [self.string(int(string_id)) for string_id in self.columns[name]]
+        return self.columns[name]
+
+    def record(self, i):
+        """第 i 行对应的 ModelRecord"""
+        values = {name: self.string(int(self.columns[name][i])) for name in STRING_COLUMNS}
+        file_size = int(self.columns["file_size"][i])
+        parameters = float(self.columns["parameters"][i])
+        size_billions = float(self.columns["size_billions"][i])
+        return ModelRecord(
+            file_size=None if file_size < 0 else file_size,
+            parameters=None if np.isnan(parameters) else parameters,
+            size_billions=None if np.isnan(size_billions) else size_billions,
+            quantization=self.quantizations[self.columns["quantization"][i]],
+            is_default=bool(self.columns["is_default"][i]),
+            **values,
+        )
+
+    def records(self):
+        """一次性转换所有行，按列批量读取，比逐行调用 record() 快"""
+        strings = {name: [self.string(string_id) for string_id in self.columns[name].tolist()] for name in STRING_COLUMNS}
+        file_sizes = self.columns["file_size"].tolist()
+        parameters = self.columns["parameters"].tolist()
+        size_billions = self.columns["size_billions"].tolist()
+        quantizations = self.columns["quantization"].tolist()
+        is_default = self.columns["is_default"].tolist()
+        return [
+            ModelRecord(
+                file_size=None if file_sizes[i] < 0 else file_sizes[i],
+                parameters=None if parameters[i] != parameters[i] else parameters[i],
+                size_billions=None if size_billions[i] != size_billions[i] else size_billions[i],
+                quantization=self.quantizations[quantizations[i]],
+                is_default=bool(is_default[i]),
+                **{name: strings[name][i] for name in STRING_COLUMNS},
+            )
+            for i in range(self.rows)
+        ]
+
+    def sources_unchanged(self, config_path="config.json", models_dir=None):
+        """
+        编译时记录的每个源文件的 (mtime_ns, 大小) 与当前一致时返回 True，只调用 stat，不读取文件内容。
+        路径参数与编译时不同时返回 False
+        """
+        if str(config_path) != self.sources["config_path"]:
+            return False
+        if models_dir is not None and str(models_dir) != self.sources["models_dir"]:
+            return False
+        for path, mtime_ns, size in self.sources["files"]:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if mtime_ns is not None:
+                    return False
+                continue
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return False
+        return True
+
+    def is_stale(self, config_path="config.json", models_dir=None):
+        """源数据与编译时不一致时返回 True：先比较文件状态，不一致时才重新计算内容哈希"""
+        if self.sources_unchanged(config_path, models_dir):
+            return False
+        return source_hash(config_path, models_dir) != self.source_hash
+
+    def close(self):
+        """释放映射；调用方仍持有列数组时映射会在数组释放后由垃圾回收关闭"""
+        self.columns = {}
+        self._string_offsets = None
+        self._string_data = None
+        self._buffer = None
+        try:
+            self.mmap.close()
+        except BufferError:
+            pass
+
+
+def open_catalog(config_path="config.json", models_dir=None, path=DEFAULT_CATALOG_PATH, rebuild=True):
+    """
+    打开编译后的目录文件，不存在或源数据已变化时：rebuild 为 True 则重新编译，
+    否则抛出 StaleCatalogError。源文件状态未变时只需 stat，不读取源文件；
+    状态变化但内容哈希相同（例如抓取后原样重写）时，rebuild 为 True 则重新编译以更新记录的文件状态
+    """
+    if Path(path).exists():
+        try:
+            catalog = CompiledCatalog(path)
+        except StaleCatalogError:
+            if not rebuild:
+                raise
+        else:
+            if catalog.sources_unchanged(config_path, models_dir):
+                return catalog
+            if source_hash(config_path, models_dir) == catalog.source_hash and not rebuild:
+                return catalog
+            catalog.close()
+            if not rebuild:
+                raise StaleCatalogError(f"{path} 已过期，请重新运行 catalog_compiler.py")
+    elif not rebuild:
+        raise StaleCatalogError(f"{path} 不存在，请先运行 catalog_compiler.py")
+    compile_catalog(config_path, models_dir, path)
+    return CompiledCatalog(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把模型 JSON 编译为单个可内存映射的目录文件")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--output", default=DEFAULT_CATALOG_PATH)
+    parser.add_argument("--check", action="store_true", help="只检查编译结果是否过期，过期时返回非零退出码")
+    args = parser.parse_args()
+
+    if args.check:
+        if not Path(args.output).exists():
+            print(f"{args.output} 不存在")
+            raise SystemExit(1)
+        try:
+            catalog = CompiledCatalog(args.output)
+        except StaleCatalogError as e:
+            print(e)
+            raise SystemExit(1)
+        stale = catalog.is_stale(args.config, args.models_dir)
+        print(f"{args.output}: {len(catalog)} 个模型，{'已过期' if stale else '最新'}")
+        raise SystemExit(1 if stale else 0)
+
+    count = compile_catalog(args.config, args.models_dir, args.output)
+    print(f"已编译 {count} 个模型: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import argparse
+from bisect import bisect_right
+
+import numpy as np
+
+from catalog_compiler import DEFAULT_CATALOG_PATH, open_catalog
+from model_records import load_architectures, load_records
+from throughput_predictor import GPU_SPECS, ThroughputPredictor
+from vram_estimator import VramEstimator
+
+# 本模块只依赖 catalog_compiler / model_records / vram_estimator / throughput_predictor（NumPy），
+# 查询时不会导入 requests 或 bs4
+
+
+class CatalogIndex:
+    """
+    按估算显存排序的模型目录索引。构造时为给定的上下文长度和批大小估算每个模型的显存，
+    并按 family、size_label、quantization 以及三者组合分别建立有序子索引，
+    预算查询通过 bisect 在 O(log n) 时间内找到边界。architectures 为 {model_id: GGUF 架构字段}，
+    from_catalog / from_compiled 默认读取 gguf_reader.py 生成的文件。
+    索引内部只保存行号和按列编码的键，查询结果中的 ModelRecord 在返回时才按行号取得。
+    模型家族不区分大小写（与 search_index.py 一致），尺寸标签和量化按大写匹配
+    """
+
+    def __init__(self, records, context_length=8192, batch_size=1, kv_cache_bits=16, web=False, architectures=None):
+        columns = {
+            "name": [record.name for record in records],
+            "family": [record.family for record in records],
+            "size_label": [record.size_label for record in records],
+            "quantization": [record.quantization.value for record in records],
+        }
+        codes = {}
+        values = {}
+        for field, column in columns.items():
+            codes[field], values[field] = _encode(column, np.arange(len(column)))
+        self._build(VramEstimator(records, architectures), codes, values, records.__getitem__,
+                    context_length, batch_size, kv_cache_bits, web, architectures)
+
+    def _build(self, estimator, codes, values, record_at, context_length, batch_size, kv_cache_bits, web,
+               architectures):
+        """
+        codes[field] 为每行在 values[field]（按字符串排序的不同取值）中的下标，field 为
+        family、size_label 和 quantization；codes["name"] 只需与名称的大小顺序一致。
+        record_at(行号) 返回该行的 ModelRecord
+        """
+        self.context_length = context_length
+        self.batch_size = batch_size
+        self.kv_cache_bits = kv_cache_bits
+        self.web = web
+        self.architectures = architectures
+        self.estimator = estimator
+        self.throughput = {}
+        self._record_at = record_at
+        self._records = {}
+        if web:
+            vram = estimator.web_estimate()
+        else:
+            vram = estimator.estimate([context_length], [batch_size], kv_cache_bits=kv_cache_bits)["total"][:, 0, 0]
+
+        # 按 (显存, 名称) 排序
+        # 模型家族按小写建立子索引，查询时同样转换为小写
+        families = sorted({family.lower() for family in values["family"]})
+        family_lookup = {family: i for i, family in enumerate(families)}
+        family_codes = np.array([family_lookup[family.lower()] for family in values["family"]], dtype=np.int64)
+        codes = {**codes, "family": family_codes[codes["family"]]}
+        values = {**values, "family": families}
+
+        self.order = np.lexsort((codes["name"], vram))
+        self.rows = self.order.tolist()
+        sorted_vram = vram[self.order]
+        self.vram = sorted_vram.tolist()
+
+        # 每个子索引为 {键: (显存列表, 行号列表)}，两者按显存升序排列；按键稳定排序后分组，保持显存顺序。
+        # keys 为逐条检查条件时使用的每行编码，key_lookup 把条件值转换为编码
+        self.keys = {}
+        self.key_lookup = {}
+        self.indexes = {}
+        key_codes = {}
+        for field in ("family", "size_label", "quantization"):
+            self.keys[field] = codes[field].tolist()
+            self.key_lookup[field] = {value: i for i, value in enumerate(values[field])}
+            key_codes[field] = codes[field]
+        sizes = {field: len(values[field]) for field in key_codes}
+        key_codes["key"] = (key_codes["family"] * sizes["size_label"] + key_codes["size_label"]) \
+            * sizes["quantization"] + key_codes["quantization"]
+        for field, field_codes in key_codes.items():
+            sorted_codes = field_codes[self.order]
+            grouping = np.argsort(sorted_codes, kind="stable")
+            group_codes, starts = np.unique(sorted_codes[grouping], return_index=True)
+            bounds = starts.tolist() + [len(grouping)]
+            index = {}
+            for i, code in enumerate(group_codes.tolist()):
+                members = grouping[bounds[i]:bounds[i + 1]]
+                index[self._decode_key(field, code, values, sizes)] = (
+                    sorted_vram[members].tolist(), self.order[members].tolist()
+                )
+            self.indexes[field] = index
+
+    @staticmethod
+    def _decode_key(field, code, values, sizes):
+        if field != "key":
+            return values[field][code]
+        code, quantization = divmod(code, sizes["quantization"])
+        family, size_label = divmod(code, sizes["size_label"])
+        return values["family"][family], values["size_label"][size_label], values["quantization"][quantization]
+
+    @classmethod
+    def from_catalog(cls, config_path="config.json", models_dir=None, **kwargs):
+        """直接读取各模型家族的 JSON 建立索引"""
+        kwargs.setdefault("architectures", load_architectures())
+        return cls(load_records(config_path, models_dir), **kwargs)
+
+    @classmethod
+    def from_compiled(cls, config_path="config.json", models_dir=None, path=DEFAULT_CATALOG_PATH,
+                      context_length=8192, batch_size=1, kv_cache_bits=16, web=False, architectures=None):
+        """
+        从编译后的目录文件建立索引，文件不存在或已过期时自动重新编译。
+        直接读取列数据，不为每行生成 ModelRecord；映射在索引存续期间保持打开，查询结果按行号读取记录
+        """
+        if architectures is None:
+            architectures = load_architectures()
+        catalog = open_catalog(config_path, models_dir, path)
+        # 字符串表按字符串排序，名称列的字符串下标可以直接用于排序，不需要解码
+        codes = {"name": catalog.columns["name"]}
+        values = {}
+        for field in ("family", "size_label"):
+            codes[field], values[field] = catalog.codes(field)
+        codes["quantization"], values["quantization"] = _encode(
+            [quantization.value for quantization in catalog.quantizations], catalog.columns["quantization"]
+        )
+        index = cls.__new__(cls)
+        index.catalog = catalog
+        index._build(VramEstimator.from_compiled(catalog, architectures), codes, values, catalog.record,
+                     context_length, batch_size, kv_cache_bits, web, architectures)
+        return index
+
+    def __len__(self):
+        return len(self.rows)
+
+    def record(self, row):
+        """行号对应的 ModelRecord，每行只生成一次"""
+        record = self._records.get(row)
+        if record is None:
+            record = self._records[row] = self._record_at(row)
+        return record
+
+    @property
+    def records(self):
+        """按估算显存升序排列的全部记录"""
+        return [self.record(row) for row in self.rows]
+
+    def _select(self, family=None, size_label=None, quantization=None):
+        """返回满足条件的最小有序子索引，以及仍需逐条检查的条件"""
+        if family is not None and size_label is not None and quantization is not None:
+            return self.indexes["key"].get((family, size_label, quantization), ([], [])), {}
+        filters = {"family": family, "size_label": size_label, "quantization": quantization}
+        filters = {field: value for field, value in filters.items() if value is not None}
+        if not filters:
+            return (self.vram, self.rows), {}
+        field = min(filters, key=lambda name: len(self.indexes[name].get(filters[name], ((), ()))[0]))
+        selected = self.indexes[field].get(filters.pop(field), ([], []))
+        return selected, filters
+
+    def _fit_rows(self, budget_gb, family=None, size_label=None, quantization=None):
+        """fits() 的行号版本，返回 [(行号, 显存)]"""
+        if family is not None:
+            family = family.lower()
+        if size_label is not None:
+            size_label = size_label.upper()
+        if quantization is not None:
+            quantization = quantization.upper()
+        (values, rows), filters = self._select(family, size_label, quantization)
+        if not values:
+            return []
+        end = bisect_right(values, budget_gb)
+        checks = [(self.keys[field], self.key_lookup[field].get(expected)) for field, expected in filters.items()]
+        return [
+            (row, value) for row, value in zip(rows[:end], values[:end])
+            if all(keys[row] == code for keys, code in checks)
+        ]
+
+    def fits(self, budget_gb, family=None, size_label=None, quantization=None):
+        """
+        返回估算显存不超过 budget_gb 的 (记录, 显存) 列表，按显存升序；三个条件都不区分大小写：
+        family 为模型家族，quantization 为量化名称（例如 "Q4_K_M"），size_label 为尺寸标签（例如 "7B"）
+        """
+        return [(self.record(row), value) for row, value in self._fit_rows(budget_gb, family, size_label, quantization)]
+
+    def count_fits(self, budget_gb):
+        """不加筛选条件时，显存不超过 budget_gb 的模型数量"""
+        return bisect_right(self.vram, budget_gb)
+
+    def fits_many(self, budgets_gb, **filters):
+        """批量查询多个显存预算，返回 {预算: fits() 的结果}"""
+        return {budget: self.fits(budget, **filters) for budget in budgets_gb}
+
+    def largest_fit(self, budget_gb, **filters):
+        """返回预算内估算显存最大的模型 (记录, 显存)，没有时返回 None"""
+        matches = self.fits(budget_gb, **filters)
+        return matches[-1] if matches else None
+
+    def predict_throughput(self, gpu):
+        """
+        按索引的上下文长度和批大小估算所有模型在 gpu 上的速度，返回 {行号: {指标: 数值}}；
+        结果按 GPU 缓存
+        """
+        key = gpu if isinstance(gpu, str) else tuple(sorted(gpu.items()))
+        if key not in self.throughput:
+            predictor = ThroughputPredictor(self.estimator)
+            result = predictor.predict(gpu, [self.context_length], [self.batch_size], kv_cache_bits=self.kv_cache_bits)
+            columns = {name: values[:, 0, 0].tolist() for name, values in result.items()}
+            self.throughput[key] = {
+                row: {name: values[row] for name, values in columns.items()} for row in range(len(self.rows))
+            }
+        return self.throughput[key]
+
+    def rank_by_throughput(self, budget_gb, gpu, metric="decode_tokens_per_second_per_gb", **filters):
+        """
+        返回预算内的模型，按 gpu 上的速度指标从高到低排序，元素为 (记录, 显存, 速度指标字典)；
+        metric 可以是 ThroughputPredictor.predict 返回的任一指标（ttft_seconds 按从低到高排序）
+        """
+        throughput = self.predict_throughput(gpu)
+        ranked = [(row, value, throughput[row]) for row, value in self._fit_rows(budget_gb, **filters)]
+        ranked.sort(key=lambda item: item[2][metric], reverse=metric != "ttft_seconds")
+        return [(self.record(row), value, speed) for row, value, speed in ranked]
+
+
+def _encode(values, indices):
+    """把取值列表 values 按字符串排序编码，返回 (indices 对应的编码数组, 排序后的不同取值)"""
+    distinct = sorted(set(values))
+    lookup = {value: i for i, value in enumerate(distinct)}
+    return np.array([lookup[value] for value in values], dtype=np.int64)[indices], distinct
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询指定显存预算内可以运行的模型")
+    parser.add_argument("budgets", type=float, nargs="+", help="显存预算（GB），可指定多个")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--context", type=int, default=8192, help="上下文长度")
+    parser.add_argument("--batch", type=int, default=1, help="批大小")
+    parser.add_argument("--kv-bits", type=int, default=16, help="KV cache 每个元素的位数")
+    parser.add_argument("--web", action="store_true", help="使用网页计算器的估算方式（忽略上下文长度和批大小）")
+    parser.add_argument("--family", help="模型家族名称，例如 \"qwen 2.5\"")
+    parser.add_argument("--size", dest="size_label", help="尺寸标签，例如 7B")
+    parser.add_argument("--quant", dest="quantization", help="量化，例如 Q4_K_M")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH, help="编译后的目录文件，过期时自动重新编译")
+    parser.add_argument("--json", action="store_true", help="不使用编译后的目录文件，直接读取模型 JSON")
+    parser.add_argument("--gpu", help=f"按该 GPU 上每 GB 显存的生成速度排序: {', '.join(GPU_SPECS)}")
+    parser.add_argument("--limit", type=int, default=20, help="每个预算最多显示的模型数（显存从大到小），0 表示全部")
+    args = parser.parse_args()
+
+    settings = {"context_length": args.context, "batch_size": args.batch, "kv_cache_bits": args.kv_bits, "web": args.web}
+    if args.json:
+        index = CatalogIndex.from_catalog(args.config, args.models_dir, **settings)
+    else:
+        index = CatalogIndex.from_compiled(args.config, args.models_dir, args.catalog, **settings)
+    filters = {"family": args.family, "size_label": args.size_label, "quantization": args.quantization}
+    mode = "网页计算器" if args.web else f"上下文 {args.context}, 批大小 {args.batch}"
+    if args.gpu:
+        if args.gpu not in GPU_SPECS:
+            parser.error(f"未知的 GPU: {args.gpu}")
+        for budget in args.budgets:
+            ranked = index.rank_by_throughput(budget, args.gpu, **filters)
+            print(f"\n{budget:g} GB 以内 ({mode}, {args.gpu}): {len(ranked)} 个模型，按每 GB 生成速度排序")
+            for record, value, speed in ranked[:args.limit or None]:
+                print(f"  {record.name:<48} {value:8.2f} GB  {speed['decode_tokens_per_second']:8.1f} tok/s  "
+                      f"{speed['decode_tokens_per_second_per_gb']:6.2f} tok/s/GB")
+        return
+
+    results = index.fits_many(args.budgets, **filters)
+    for budget, matches in results.items():
+        print(f"\n{budget:g} GB 以内 ({mode}): {len(matches)} 个模型")
+        shown = matches[::-1] if not args.limit else matches[::-1][:args.limit]
+        for record, value in shown:
+            print(f"  {record.name:<48} {record.quantization.value or '-':<8} {record.file_size_label:>7}  {value:8.2f} GB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,677 @@
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from catalog_compiler import DEFAULT_CATALOG_PATH, open_catalog, source_files
+from catalog_index import CatalogIndex
+from crawl_metrics import setup_logging
+from model_records import DEFAULT_ARCHITECTURES_PATH, load_architectures
+from search_index import DEFAULT_INDEX_PATH, open_index
+from throughput_predictor import GPU_SPECS
+from vram_estimator import VramEstimator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8090
+# 响应缓存的最大条目数，0 表示不缓存
+DEFAULT_CACHE_SIZE = 4096
+# 按 (上下文长度, 批大小, KV 位数, 网页模式) 缓存的 CatalogIndex 数量
+MAX_INDEXES = 16
+# 检查模型 JSON 是否变化的间隔（秒）
+CHECK_INTERVAL_SECONDS = 2.0
+# 请求体和批量估算的规模上限
+MAX_BODY_BYTES = 1024 * 1024
+MAX_ESTIMATE_MODELS = 1000
+MAX_ESTIMATE_CELLS = 256
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """以指定状态码和错误信息返回给客户端的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LruCache:
+    """按最近使用顺序淘汰的响应缓存，max_entries 为 0 时不缓存"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.max_entries:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+
+class CatalogSnapshot:
+    """某一时刻的模型目录：记录列表、按名称和 model_id 的索引、全文搜索索引，以及按估算设置缓存的 CatalogIndex"""
+
+    def __init__(self, records, architectures, signature, generation, search_index=None):
+        self.records = records
+        self.architectures = architectures
+        self.search_index = search_index
+        self.signature = signature
+        self.generation = generation
+        self.loaded_at = time.time()
+        self.by_name = {record.name: record for record in records}
+        self.sorted_names = sorted(self.by_name)
+        self.by_model_id = {}
+        for record in records:
+            self.by_model_id.setdefault(record.model_id, []).append(record)
+        self.indexes = OrderedDict()
+        # 索引可能在线程池中建立，与事件循环线程同时访问 indexes
+        self.lock = threading.Lock()
+
+    def has_index(self, context_length, batch_size, kv_cache_bits, web):
+        with self.lock:
+            return (context_length, batch_size, kv_cache_bits, web) in self.indexes
+
+    def index(self, context_length, batch_size, kv_cache_bits, web):
+        key = (context_length, batch_size, kv_cache_bits, web)
+        with self.lock:
+            index = self.indexes.get(key)
+            if index is not None:
+                self.indexes.move_to_end(key)
+                return index
+        index = CatalogIndex(self.records, context_length, batch_size, kv_cache_bits, web, self.architectures)
+        with self.lock:
+            index = self.indexes.setdefault(key, index)
+            self.indexes.move_to_end(key)
+            while len(self.indexes) > MAX_INDEXES:
+                self.indexes.popitem(last=False)
+        return index
+
+    def suggestions(self, name, limit=5):
+        """与 name 同一仓库（冒号之前相同）的模型名称，用于 404 提示"""
+        prefix = name[:name.index(":") + 1] if ":" in name else name
+        start = bisect_left(self.sorted_names, prefix)
+        return [candidate for candidate in self.sorted_names[start:start + limit] if candidate.startswith(prefix)]
+
+
+class CatalogService:
+    """
+    模型目录查询服务：启动时从编译后的目录文件加载全部记录，在内存中建立索引；
+    响应按快照版本和规范化后的查询缓存（LRU），后台任务每隔 check_interval 秒比较模型 JSON 的修改时间和大小，
+    变化时在线程池中重新加载并清空缓存，加载期间继续使用旧数据响应请求
+    """
+
+    def __init__(self, config_path="config.json", models_dir=None, catalog_path=DEFAULT_CATALOG_PATH,
+                 architectures_path=DEFAULT_ARCHITECTURES_PATH, cache_size=DEFAULT_CACHE_SIZE,
+                 check_interval=CHECK_INTERVAL_SECONDS, search_index_path=DEFAULT_INDEX_PATH):
+        self.config_path = config_path
+        self.models_dir = models_dir
+        self.catalog_path = catalog_path
+        self.search_index_path = search_index_path
+        self.architectures_path = architectures_path
+        self.check_interval = check_interval
+        self.cache = LruCache(cache_size)
+        self.stats = {"requests": 0, "errors": 0, "reloads": 0}
+        self.generation = 0
+        self.snapshot = self._load()
+
+    def _signature(self):
+        _, _, paths = source_files(self.config_path, self.models_dir)
+        signature = []
+        if self.architectures_path:
+            paths = paths + [Path(self.architectures_path)]
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self):
+        """读取目录（编译文件过期时自动重新编译）并生成新的快照"""
+        signature = self._signature()
+        catalog = open_catalog(self.config_path, self.models_dir, self.catalog_path)
+        try:
+            records = catalog.records()
+        finally:
+            catalog.close()
+        architectures = load_architectures(self.architectures_path) if self.architectures_path else {}
+        search_index = open_index(self.config_path, self.models_dir, self.search_index_path)
+        self.generation += 1
+        return CatalogSnapshot(records, architectures, signature, self.generation, search_index)
+
+    async def watch(self):
+        """后台检查源文件变化，变化时重新加载"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                if self._signature() == self.snapshot.signature:
+                    continue
+                snapshot = await loop.run_in_executor(None, self._load)
+            except Exception as e:
+                logger.exception(f"重新加载模型目录失败: {e}")
+                continue
+            self.snapshot = snapshot
+            self.cache.clear()
+            self.stats["reloads"] += 1
+            logger.info(f"模型目录已重新加载: {len(snapshot.records)} 个模型（第 {snapshot.generation} 版）")
+
+    # ---- 请求处理 ----
+
+    async def handle(self, method, target, body=b""):
+        """
+        处理一个请求，返回 (状态码, 响应正文 bytes, 是否命中缓存)。
+        耗时的工作（建立新的 CatalogIndex、批量估算）在线程池中执行，不阻塞其他连接
+        """
+        self.stats["requests"] += 1
+        snapshot = self.snapshot
+        try:
+            path, params = _parse_target(target)
+            routes = {
+                "/lookup": ("GET", self.lookup),
+                "/fit": ("GET", self.fit),
+                "/search": ("GET", self.search),
+                "/estimate": ("POST", self.estimate),
+                "/health": ("GET", self.health),
+                "/stats": ("GET", self.service_stats),
+            }
+            if path not in routes:
+                raise HttpError(404, f"未知的路径 {path}")
+            expected, handler = routes[path]
+            if method != expected:
+                raise HttpError(405, f"{path} 只支持 {expected}")
+            if path in ("/health", "/stats"):
+                return 200, _json_bytes(handler()), False
+
+            if method == "POST":
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    raise HttpError(400, "请求体不是有效的 JSON")
+                query = _normalize_estimate(payload)
+                key = (snapshot.generation, path, json.dumps(query, sort_keys=True))
+            else:
+                query = _normalize_query(path, params)
+                key = (snapshot.generation, path, tuple(sorted(query.items())))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return 200, cached, True
+            blocking = path == "/estimate" or (path == "/fit" and not snapshot.has_index(
+                query["context"], query["batch"], query["kv_bits"], query["web"]))
+            if blocking:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(None, lambda: _json_bytes(handler(query)))
+            else:
+                response = _json_bytes(handler(query))
+            # 在线程池中计算期间 watch() 可能已换上新快照并清空缓存，此时结果可能来自旧数据，不写入缓存
+            if self.snapshot is snapshot:
+                self.cache.put(key, response)
+            return 200, response, False
+        except HttpError as e:
+            self.stats["errors"] += 1
+            return e.status, _json_bytes({"error": str(e)}), False
+        except Exception as e:
+            self.stats["errors"] += 1
+            return 500, _json_bytes({"error": f"{e.__class__.__name__}: {e}"}), False
+
+    def lookup(self, query):
+        """按 name 或 model_id 查找模型，并给出指定上下文长度和批大小下的显存估算"""
+        snapshot = self.snapshot
+        if "name" in query:
+            record = snapshot.by_name.get(query["name"])
+            if record is None:
+                raise HttpError(404, f"没有模型 {query['name']}，相近的名称: {', '.join(snapshot.suggestions(query['name'])) or '无'}")
+            records = [record]
+        elif "model_id" in query:
+            records = snapshot.by_model_id.get(query["model_id"])
+            if not records:
+                raise HttpError(404, f"没有 model_id 为 {query['model_id']} 的模型")
+        else:
+            raise HttpError(400, "需要 name 或 model_id 参数")
+        estimate = VramEstimator(records, snapshot.architectures).estimate(
+            [query["context"]], [query["batch"]], kv_cache_bits=query["kv_bits"]
+        )
+        results = []
+        for i, record in enumerate(records):
+            data = record.to_dict()
+            data["estimate"] = {name: _round(values[i].item(0)) for name, values in estimate.items()}
+            results.append(data)
+        return {"context": query["context"], "batch": query["batch"], "models": results}
+
+    def fit(self, query):
+        """显存预算内的模型（显存从大到小），指定 gpu 时按每 GB 显存的生成速度排序"""
+        if "budget" not in query:
+            raise HttpError(400, "需要 budget 参数（GB）")
+        index = self.snapshot.index(query["context"], query["batch"], query["kv_bits"], query["web"])
+        filters = {"family": query.get("family"), "size_label": query.get("size"),
+                   "quantization": query.get("quant")}
+        limit = query["limit"] or None
+        if "gpu" in query:
+            ranked = index.rank_by_throughput(query["budget"], query["gpu"], **filters)
+            models = [
+                {"name": record.name, "quantization": record.quantization.value, "vram_gb": _round(value),
+                 "decode_tokens_per_second": _round(speed["decode_tokens_per_second"]),
+                 "decode_tokens_per_second_per_gb": _round(speed["decode_tokens_per_second_per_gb"])}
+                for record, value, speed in ranked[:limit]
+            ]
+            count = len(ranked)
+        else:
+            matches = index.fits(query["budget"], **filters)
+            models = [
+                {"name": record.name, "quantization": record.quantization.value,
+                 "file_size": record.file_size_label, "vram_gb": _round(value)}
+                for record, value in matches[::-1][:limit]
+            ]
+            count = len(matches)
+        return {"budget": query["budget"], "context": query["context"], "batch": query["batch"],
+                "count": count, "models": models}
+
+    def search(self, query):
+        """按名称、arch、量化和中英文描述搜索模型（前缀和模糊匹配），可按家族、量化和尺寸过滤"""
+        results = self.snapshot.search_index.search(
+            query["q"], limit=query["limit"] or None, prefix=not query["exact"], fuzzy=not query["exact"],
+            family=query.get("family"), quantization=query.get("quant"),
+            min_size=query.get("min_size"), max_size=query.get("max_size"),
+        )
+        return {"q": query["q"], "count": len(results), "models": results}
+
+    def estimate(self, query):
+        """批量估算：models × contexts × batches，返回每个模型的二维数组（上下文 × 批大小）"""
+        snapshot = self.snapshot
+        records = [snapshot.by_name[name] for name in query["models"] if name in snapshot.by_name]
+        missing = [name for name in query["models"] if name not in snapshot.by_name]
+        results = []
+        if records:
+            estimate = VramEstimator(records, snapshot.architectures).estimate(
+                query["contexts"], query["batches"], kv_cache_bits=query["kv_bits"]
+            )
+            for i, record in enumerate(records):
+                results.append({
+                    "name": record.name,
+                    "weights": _round(estimate["weights"][i].item(0)),
+                    "web": _round(estimate["web"][i].item(0)),
+                    "kv_cache": _round_grid(estimate["kv_cache"][i]),
+                    "total": _round_grid(estimate["total"][i]),
+                })
+        return {"contexts": query["contexts"], "batches": query["batches"], "kv_bits": query["kv_bits"],
+                "models": results, "missing": missing}
+
+    def health(self):
+        return {"status": "ok", "models": len(self.snapshot.records), "generation": self.snapshot.generation}
+
+    def service_stats(self):
+        return {**self.stats, "cache": self.cache.stats(), "models": len(self.snapshot.records),
+                "generation": self.snapshot.generation, "indexes": len(self.snapshot.indexes),
+                "loaded_at": self.snapshot.loaded_at}
+
+    # ---- HTTP ----
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """启动 HTTP 服务和后台重新加载任务，返回 asyncio.Server"""
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self.watch_task = asyncio.get_running_loop().create_task(self.watch())
+        return server
+
+    async def _handle_connection(self, reader, writer):
+        """HTTP/1.1 长连接：按顺序处理同一连接上的多个请求"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await _write_response(writer, 400, _json_bytes({"error": "无效的请求行"}), False, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if length > MAX_BODY_BYTES:
+                    await _write_response(writer, 413, _json_bytes({"error": "请求体过大"}), False, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, response, hit = await self.handle(method.upper(), target, body)
+                await _write_response(writer, status, response, hit, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _write_response(writer, status, body, cache_hit, keep_alive):
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"X-Cache: {'HIT' if cache_hit else 'MISS'}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def _json_bytes(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _round(value):
+    return None if value != value else round(float(value), 4)
+
+
+def _round_grid(values):
+    return [[_round(value) for value in row] for row in values.tolist()]
+
+
+def _parse_target(target):
+    parts = urlsplit(target)
+    return parts.path.rstrip("/") or "/", parse_qsl(parts.query, keep_blank_values=False)
+
+
+def _number(params, name, default, cast=int, minimum=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = cast(value)
+    except ValueError:
+        raise HttpError(400, f"{name} 参数无效: {value!r}")
+    if minimum is not None and value < minimum:
+        raise HttpError(400, f"{name} 参数不能小于 {minimum}")
+    return value
+
+
+def _normalize_query(path, params):
+    """
+    把 GET 参数规范化为缓存键：只保留端点认识的参数，数值统一类型（24 与 24.0 相同），
+    量化和尺寸统一大写、模型家族统一小写，缺省参数填入默认值
+    """
+    params = {key: value.strip() for key, value in params if value.strip()}
+    if path == "/search":
+        query = {
+            "q": " ".join(params.get("q", "").lower().split()),
+            "limit": _number(params, "limit", 20, minimum=0),
+            "exact": params.get("exact", "").lower() in ("1", "true", "yes"),
+        }
+        if "family" in params:
+            query["family"] = params["family"].lower()
+        if "quant" in params:
+            query["quant"] = tuple(sorted(value.strip().upper() for value in params["quant"].split(",")))
+        for name in ("min_size", "max_size"):
+            if name in params:
+                query[name] = _number(params, name, None, cast=float)
+        return query
+    query = {
+        "context": _number(params, "context", 8192, minimum=1),
+        "batch": _number(params, "batch", 1, minimum=1),
+        "kv_bits": _number(params, "kv_bits", 16, minimum=1),
+    }
+    if path == "/lookup":
+        for name in ("name", "model_id"):
+            if name in params:
+                query[name] = params[name]
+        return query
+    if "budget" in params:
+        query["budget"] = _number(params, "budget", None, cast=float)
+    query["web"] = params.get("web", "").lower() in ("1", "true", "yes")
+    query["limit"] = _number(params, "limit", 20, minimum=0)
+    if "family" in params:
+        query["family"] = params["family"].lower()
+    if "size" in params:
+        query["size"] = params["size"].upper()
+    if "quant" in params:
+        query["quant"] = params["quant"].upper()
+    if "gpu" in params:
+        if params["gpu"] not in GPU_SPECS:
+            raise HttpError(400, f"未知的 GPU: {params['gpu']}，可选: {', '.join(GPU_SPECS)}")
+        query["gpu"] = params["gpu"]
+    return query
+
+
+def _normalize_estimate(payload):
+    """规范化批量估算的请求体：{"models": [...], "contexts": [...], "batches": [...], "kv_bits": 16}"""
+    if not isinstance(payload, dict):
+        raise HttpError(400, "请求体应为 JSON 对象")
+    models = payload.get("models")
+    if not isinstance(models, list) or not models or not all(isinstance(name, str) for name in models):
+        raise HttpError(400, "models 应为非空的模型名称列表")
+    if len(models) > MAX_ESTIMATE_MODELS:
+        raise HttpError(413, f"一次最多估算 {MAX_ESTIMATE_MODELS} 个模型")
+    query = {"models": [name.strip() for name in models]}
+    for name, default in (("contexts", [8192]), ("batches", [1])):
+        values = payload.get(name, default)
+        if not isinstance(values, list) or not values:
+            raise HttpError(400, f"{name} 应为非空的整数列表")
+        try:
+            query[name] = [int(value) for value in values]
+        except (TypeError, ValueError):
+            raise HttpError(400, f"{name} 应为非空的整数列表")
+        if min(query[name]) < 1:
+            raise HttpError(400, f"{name} 中的值不能小于 1")
+    if len(query["contexts"]) * len(query["batches"]) > MAX_ESTIMATE_CELLS:
+        raise HttpError(413, f"上下文长度 × 批大小的组合不能超过 {MAX_ESTIMATE_CELLS} 个")
+    try:
+        query["kv_bits"] = int(payload.get("kv_bits", 16))
+    except (TypeError, ValueError):
+        raise HttpError(400, "kv_bits 应为整数")
+    return query
+
+
+# ---- 压力测试 ----
+
+def build_workload(snapshot, count, distinct, seed=0):
+    """
+    生成压力测试请求 [(方法, 路径, 请求体)]：lookup、fit、estimate 约为 5:4:1，
+    从 distinct 个不同的查询中随机抽取，distinct 越小缓存命中率越高
+    """
+    rng = random.Random(seed)
+    names = [record.name for record in snapshot.records]
+    families = sorted({record.family for record in snapshot.records})
+    budgets = [4, 6, 8, 12, 16, 24, 32, 48, 80]
+    contexts = [2048, 4096, 8192, 16384, 32768]
+    pool = []
+    for _ in range(max(1, distinct)):
+        kind = rng.random()
+        if kind < 0.5:
+            pool.append(("GET", f"/lookup?name={rng.choice(names)}&context={rng.choice(contexts)}", b""))
+        elif kind < 0.9:
+            family = f"&family={rng.choice(families).replace(' ', '+')}" if rng.random() < 0.5 else ""
+            pool.append(("GET", f"/fit?budget={rng.choice(budgets)}&context={rng.choice(contexts)}{family}", b""))
+        else:
+            body = _json_bytes({"models": rng.sample(names, 20), "contexts": rng.sample(contexts, 3), "batches": [1, 4]})
+            pool.append(("POST", "/estimate", body))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+async def _bench_worker(host, port, requests, latencies, statuses, hits):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for method, target, body in requests:
+            started = time.perf_counter()
+            writer.write(
+                f"{method} {target} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            hit = False
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+                elif name.lower() == "x-cache":
+                    hit = value.strip() == "HIT"
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            status = int(status_line.split()[1])
+            statuses[status] = statuses.get(status, 0) + 1
+            hits.append(hit)
+    finally:
+        writer.close()
+
+
+async def run_load_test(host, port, workload, concurrency):
+    """以 concurrency 个长连接并发发送 workload，返回延迟分位数、吞吐量和缓存命中率"""
+    latencies, statuses, hits = [], {}, []
+    shares = [workload[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _bench_worker(host, port, share, latencies, statuses, hits) for share in shares if share
+    ))
+    elapsed = time.perf_counter() - started
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p90": round(float(np.percentile(latencies_ms, 90)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+        "statuses": statuses,
+        "cache_hit_rate": round(sum(hits) / len(hits), 4) if hits else 0.0,
+    }
+
+
+def _start_background_service(service, host):
+    """在独立线程的事件循环中启动服务，返回 (端口, 停止函数, 线程)"""
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        server = loop.run_until_complete(service.serve(host, 0))
+        state["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+        async def shutdown():
+            server.close()
+            service.watch_task.cancel()
+            await asyncio.gather(server.wait_closed(), service.watch_task, return_exceptions=True)
+
+        loop.run_until_complete(shutdown())
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+    return state["port"], lambda: state["loop"].call_soon_threadsafe(state["loop"].stop), thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型目录查询服务（lookup / fit / estimate）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("serve", "启动服务"), ("bench", "压力测试")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--config", default="config.json")
+        sub.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+        sub.add_argument("--catalog", default=DEFAULT_CATALOG_PATH)
+        sub.add_argument("--host", default=DEFAULT_HOST)
+        sub.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="响应缓存条目数，0 表示不缓存")
+    subparsers.choices["serve"].add_argument("--port", type=int, default=DEFAULT_PORT)
+    bench = subparsers.choices["bench"]
+    bench.add_argument("--url", help="已启动服务的地址，例如 http://127.0.0.1:8090；缺省时在本进程的后台线程中启动")
+    bench.add_argument("--requests", type=int, default=20000)
+    bench.add_argument("--concurrency", type=int, default=32)
+    bench.add_argument("--distinct", type=int, default=500, help="不同查询的数量，越小缓存命中率越高")
+    bench.add_argument("--output", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        logging_config = json.load(f).get("logging", {})
+    setup_logging(logging_config.get("level", "INFO"), json_format=logging_config.get("json", False))
+    service = CatalogService(args.config, args.models_dir, args.catalog, cache_size=args.cache_size)
+    if args.command == "serve":
+        async def serve_forever():
+            server = await service.serve(args.host, args.port)
+            print(f"模型目录服务已启动: http://{args.host}:{args.port} ({len(service.snapshot.records)} 个模型)")
+            print("  GET  /lookup?name=qwen2.5:7b&context=8192")
+            print("  GET  /fit?budget=24&context=8192&family=qwen+2.5&quant=Q4_K_M")
+            print("  GET  /search?q=coder+32b&quant=Q4_K_M,Q8_0&max_size=34")
+            print("  POST /estimate  {\"models\": [...], \"contexts\": [2048, 8192], \"batches\": [1, 4]}")
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    workload = build_workload(service.snapshot, args.requests, args.distinct)
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port, stop, thread = parts.hostname, parts.port or 80, None, None
+    else:
+        host = args.host
+        port, stop, thread = _start_background_service(service, host)
+    try:
+        result = asyncio.run(run_load_test(host, port, workload, args.concurrency))
+    finally:
+        if stop:
+            stop()
+            thread.join()
+    latency = result["latency_ms"]
+    print(f"{result['requests']} 个请求，并发 {result['concurrency']}，耗时 {result['seconds']} 秒")
+    print(f"吞吐量: {result['requests_per_second']} 请求/秒")
+    print(f"延迟 (ms): p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"状态码: {result['statuses']}  缓存命中率: {result['cache_hit_rate']:.1%}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""pytest 共享夹具：测试只访问 127.0.0.1 上的替身服务，不访问外网"""
+import json
+from pathlib import Path
+
+import pytest
+
+from standin_server import StandinServer
+
+ROOT = Path(__file__).resolve().parent
+MODELS_DIR = ROOT / "modeldata" / "new"
+
+
+def load_config():
+    with open(ROOT / "config.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def server():
+    with StandinServer() as standin:
+        yield standin
@@ -0,0 +1,82 @@
+import os
+import json
+import threading
+
+# 修复日志末尾时每次向前读取的字节数
+TAIL_CHUNK_SIZE = 4096
+
+
+class CrawlJournal:
+    """
+    抓取结果的追加式 JSON Lines 日志，每完成一个模型写入一行并立即 flush。
+    抓取中断后重新运行时，load() 读回已完成的模型，ModelProcessor 按 model_id 复用其中的详情，
+    不再重复抓取；成功写出最终 JSON 后调用 remove() 删除日志
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    @classmethod
+    def for_output(cls, output_file):
+        """返回输出文件对应的日志，例如 qwen_2.5_models.json -> qwen_2.5_models.json.journal.jsonl"""
+        return cls(f"{output_file}.journal.jsonl")
+
+    def load(self):
+        """读取日志中的模型记录，同一模型以最后一条为准；最后一行写到一半时忽略该行"""
+        records = {}
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record.get("model")] = record
+        return list(records.values())
+
+    def _truncate_partial_line(self):
+        """上次运行中断时最后一行可能只写了一半（没有换行符），截断到最后一个换行符之后"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - TAIL_CHUNK_SIZE)
+                f.seek(start)
+                chunk = f.read(position - start)
+                newline = chunk.rfind(b"\n")
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                f.truncate(position)
+
+    def append(self, model_data):
+        """追加一条已完成的模型记录；首次追加前截掉上次中断留下的半行，避免新记录与其拼在同一行"""
+        line = json.dumps(model_data, ensure_ascii=False)
+        with self.lock:
+            if self.file is None:
+                self._truncate_partial_line()
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def remove(self):
+        """关闭并删除日志，在最终 JSON 写出后调用"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
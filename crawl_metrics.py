@@ -0,0 +1,231 @@
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+# 耗时直方图的分桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 响应大小直方图的分桶上界（字节）
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Prometheus 指标名前缀
+METRIC_PREFIX = "ollama_crawl_"
+# JSON 汇总中直方图给出的分位数
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+METRIC_HELP = {
+    "requests_total": "发出的 HTTP 请求数（每次重试单独计数），status 为状态码或异常类名",
+    "request_seconds": "单次 HTTP 请求的网络耗时",
+    "response_bytes": "HTTP 响应体大小",
+    "retries_total": "重试次数，reason 为状态码或异常类名",
+    "wait_seconds_total": "等待时间，reason 为 rate_limit（限速）或 backoff（重试退避）",
+    "cache_total": "HTTP 缓存查询结果：hit、revalidated 或 miss",
+    "parse_seconds": "页面解析耗时，page 为 main、tags 或 detail",
+    "family_seconds_total": "模型家族的处理总耗时",
+    "family_models_total": "模型家族保存的模型数",
+    "family_runs_total": "模型家族的处理次数，status 为 skipped、saved、empty 或 error",
+}
+
+# LogRecord 自带的属性，JSON 日志中只输出额外传入的字段
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行 JSON：time、level、logger、message，以及通过 extra 传入的字段"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level="INFO", json_format=False, stream=None):
+    """配置根日志：输出到 stdout，json_format 为 True 时每行一条 JSON"""
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if json_format:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s", "%H:%M:%S"))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+class Histogram:
+    """固定分桶的直方图，counts[i] 为落在 (buckets[i-1], buckets[i]] 的观测数，最后一个桶为 +Inf"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(上界, 累计观测数)]，上界 None 表示 +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [None], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """分位数的估计值：所在分桶的上界，落在 +Inf 桶时返回最大的有限上界"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound if bound is not None else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class CrawlMetrics:
+    """
+    线程安全的抓取指标：计数器和固定分桶直方图，按 (指标名, 标签) 分别累计。
+    每次记录只有一次加锁、一次字典查找和一次二分查找，可以在正式抓取中常开。
+    可导出为 JSON 汇总（含按模型家族汇总的合计）或 Prometheus 文本格式
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """记录代码块的耗时（秒），代码块抛出异常时同样记录"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def summary(self):
+        """JSON 汇总：counters、histograms（count、sum、分位数估计）和按 family 标签汇总的 families"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                ((key, h.sum, h.count, {f"p{round(q * 100)}": h.quantile(q) for q in SUMMARY_QUANTILES})
+                 for key, h in self.histograms.items()),
+                key=lambda item: item[0],
+            )
+
+        families = {}
+        result = {
+            "started_at": self.started_at,
+            "elapsed_seconds": time.time() - self.started_at,
+            "counters": [],
+            "histograms": [],
+            "families": families,
+        }
+        for (name, labels), value in counters:
+            labels = dict(labels)
+            result["counters"].append({"name": name, "labels": labels, "value": value})
+            if "family" in labels:
+                totals = families.setdefault(labels["family"], {})
+                totals[name] = totals.get(name, 0) + value
+        for (name, labels), total, count, quantiles in histograms:
+            labels = dict(labels)
+            result["histograms"].append({"name": name, "labels": labels, "count": count, "sum": total, **quantiles})
+            if "family" in labels:
+                totals = families.setdefault(labels["family"], {})
+                totals[f"{name}_count"] = totals.get(f"{name}_count", 0) + count
+                totals[f"{name}_sum"] = totals.get(f"{name}_sum", 0) + total
+        return result
+
+    def to_prometheus(self):
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                ((key, h.cumulative(), h.sum, h.count) for key, h in self.histograms.items()),
+                key=lambda item: item[0],
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name, metric_type):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {metric_type}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), cumulative, total, count in histograms:
+            describe(name, "histogram")
+            for bound, bucket_count in cumulative:
+                le = "+Inf" if bound is None else _format_value(bound)
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels + (('le', le),))} {bucket_count}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=None, prometheus_path=None):
+        """写出 JSON 汇总和/或 Prometheus 文本文件"""
+        if json_path:
+            Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        if prometheus_path:
+            Path(prometheus_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(prometheus_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
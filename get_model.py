@@ -1,20 +1,55 @@
 import re
 import json
+import logging
+import argparse
 import urllib3
-import requests
 from pathlib import Path
-from bs4 import BeautifulSoup
 import os
 import time
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from http_cache import HttpCache
+from http_client import HostRateLimiter, HttpClient
+from html_parsers import get_html_parser
+from crawl_journal import CrawlJournal
+from crawl_metrics import CrawlMetrics, setup_logging
+from model_records import parse_size_label
+from ollama_registry import DEFAULT_REGISTRY_URL, RegistryClient, registry_name
+from snapshot_store import DEFAULT_SNAPSHOT_DIR, SHORT_ID_LENGTH, SnapshotStore, output_files
+from web_export import DEFAULT_EXPORT_DIR, DEFAULT_PUBLIC_PATH, export_bundle
 
 # 禁用 SSL 警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# 模型详情页所在站点，可用 config.json 中的 site_url 覆盖（例如指向本地替身服务）
+DEFAULT_SITE_URL = "https://ollama.com"
+
+# 详情页提供的字段，增量更新时按 model_id 复用
+DETAIL_FIELDS = ("arch", "parameters", "quantization", "quantization_info", "description")
+
+# 未配置 metrics 时指标文件的默认路径
+DEFAULT_METRICS_JSON = ".cache/crawl_metrics.json"
+DEFAULT_METRICS_PROMETHEUS = ".cache/crawl_metrics.prom"
+
+logger = logging.getLogger("get_model")
+
+
 class ModelProcessor:
     def __init__(self, config_path='config.json'):
         """初始化模型处理器，加载配置和设置目录"""
         self.load_config(config_path)
         self.setup_directories()
+        self.http_cache = HttpCache.from_config(self.config.get("http_cache"))
+        self.metrics = CrawlMetrics()
+        self.http_client = HttpClient.from_config(self.config.get("crawl"), cache=self.http_cache, metrics=self.metrics)
+        self.html_parser = get_html_parser(self.config.get("html_parser", "html.parser"))
+        # 并行处理多个模型家族时共享的请求并发额度和主机限速器，串行处理时为 None
+        self.request_slots = None
+        self.shared_rate_limiter = None
+        # 是否在控制台输出完整的模型 JSON
+        self.print_json = False
         self.model_type_handlers = {
             "deepseek": self._process_deepseek_model,
         }
@@ -34,6 +69,30 @@ class ModelProcessor:
         output_dir = self.config.get("output_dirs", {}).get("cleaned", "modeldata/cleaned")
         return str(Path(output_dir) / filename)
 
+    def http_get(self, url, headers=None, rate_limiter=None, family=None, revalidate=False):
+        """
+        通过共享的 HttpClient 发送 GET 请求（连接池、重试退避、HTTP 缓存），
+        rate_limiter 为空时使用客户端自身的限速器；并行模式下每个请求占用一个全局并发额度。
+        family 为指标中的模型家族标签；revalidate 为 True 时即使缓存未过期也向服务器确认页面是否变化
+        """
+        kwargs = {"headers": headers, "rate_limiter": rate_limiter, "family": family, "revalidate": revalidate}
+        if self.request_slots is None:
+            return self.http_client.get(url, **kwargs)
+        with self.request_slots:
+            return self.http_client.get(url, **kwargs)
+
+    def parse_page(self, method, html, page, family=None):
+        """调用 html_parser 的 method 解析页面，并按页面类型记录解析耗时"""
+        with self.metrics.timer("parse_seconds", family=family or "", page=page):
+            return getattr(self.html_parser, method)(html)
+
+    def write_json_atomic(self, output_file, json_output):
+        """先写入同目录下的临时文件再替换，避免中断时留下不完整的 JSON"""
+        tmp_file = f"{output_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(json_output)
+        os.replace(tmp_file, output_file)
+
     def _process_deepseek_model(self, base_size, model_id, model_version):
         """处理 Deepseek 模型"""
         model_config = next(
@@ -54,241 +113,541 @@ class ModelProcessor:
 
         return models
 
-    def process_model(self, model_config):
-        """处理指定类型的模型"""
+    def load_existing_models(self, output_file):
+        """读取已有的模型数据文件，文件不存在或无法解析时返回 None"""
+        if not os.path.exists(output_file):
+            return None
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取已有模型数据 {output_file} 失败: {e}")
+            return None
+
+    def diff_models(self, old_models, new_models):
+        """按模型名称比较两份模型数据，返回新增、删除和变化（model_id、文件大小或默认标记）的模型名称"""
+        old_by_name = {m.get("model"): m for m in old_models}
+        new_by_name = {m.get("model"): m for m in new_models}
+        changed = [
+            name for name, model in new_by_name.items()
+            if name in old_by_name and any(
+                model.get(key) != old_by_name[name].get(key)
+                for key in ("model_id", "file_size", "is_default")
+            )
+        ]
+        return {
+            "added": [name for name in new_by_name if name not in old_by_name],
+            "removed": [name for name in old_by_name if name not in new_by_name],
+            "changed": changed,
+        }
+
+    def sort_models(self, models):
+        """按尺寸、量化优先级和名称长度对模型原地排序"""
+        quant_priority = {
+            "BASE": 0,
+            "FP16": 1,
+            "Q8_0": 2,
+            "Q6_K": 3,
+            "Q5_K_M": 4,
+            "Q5_1": 5,
+            "Q5_0": 6,
+            "Q4_K_M": 7,
+            "Q4_K_S": 8,
+            "Q4_0": 9,
+            "Q3_K_M": 10,
+            "Q3_K_S": 11,
+            "Q2_K": 12
+        }
+
+        # 只使用记录自带的 size_label，缺失或无法解析时按 0 排序，保持已有数据文件的顺序
+        models.sort(key=lambda x: (
+            parse_size_label(x.get("size_label", "")) or 0.0,
+            quant_priority.get(x.get("quantization", ""), 999),
+            len(x.get("model", ""))
+        ))
+        return models
+
+    def process_model(self, model_config, refresh_mode="skip"):
+        """
+        处理指定类型的模型，refresh_mode 控制已有数据文件的处理方式：
+          - skip: 数据文件已存在时跳过抓取
+          - incremental: 只抓取标签页，与已有数据比较 model_id，仅为新增或变化的 model_id 抓取详情页
+          - full: 忽略已有数据，重新抓取全部详情页
+        返回处理摘要：name、status（skipped / saved / empty / error）、models、elapsed，
+        同时计入 family_runs_total、family_models_total 和 family_seconds_total 指标
+        """
+        summary = self._process_model(model_config, refresh_mode)
+        family = model_config['name']
+        self.metrics.inc("family_runs_total", family=family, status=summary["status"])
+        self.metrics.inc("family_models_total", summary["models"], family=family)
+        self.metrics.inc("family_seconds_total", summary["elapsed"], family=family)
+        return summary
+
+    def _process_model(self, model_config, refresh_mode):
         output_file = self.get_file_path(model_config['output_file'])
+        started_at = time.monotonic()
+        family = model_config['name']
+        summary = {"name": family, "status": "error", "models": 0, "elapsed": 0.0}
+        log_fields = {"family": family}
 
+        existing_models = None
         if os.path.exists(output_file):
-            print(f"\n{model_config['name']}模型数据已存在于 {output_file}，跳过抓取...")
-            return
-
+            if refresh_mode == "skip":
+                logger.info(f"{family}模型数据已存在于 {output_file}，跳过抓取", extra=log_fields)
+                summary["status"] = "skipped"
+                return summary
+            if refresh_mode == "incremental":
+                existing_models = self.load_existing_models(output_file)
+
+        # 上次运行中断时留下的日志会在本次抓取中被复用
+        journal = CrawlJournal.for_output(output_file)
         try:
-            raw_models = self.fetch_model_data(model_config)
-
-            quant_priority = {
-                "BASE": 0,
-                "FP16": 1,
-                "Q8_0": 2,
-                "Q6_K": 3,
-                "Q5_K_M": 4,
-                "Q5_1": 5,
-                "Q5_0": 6,
-                "Q4_K_M": 7,
-                "Q4_K_S": 8,
-                "Q4_0": 9,
-                "Q3_K_M": 10,
-                "Q3_K_S": 11,
-                "Q2_K": 12
-            }
-
-            raw_models.sort(key=lambda x: (
-                float(x.get("size_label", "0B").replace("B", "")),
-                quant_priority.get(x.get("quantization", ""), 999),
-                len(x.get("model", ""))
-            ))
+            raw_models = self.fetch_family_data(model_config, existing_models=existing_models, journal=journal)
+
+            if existing_models is not None and raw_models:
+                diff = self.diff_models(existing_models, raw_models)
+                logger.info(f"{family} 增量更新: 新增 {len(diff['added'])} 个, "
+                            f"删除 {len(diff['removed'])} 个, 变化 {len(diff['changed'])} 个",
+                            extra={**log_fields, **{key: len(names) for key, names in diff.items()}})
+                for key in ("added", "removed", "changed"):
+                    for name in diff[key]:
+                        logger.debug(f"  {key}: {name}", extra=log_fields)
+
+            self.sort_models(raw_models)
 
             if raw_models:
                 json_output = json.dumps(raw_models, indent=2, ensure_ascii=False)
-                print(f"\n{model_config['name']}模型信息:")
-                print(json_output)
-
-                with open(output_file, "w", encoding="utf-8") as f:
-                    f.write(json_output)
-                print(f"\n共处理 {len(raw_models)} 个唯一模型")
-                print(f"数据保存在: {output_file}")
+                if self.print_json:
+                    print(f"\n{family}模型信息:")
+                    print(json_output)
+
+                # 最终 JSON 原子写出后日志不再需要
+                self.write_json_atomic(output_file, json_output)
+                journal.remove()
+                logger.info(f"{family}: 共处理 {len(raw_models)} 个唯一模型，数据保存在 {output_file}",
+                            extra={**log_fields, "models": len(raw_models)})
+                summary["status"] = "saved"
+                summary["models"] = len(raw_models)
             else:
-                print(f"未获取到任何有效的{model_config['name']}模型信息")
+                logger.warning(f"未获取到任何有效的{family}模型信息", extra=log_fields)
+                summary["status"] = "empty"
 
         except Exception as e:
-            print(f"处理{model_config['name']}模型时出错: {e}")
-            import traceback
-            print(f"堆栈跟踪:\n{traceback.format_exc()}")
+            logger.exception(f"处理{family}模型时出错: {e}", extra=log_fields)
+        finally:
+            journal.close()
 
-    def fetch_model_data(self, model_config):
-        """从网页获取模型数据，精确匹配下拉列表中的默认模型名称，latest 也是默认模型"""
-        tags_url = model_config['tags_url']
-        model_prefix = model_config.get('prefix', '')
+        summary["elapsed"] = time.monotonic() - started_at
+        return summary
+
+    def process_models(self, model_configs, refresh_mode="skip", parallel=1,
+                       max_concurrent_requests=None, requests_per_second=None):
+        """
+        处理多个模型家族，返回与 model_configs 顺序一致的处理摘要列表。
+        parallel > 1 时用线程池同时处理多个家族，所有家族共享 max_concurrent_requests
+        个请求并发额度和每个主机 requests_per_second 的限速（此时忽略家族级别的限速配置）
+        """
+        if parallel <= 1:
+            return [self.process_model(model_config, refresh_mode) for model_config in model_configs]
+
+        crawl_config = self.config.get("crawl", {})
+        if max_concurrent_requests is None:
+            max_concurrent_requests = crawl_config.get("max_concurrent_requests", 8)
+        if requests_per_second is None:
+            requests_per_second = crawl_config.get("global_requests_per_second", 4)
 
+        self.request_slots = threading.BoundedSemaphore(max(1, int(max_concurrent_requests)))
+        self.shared_rate_limiter = HostRateLimiter(requests_per_second)
         try:
-            import urllib3
-            import time
-            import re
-            from bs4 import BeautifulSoup
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                return list(executor.map(
+                    lambda model_config: self.process_model(model_config, refresh_mode), model_configs
+                ))
+        finally:
+            self.request_slots = None
+            self.shared_rate_limiter = None
+
+    def get_crawl_settings(self, model_config):
+        """读取抓取并发度与每秒请求数，模型配置优先于全局 crawl 配置"""
+        defaults = self.config.get("crawl", {})
+        concurrency = model_config.get("concurrency", defaults.get("concurrency", 1))
+        requests_per_second = model_config.get(
+            "requests_per_second", defaults.get("requests_per_second", 1)
+        )
+        return max(1, int(concurrency)), float(requests_per_second)
+
+    def fetch_family_data(self, model_config, existing_models=None, journal=None):
+        """按模型家族配置的 source 选择数据来源：html（默认，抓取网页）或 registry（读取 registry manifest）"""
+        source = model_config.get("source", self.config.get("source", "html"))
+        if source == "registry":
+            return self.fetch_registry_model_data(model_config, existing_models=existing_models, journal=journal)
+        if source != "html":
+            raise ValueError(f"未知的数据来源: {source}")
+        return self.fetch_model_data(model_config, existing_models=existing_models, journal=journal)
+
+    def fetch_model_data(self, model_config, existing_models=None, journal=None):
+        """
+        从网页获取模型数据，精确匹配下拉列表中的默认模型名称，latest 也是默认模型。
+        传入 existing_models 时，model_id 已存在于旧数据中的标签直接复用旧的详情信息，
+        只为新增或变化的 model_id 抓取详情页，标签页中已不存在的模型会被丢弃。
+        传入 journal 时，日志中已完成的模型同样按 model_id 复用，本次抓取详情页的模型完成后立即追加到日志。
+        增量模式下主页面和 tags 页面即使在 HTTP 缓存中未过期也会向服务器确认，避免漏掉新增或删除的标签
+        """
+        concurrency, requests_per_second = self.get_crawl_settings(model_config)
+        family = model_config['name']
+        log_fields = {"family": family}
 
-            # 禁用 SSL 警告
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            session = requests.Session()
-            session.verify = False
-            
-            # 首先获取主页面，查找下拉列表中的默认模型
-            base_url = tags_url.replace('/tags', '')
-            print(f"\n获取主页面 {base_url} 的响应状态: ", end='')
-            response = session.get(base_url, headers=headers)
-            response.raise_for_status()
-            print(response.status_code)
-            
-            main_soup = BeautifulSoup(response.text, 'html.parser')
-            default_models = set()
-            
-            # 从下拉列表获取默认模型（精确匹配）
-            nav = main_soup.find('nav', {'id': 'tags-nav'})
-            if nav:
-                for link in nav.find_all('a', href=True):
-                    if '/tags' not in link['href']:  # 排除 "View all" 链接
-                        model_name = link.find('span', {'title': True})['title']
-                        default_models.add(model_name)
-                        print(f"添加默认模型: {model_name}")
-            
-            print(f"找到所有默认模型: {default_models}")
-            
-            # 获取 tags 页面的所有模型
-            print(f"\n获取标签页面 {tags_url} 的响应状态: ", end='')
-            response = session.get(tags_url, headers=headers)
-            response.raise_for_status()
-            print(response.status_code)
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            models_data = []
-            model_divs = soup.find_all('div', class_='flex px-4 py-3')
-            print(f"\n找到 {len(model_divs)} 个模型div")
-            
-            details_by_model_id = {}
+        try:
+            rate_limiter = self.shared_rate_limiter or HostRateLimiter(requests_per_second)
+
+            def get(url, revalidate=False):
+                response = self.http_get(url, rate_limiter=rate_limiter, family=family, revalidate=revalidate)
+                response.raise_for_status()
+                return response
             
-            for div in model_divs:
-                try:
-                    model_link = div.find('a')
-                    if not model_link:
-                        continue
-
-                    # 获取模型名称
-                    raw_model_name_tag = model_link.find('div', class_='break-all')
-                    if raw_model_name_tag:
-                        raw_model_name = raw_model_name_tag.get_text(strip=True)
-                    else:
-                        raw_model_name = model_link.get_text(strip=True)
-
-                    # 判断是否为默认模型
-                    # 1. 检查是否为 latest 标签
-                    is_latest = 'latest' in raw_model_name.lower()
-                    # 2. 检查是否精确匹配下拉列表中的模型名称
-                    is_in_dropdown = raw_model_name in default_models
-                    is_default_model = is_latest or is_in_dropdown
-                    
-                    full_model_name = f"{model_prefix}:{raw_model_name}" if model_prefix else raw_model_name
-                    print(f"\n处理模型: {full_model_name} {'(默认模型)' if is_default_model else ''}")
-                    
-                    # 获取详情页 URL
-                    relative_url = model_link.get('href', '')
-                    if relative_url:
-                        absolute_url = f"https://ollama.com{relative_url}" if relative_url.startswith('/') else f"https://ollama.com/{relative_url}"
-                    else:
-                        print(f"未找到模型 {full_model_name} 的详情页 URL")
-                        continue
-                    
-                    model_data = {
-                        "model": full_model_name,
-                        "url": absolute_url,
-                        "is_default": is_default_model
-                    }
-                    
-                    # 从 tag 页面获取基础信息
-                    info_div = div.find('div', class_='flex items-baseline space-x-1 text-[13px] text-neutral-500')
-                    if info_div:
-                        span_tag = info_div.find('span')
-                        if span_tag:
-                            info_text = span_tag.get_text(strip=True)
-                            hash_match = re.search(r'([a-f0-9]{12})', info_text)
-                            if hash_match:
-                                model_data["model_id"] = hash_match.group(1)
-                            parts = info_text.split("•")
-                            if len(parts) >= 2:
-                                size_match = re.search(r'([\d.]+ ?[KMGT]B)', parts[1].strip())
-                                if size_match:
-                                    model_data["file_size"] = size_match.group(1)
-                    
-                    # 获取详情页信息
-                    model_id = model_data.get("model_id")
-                    details = {}
-                    
-                    print(f"获取详情页信息: {absolute_url}")
-                    try:
-                        detail_response = session.get(absolute_url, headers=headers)
-                        detail_response.raise_for_status()
-                        detail_soup = BeautifulSoup(detail_response.text, 'html.parser')
-                        
-                        # 查找模型信息区域
-                        model_info_div = detail_soup.find('div', class_='min-w-full divide-y divide-gray-200')
-                        if model_info_div:
-                            info_items = model_info_div.find_all('div', class_='flex sm:space-x-2 items-center')
-                            for item in info_items:
-                                label = item.find('span', class_='hidden sm:block')
-                                value = item.find('span', class_='text-neutral-400')
-                                if label and value:
-                                    key = label.get_text(strip=True).lower()
-                                    val = value.get_text(strip=True)
-                                    print(f"找到信息: {key} = {val}")
-                                    
-                                    if key == 'arch':
-                                        details["arch"] = val
-                                    elif key == 'parameters':
-                                        details["parameters"] = val
-                                    elif key == 'quantization':
-                                        quant_value = val.upper()
-                                        details["quantization"] = quant_value
-                                        # 使用英文格式
-                                        if is_default_model:
-                                            details["quantization_info"] = f"Default ({quant_value})"
-                                        else:
-                                            details["quantization_info"] = f"{quant_value}"
-                        
-                        # 获取描述信息
-                        desc_div = detail_soup.find('div', class_='prose dark:prose-invert')
-                        if desc_div:
-                            details["description"] = desc_div.get_text(strip=True)
-                        
-                        if model_id:
-                            details_by_model_id[model_id] = details
-                        
-                        print("\n找到的详细信息:")
-                        for key, value in details.items():
-                            print(f"{key}: {value}")
-                        
-                        time.sleep(1)
-                    except Exception as detail_error:
-                        print(f"获取详情页信息失败: {detail_error}")
-                    
+            models_data = self._fetch_tag_list(model_config, get, revalidate=existing_models is not None)
+
+            # 同一 model_id 的多个标签指向同一个模型文件，每个 model_id 只抓取一次详情页
+            groups = self._group_by_model_id(models_data)
+            journal_models = journal.load() if journal is not None else []
+            known_details = self._index_existing_details((existing_models or []) + journal_models)
+            group_details = [known_details.get(models_data[group[0]].get("model_id")) for group in groups]
+            pending = [i for i, details in enumerate(group_details) if details is None]
+            if existing_models is not None or journal_models:
+                logger.info(f"复用 {len(groups) - len(pending)} 个已知 model_id 的详情信息 "
+                            f"(日志中已完成 {len(journal_models)} 个模型)", extra=log_fields)
+
+            def complete_group(i, details, record):
+                """把详情合并到组内每个别名，record 为 True（本次抓取的详情）时写入日志"""
+                for index in groups[i]:
+                    model_data = models_data[index]
                     # 合并详情数据
-                    for key, value in details.items():
+                    for key, value in self._details_for_alias(details, model_data).items():
                         if key not in model_data:
                             model_data[key] = value
-                    
-                    print(f"最终数据: {model_data}")
-                    models_data.append(model_data)
-                except Exception as model_error:
-                    print(f"处理单个模型时出错: {model_error}")
-                    continue
+                    logger.debug(f"最终数据: {model_data}", extra=log_fields)
+                    if record and journal is not None:
+                        journal.append(model_data)
+
+            def fetch_group(i):
+                details = self._fetch_group_details(get, [models_data[j] for j in groups[i]], family)
+                complete_group(i, details, record=True)
+
+            # 复用的详情已在旧数据或日志中，不再重复写入日志
+            for i, details in enumerate(group_details):
+                if details is not None:
+                    complete_group(i, details, record=False)
+
+            logger.info(f"抓取 {len(pending)} 个详情页 (并发: {concurrency}, 每秒请求: {requests_per_second})",
+                        extra=log_fields)
+            if concurrency > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    list(executor.map(fetch_group, pending))
+            else:
+                for i in pending:
+                    fetch_group(i)
+
+            saved = len(models_data) - len(pending)
+            logger.info(f"详情页去重: {len(models_data)} 个标签, {len(groups)} 个唯一 model_id, "
+                        f"实际抓取 {len(pending)} 个, 节省 {saved} 次请求", extra=log_fields)
             
             # 按照模型名称排序，但默认模型排在前面
             models_data.sort(key=lambda x: (not x.get('is_default', False), x.get("model", "")))
             return models_data
 
         except Exception as e:
-            print(f"获取模型数据时出错: {e}")
-            import traceback
-            print(f"堆栈跟踪:\n{traceback.format_exc()}")
+            logger.exception(f"获取模型数据时出错: {e}", extra=log_fields)
+            return []
+
+    def fetch_registry_model_data(self, model_config, existing_models=None, journal=None):
+        """
+        从 Ollama registry 获取模型数据，作为抓取详情页的替代：每个标签读取一次 JSON manifest
+        得到 model_id 和 file_size，每个 config blob 只读取一次得到 arch、parameters 和 quantization。
+        标签列表优先使用配置中的 tags（latest 和 default_tags 为默认模型），否则读取主页面和 tags 页面。
+        传入 existing_models 或 journal 时，model_id 未变化的标签复用其中的详情，不再读取 config blob；
+        增量模式下标签列表页面和 manifest 即使在 HTTP 缓存中未过期也会向服务器确认（config blob 按摘要寻址，不需要）
+        """
+        concurrency, requests_per_second = self.get_crawl_settings(model_config)
+        registry_config = self.config.get("registry", {})
+        name = registry_name(model_config)
+        family = model_config['name']
+        log_fields = {"family": family}
+
+        try:
+            rate_limiter = self.shared_rate_limiter or HostRateLimiter(requests_per_second)
+
+            revalidate = existing_models is not None
+
+            def get(url, headers=None, revalidate=False):
+                response = self.http_get(url, headers=headers, rate_limiter=rate_limiter, family=family,
+                                         revalidate=revalidate)
+                response.raise_for_status()
+                return response
+
+            registry_url = registry_config.get("base_url", DEFAULT_REGISTRY_URL)
+            registry = RegistryClient(get, registry_url)
+            manifest_registry = RegistryClient(
+                lambda url, headers=None: get(url, headers, revalidate=revalidate), registry_url
+            )
+
+            if model_config.get("tags"):
+                model_prefix = model_config.get('prefix', '')
+                default_tags = set(model_config.get("default_tags", []))
+                models_data = []
+                for tag in model_config["tags"]:
+                    full_model_name = f"{model_prefix}:{tag}" if model_prefix else tag
+                    models_data.append({
+                        "model": full_model_name,
+                        "url": f"{model_config['base_url']}:{tag}",
+                        "is_default": 'latest' in tag.lower() or tag in default_tags,
+                    })
+            else:
+                models_data = self._fetch_tag_list(model_config, get, revalidate=revalidate)
+
+            def fetch_manifest(model_data):
+                tag = model_data["url"].rsplit(":", 1)[-1]
+                try:
+                    return manifest_registry.fetch_manifest(name, tag)
+                except Exception as manifest_error:
+                    logger.warning(f"获取 {name}:{tag} 的 manifest 失败: {manifest_error}", extra=log_fields)
+                    return None
+
+            logger.info(f"从 registry 读取 {len(models_data)} 个 manifest (并发: {concurrency})", extra=log_fields)
+            if concurrency > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    manifests = list(executor.map(fetch_manifest, models_data))
+            else:
+                manifests = [fetch_manifest(model_data) for model_data in models_data]
+
+            journal_models = journal.load() if journal is not None else []
+            known_details = self._index_existing_details((existing_models or []) + journal_models)
+            config_digests = []
+            for model_data, manifest in zip(models_data, manifests):
+                if manifest is None:
+                    continue
+                model_data["model_id"] = manifest["model_id"]
+                model_data["file_size"] = manifest["file_size"]
+                digest = manifest["config_digest"]
+                if digest and manifest["model_id"] not in known_details and digest not in config_digests:
+                    config_digests.append(digest)
+
+            def fetch_config(digest):
+                try:
+                    details = registry.fetch_config(name, digest)
+                except Exception as config_error:
+                    logger.warning(f"获取 config blob {digest} 失败: {config_error}", extra=log_fields)
+                    return {}
+                if "quantization" in details:
+                    details["quantization_info"] = details["quantization"]
+                return details
+
+            logger.info(f"读取 {len(config_digests)} 个 config blob", extra=log_fields)
+            if concurrency > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    details_by_digest = dict(zip(config_digests, executor.map(fetch_config, config_digests)))
+            else:
+                details_by_digest = {digest: fetch_config(digest) for digest in config_digests}
+
+            for model_data, manifest in zip(models_data, manifests):
+                if manifest is None:
+                    continue
+                details = known_details.get(manifest["model_id"])
+                reused = details is not None
+                if not reused:
+                    details = details_by_digest.get(manifest["config_digest"], {})
+                for key, value in self._details_for_alias(details, model_data).items():
+                    if key not in model_data:
+                        model_data[key] = value
+                logger.debug(f"最终数据: {model_data}", extra=log_fields)
+                if not reused and journal is not None:
+                    journal.append(model_data)
+
+            # 按照模型名称排序，但默认模型排在前面
+            models_data.sort(key=lambda x: (not x.get('is_default', False), x.get("model", "")))
+            return models_data
+
+        except Exception as e:
+            logger.exception(f"从 registry 获取模型数据时出错: {e}", extra=log_fields)
             return []
 
+    def _fetch_tag_list(self, model_config, get, revalidate=False):
+        """
+        读取主页面的默认模型和 tags 页面的所有标签，返回不含详情页信息的模型数据；
+        revalidate 为 True 时两个页面绕过 HTTP 缓存的 TTL，向服务器发送条件请求
+        """
+        tags_url = model_config['tags_url']
+        model_prefix = model_config.get('prefix', '')
+        family = model_config['name']
+        log_fields = {"family": family}
+
+        # 首先获取主页面，查找下拉列表中的默认模型
+        base_url = tags_url.replace('/tags', '')
+        response = get(base_url, revalidate=revalidate)
+        logger.info(f"获取主页面 {base_url} 的响应状态: {response.status_code}",
+                    extra={**log_fields, "url": base_url, "status": response.status_code})
+        
+        default_models = set()
+        
+        # 从下拉列表获取默认模型（精确匹配）
+        for model_name in self.parse_page("default_models", response.text, "main", family):
+            default_models.add(model_name)
+            logger.debug(f"添加默认模型: {model_name}", extra=log_fields)
+        
+        logger.info(f"找到所有默认模型: {default_models}", extra=log_fields)
+        
+        # 获取 tags 页面的所有模型
+        response = get(tags_url, revalidate=revalidate)
+        logger.info(f"获取标签页面 {tags_url} 的响应状态: {response.status_code}",
+                    extra={**log_fields, "url": tags_url, "status": response.status_code})
+        
+        tag_rows = self.parse_page("tag_rows", response.text, "tags", family)
+        logger.info(f"找到 {len(tag_rows)} 个模型div", extra=log_fields)
+        
+        models_data = []
+        for row in tag_rows:
+            try:
+                model_data = self._parse_tag_row(row, default_models, model_prefix)
+                if model_data:
+                    models_data.append(model_data)
+            except Exception as model_error:
+                logger.warning(f"处理单个模型时出错: {model_error}", extra=log_fields)
+                continue
+        return models_data
+
+    def _parse_tag_row(self, row, default_models, model_prefix):
+        """根据解析器提取的 tags 页面行，生成不含详情页信息的模型数据"""
+        if not row:
+            return None
+
+        # 获取模型名称
+        raw_model_name = row["name"]
+
+        # 判断是否为默认模型
+        # 1. 检查是否为 latest 标签
+        is_latest = 'latest' in raw_model_name.lower()
+        # 2. 检查是否精确匹配下拉列表中的模型名称
+        is_in_dropdown = raw_model_name in default_models
+        is_default_model = is_latest or is_in_dropdown
+        
+        full_model_name = f"{model_prefix}:{raw_model_name}" if model_prefix else raw_model_name
+        logger.debug(f"处理模型: {full_model_name} {'(默认模型)' if is_default_model else ''}")
+        
+        # 获取详情页 URL
+        relative_url = row["href"]
+        if relative_url:
+            site_url = self.config.get("site_url", DEFAULT_SITE_URL)
+            absolute_url = f"{site_url}{relative_url}" if relative_url.startswith('/') else f"{site_url}/{relative_url}"
+        else:
+            logger.warning(f"未找到模型 {full_model_name} 的详情页 URL")
+            return None
+        
+        model_data = {
+            "model": full_model_name,
+            "url": absolute_url,
+            "is_default": is_default_model
+        }
+        
+        # 从 tag 页面获取基础信息
+        info_text = row["info_text"]
+        if info_text is not None:
+            hash_match = re.search(r'([a-f0-9]{12})', info_text)
+            if hash_match:
+                model_data["model_id"] = hash_match.group(1)
+            parts = info_text.split("•")
+            if len(parts) >= 2:
+                size_match = re.search(r'([\d.]+ ?[KMGT]B)', parts[1].strip())
+                if size_match:
+                    model_data["file_size"] = size_match.group(1)
+        return model_data
+
+    def _group_by_model_id(self, models_data):
+        """按 model_id 对标签分组，返回下标列表；没有 model_id 的标签单独成组"""
+        groups = []
+        group_by_id = {}
+        for index, model_data in enumerate(models_data):
+            model_id = model_data.get("model_id")
+            if not model_id:
+                groups.append([index])
+            elif model_id in group_by_id:
+                group_by_id[model_id].append(index)
+            else:
+                group_by_id[model_id] = [index]
+                groups.append(group_by_id[model_id])
+        return groups
+
+    def _index_existing_details(self, existing_models):
+        """从已有模型数据中按 model_id 收集详情页字段，没有详情字段的记录不收录"""
+        known_details = {}
+        for model in existing_models:
+            model_id = model.get("model_id")
+            details = {key: model[key] for key in DETAIL_FIELDS if key in model}
+            if model_id and details and model_id not in known_details:
+                known_details[model_id] = details
+        return known_details
+
+    def _fetch_group_details(self, get, group_models, family=None):
+        """为一组共享 model_id 的标签抓取详情，第一个标签失败时依次尝试其余别名"""
+        for model_data in group_models:
+            details = self._fetch_tag_details(get, model_data, family)
+            if details:
+                return details
+        return {}
+
+    def _details_for_alias(self, details, model_data):
+        """把共享的详情复制给某个别名，quantization_info 按该别名是否默认重新生成"""
+        alias_details = dict(details)
+        quant_value = alias_details.get("quantization")
+        if quant_value is not None and "quantization_info" in alias_details:
+            if model_data["is_default"]:
+                alias_details["quantization_info"] = f"Default ({quant_value})"
+            else:
+                alias_details["quantization_info"] = f"{quant_value}"
+        return alias_details
+
+    def _fetch_tag_details(self, get, model_data, family=None):
+        """抓取并解析单个模型的详情页，失败时返回空字典"""
+        absolute_url = model_data["url"]
+        is_default_model = model_data["is_default"]
+        details = {}
+        log_fields = {"family": family, "url": absolute_url}
+        
+        logger.debug(f"获取详情页信息: {absolute_url}", extra=log_fields)
+        try:
+            detail_response = get(absolute_url)
+            items, description = self.parse_page("model_info", detail_response.text, "detail", family)
+            
+            # 模型信息区域
+            for key, val in items:
+                logger.debug(f"找到信息: {key} = {val}", extra=log_fields)
+                
+                if key == 'arch':
+                    details["arch"] = val
+                elif key == 'parameters':
+                    details["parameters"] = val
+                elif key == 'quantization':
+                    quant_value = val.upper()
+                    details["quantization"] = quant_value
+                    # 使用英文格式
+                    if is_default_model:
+                        details["quantization_info"] = f"Default ({quant_value})"
+                    else:
+                        details["quantization_info"] = f"{quant_value}"
+            
+            # 描述信息
+            if description is not None:
+                details["description"] = description
+            
+            logger.debug(f"{model_data['model']} 的详细信息: {details}", extra=log_fields)
+        except Exception as detail_error:
+            logger.warning(f"获取详情页信息失败: {detail_error}", extra=log_fields)
+        return details
+
     def fetch_quantization_details(self, model_url, headers):
         """进入模型链接页面，解析并返回量化信息"""
         try:
-            response = requests.get(model_url, headers=headers, verify=False)
+            response = self.http_get(model_url, headers=headers)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self.html_parser.soup(response.text)
 
             # 查找量化信息
             quantization = "Q4_K_M"  # 默认量化
@@ -325,18 +684,15 @@ class ModelProcessor:
             return quantization, quantization_info, size_label
 
         except Exception as e:
-            print(f"Error fetching quantization details from {model_url}: {e}")
+            logger.warning(f"Error fetching quantization details from {model_url}: {e}")
             return "Q4_K_M", "Q4_K_M 量化", "7B" #返回默认值
 
     def fetch_model_parameters(self, model_url):
         """进入模型链接页面，解析并返回更多附加的参数"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
         try:
-            response = requests.get(model_url, headers=headers, verify=False)
+            response = self.http_get(model_url)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self.html_parser.soup(response.text)
             additional_params = {}
             # 示例：假设页面中存在 class 为 "additional-params" 的div，其中包含更多参数
             params_div = soup.find("div", class_="additional-params")
@@ -350,7 +706,7 @@ class ModelProcessor:
                         additional_params[key] = value
             return additional_params
         except Exception as e:
-            print(f"Error fetching additional parameters from {model_url}: {e}")
+            logger.warning(f"Error fetching additional parameters from {model_url}: {e}")
             return {}
 
     # 新增辅助方法：剥离模型名称中的量化信息后缀
@@ -403,18 +759,14 @@ class ModelProcessor:
         例如 "r1:7b" 对应 https://ollama.com/library/deepseek-r1:7b
         """
         models = []
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
         try:
-            print(f"\n获取页面 {tags_url} 的响应状态: ", end='')
-            response = requests.get(tags_url, headers=headers, verify=False)
+            response = self.http_get(tags_url)
             response.raise_for_status()
-            print(response.status_code)
+            logger.info(f"获取页面 {tags_url} 的响应状态: {response.status_code}")
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self.html_parser.soup(response.text, target="tag_rows")
             model_divs = soup.find_all("div", class_="flex px-4 py-3")
-            print(f"\n找到 {len(model_divs)} 个模型div\n")
+            logger.info(f"找到 {len(model_divs)} 个模型div")
             
             for div in model_divs:
                 a_tag = div.find("a", class_="group")
@@ -423,12 +775,13 @@ class ModelProcessor:
                     
                 # 获取模型原始名称
                 raw_model_name = a_tag.find("div", class_="break-all").get_text(strip=True)
-                print(f"处理模型: {raw_model_name}")
+                logger.debug(f"处理模型: {raw_model_name}")
 
                 # 获取详情页面的相对地址
                 relative_url = a_tag.get("href")
                 # 构造完整链接，用于数据抓取和最终存储，例如 "/library/deepseek-r1:7b" -> "https://ollama.com/library/deepseek-r1:7b"
-                fetch_url = f"https://ollama.com{relative_url}" if relative_url.startswith("/") else relative_url
+                site_url = self.config.get("site_url", DEFAULT_SITE_URL)
+                fetch_url = f"{site_url}{relative_url}" if relative_url.startswith("/") else relative_url
                     
                 info_div = div.find("div", class_="flex items-baseline space-x-1")
                 if not info_div:
@@ -457,7 +810,7 @@ class ModelProcessor:
                 if additional_params:
                     model_info.update(additional_params)
 
-                print(f"添加数据: {model_info}\n")
+                logger.debug(f"添加数据: {model_info}")
                 models.append(model_info)
 
                 if max_models and len(models) >= max_models:
@@ -466,9 +819,7 @@ class ModelProcessor:
             return models
 
         except Exception as e:
-            print(f"Error fetching models from {tags_url}: {e}")
-            import traceback
-            print(f"堆栈跟踪:\n{traceback.format_exc()}")
+            logger.exception(f"Error fetching models from {tags_url}: {e}")
             return []
 
     def get_size_label(self, model_name):
@@ -498,24 +849,168 @@ class ModelProcessor:
 
         return size_label
 
+def _pad(text, width, align_right=False):
+    """按终端显示宽度补齐文本，中文字符按两个字符宽度计算"""
+    text = str(text)
+    display_width = sum(2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1 for ch in text)
+    padding = " " * max(0, width - display_width)
+    return padding + text if align_right else text + padding
+
+def print_summary(summaries, metrics=None):
+    """
+    打印每个模型家族的处理结果汇总表；传入 CrawlMetrics 时额外列出网络请求数、
+    网络耗时、限速与退避等待时间、解析耗时和缓存命中数（并行处理时各项按线程累计）
+    """
+    status_labels = {"skipped": "跳过", "saved": "已保存", "empty": "无数据", "error": "出错"}
+    name_width = max([len(summary["name"]) for summary in summaries] + [4])
+    families = {}
+    cache_hits = {}
+    if metrics is not None:
+        report = metrics.summary()
+        families = report["families"]
+        for counter in report["counters"]:
+            if counter["name"] == "cache_total" and counter["labels"].get("result") != "miss":
+                family = counter["labels"].get("family", "")
+                cache_hits[family] = cache_hits.get(family, 0) + counter["value"]
+
+    columns = [("状态", 6), ("模型数", 6), ("耗时(秒)", 8)]
+    if metrics is not None:
+        columns += [("请求数", 6), ("网络(秒)", 8), ("等待(秒)", 8), ("解析(秒)", 8), ("缓存命中", 8)]
+    print("\n处理汇总:")
+    print("  ".join([_pad("模型", name_width)] + [_pad(title, width, title != "状态") for title, width in columns]))
+    totals = [0] * (len(columns) - 1)
+    for summary in summaries:
+        values = [summary["models"], summary["elapsed"]]
+        if metrics is not None:
+            family = families.get(summary["name"], {})
+            values += [
+                family.get("requests_total", 0),
+                family.get("request_seconds_sum", 0.0),
+                family.get("wait_seconds_total", 0.0),
+                family.get("parse_seconds_sum", 0.0),
+                cache_hits.get(summary["name"], 0),
+            ]
+        totals = [total + value for total, value in zip(totals, values)]
+        cells = [_pad(status_labels[summary["status"]], 6)]
+        cells += [_pad(_format_cell(value), width, True) for value, (_, width) in zip(values, columns[1:])]
+        print("  ".join([_pad(summary["name"], name_width)] + cells))
+    cells = [_pad("", 6)] + [_pad(_format_cell(value), width, True) for value, (_, width) in zip(totals, columns[1:])]
+    print("  ".join([_pad("合计", name_width)] + cells))
+
+
+def _format_cell(value):
+    return format(value, ".1f") if isinstance(value, float) else str(value)
+
 def main():
+    parser = argparse.ArgumentParser(description="抓取 Ollama 模型数据")
+    parser.add_argument(
+        "--refresh", choices=["skip", "incremental", "full"], default="skip",
+        help="已有数据文件的处理方式: skip 跳过, incremental 增量更新, full 全量重新抓取"
+    )
+    parser.add_argument(
+        "--cache-only", action="store_true",
+        help="只使用 HTTP 缓存中的页面，不访问网络（需要在配置中启用 http_cache）"
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=1,
+        help="同时处理的模型家族数量，大于 1 时共享 crawl.max_concurrent_requests 和 crawl.global_requests_per_second"
+    )
+    parser.add_argument(
+        "--print-json", action="store_true",
+        help="在控制台输出每个模型家族的完整 JSON"
+    )
+    parser.add_argument(
+        "--export-web", action="store_true",
+        help="处理完成后导出网页计算器的数据包（也可在 config.json 中设置 web_export.enabled）"
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true",
+        help="本次抓取不创建模型目录快照（快照在 config.json 的 snapshots 中配置）"
+    )
+    parser.add_argument(
+        "--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+        help="日志级别，默认使用 config.json 中的 logging.level（INFO）；DEBUG 输出每个标签的详情"
+    )
+    parser.add_argument(
+        "--log-json", action="store_true",
+        help="每行输出一条 JSON 日志（也可在 config.json 中设置 logging.json）"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help=f"抓取指标 JSON 汇总的输出路径，默认使用 config.json 中的 metrics.json_path（{DEFAULT_METRICS_JSON}）"
+    )
+    parser.add_argument(
+        "--metrics-prometheus",
+        help=f"Prometheus 文本格式指标的输出路径，默认使用 config.json 中的 metrics.prometheus_path"
+             f"（{DEFAULT_METRICS_PROMETHEUS}）"
+    )
+    args = parser.parse_args()
+
     processor = ModelProcessor()
+    logging_config = processor.config.get("logging", {})
+    setup_logging(args.log_level or logging_config.get("level", "INFO"),
+                  json_format=args.log_json or logging_config.get("json", False))
+    processor.print_json = args.print_json
+    if args.cache_only:
+        if processor.http_cache is None:
+            parser.error("--cache-only 需要在 config.json 中启用 http_cache")
+        processor.http_cache.offline = True
 
     # 显示处理开始信息
-    print("\n开始处理模型数据...")
-    print("已配置的模型:")
-    for model in processor.config['models']:
-        print(f"- {model['name']}")
+    logger.info(f"开始处理模型数据，已配置 {len(processor.config['models'])} 个模型家族: "
+                f"{', '.join(model['name'] for model in processor.config['models'])}")
 
     # 处理每个模型
-    for model_config in processor.config['models']:
-        output_file = processor.get_file_path(model_config['output_file'])
-        if os.path.exists(output_file):
-            print(f"\n跳过 {model_config['name']} - 数据文件已存在: {output_file}")
-            continue
-
-        print(f"\n处理 {model_config['name']} 模型...")
-        processor.process_model(model_config)
+    started_at = time.monotonic()
+    summaries = processor.process_models(
+        processor.config['models'], refresh_mode=args.refresh, parallel=args.parallel
+    )
+    if args.log_json or logging_config.get("json", False):
+        # JSON 日志模式下汇总同样逐行输出为 JSON，便于日志系统采集
+        families = processor.metrics.summary()["families"]
+        for summary in summaries:
+            fields = {key: value for key, value in summary.items() if key != "name"}
+            logger.info(f"{summary['name']} 处理汇总",
+                        extra={"family": summary["name"], **fields, **families.get(summary["name"], {})})
+    else:
+        print_summary(summaries, processor.metrics)
+
+    snapshot_config = processor.config.get("snapshots", {})
+    if snapshot_config.get("enabled") and not args.no_snapshot and any(
+            summary["status"] == "saved" for summary in summaries):
+        store = SnapshotStore(snapshot_config.get("dir", DEFAULT_SNAPSHOT_DIR))
+        parent = store.head()
+        snapshot_id = store.commit(
+            processor.config.get("output_dirs", {}).get("cleaned", "modeldata/cleaned"),
+            output_files(processor.config), message=f"get_model --refresh {args.refresh}"
+        )
+        if snapshot_id == parent:
+            logger.info(f"模型数据与快照 {snapshot_id[:SHORT_ID_LENGTH]} 相同，未创建新快照")
+        elif parent is None:
+            logger.info(f"已创建首个快照 {snapshot_id[:SHORT_ID_LENGTH]}", extra={"snapshot": snapshot_id})
+        else:
+            diff = store.diff(parent, snapshot_id)
+            counts = {key: sum(len(changes[key]) for changes in diff.values()) for key in ("added", "removed", "changed")}
+            logger.info(f"已创建快照 {snapshot_id[:SHORT_ID_LENGTH]}: 新增 {counts['added']} 个, "
+                        f"删除 {counts['removed']} 个, 变化 {counts['changed']} 个标签",
+                        extra={"snapshot": snapshot_id, **counts})
+
+    metrics_config = processor.config.get("metrics", {})
+    metrics_json = args.metrics_json or metrics_config.get("json_path", DEFAULT_METRICS_JSON)
+    metrics_prometheus = args.metrics_prometheus or metrics_config.get("prometheus_path", DEFAULT_METRICS_PROMETHEUS)
+    processor.metrics.write(metrics_json, metrics_prometheus)
+    logger.info(f"抓取指标已写入 {metrics_json} 和 {metrics_prometheus}")
+
+    export_config = processor.config.get("web_export", {})
+    if args.export_web or export_config.get("enabled"):
+        manifest = export_bundle(
+            output_dir=export_config.get("output_dir", DEFAULT_EXPORT_DIR),
+            public_path=export_config.get("public_path", DEFAULT_PUBLIC_PATH),
+            compress=export_config.get("compress", False),
+        )
+        total_bytes = sum(family["gzip_bytes"] for family in manifest["models"])
+        logger.info(f"已导出网页数据包: {len(manifest['models'])} 个分片，gzip 后共 {total_bytes / 1024:.1f} KB")
+    logger.info(f"总耗时: {time.monotonic() - started_at:.1f} 秒")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,473 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from crawl_metrics import setup_logging
+from http_client import HttpClient
+from model_records import DEFAULT_ARCHITECTURES_PATH, load_architectures, load_catalog
+from ollama_registry import DEFAULT_REGISTRY_URL, RegistryClient, registry_name
+
+logger = logging.getLogger(__name__)
+
+GGUF_MAGIC = b"GGUF"
+
+# GGUF 元数据的值类型：类型编号 -> struct 格式（字符串和数组单独处理）
+UINT8, INT8, UINT16, INT16, UINT32, INT32, FLOAT32, BOOL, STRING, ARRAY, UINT64, INT64, FLOAT64 = range(13)
+SCALAR_FORMATS = {
+    UINT8: "<B", INT8: "<b", UINT16: "<H", INT16: "<h", UINT32: "<I", INT32: "<i",
+    FLOAT32: "<f", BOOL: "<?", UINT64: "<Q", INT64: "<q", FLOAT64: "<d",
+}
+SCALAR_STRUCTS = {value_type: struct.Struct(fmt) for value_type, fmt in SCALAR_FORMATS.items()}
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+
+# 超过该长度的数组（例如 tokenizer.ggml.tokens）只记录类型和长度，不解码内容
+MAX_ARRAY_LENGTH = 64
+
+# 估算 KV cache 需要的架构字段（键名前缀为 general.architecture 的值），
+# 前四个必需，其余缺省时按 llama.cpp 的规则推导
+REQUIRED_ARCH_KEYS = ("context_length", "block_count", "embedding_length", "attention.head_count")
+OPTIONAL_ARCH_KEYS = ("attention.head_count_kv", "attention.key_length", "attention.value_length",
+                      "feed_forward_length")
+
+# HTTP Range 读取：首次请求的字节数，之后每次翻倍，直到上限
+RANGE_CHUNK_BYTES = 64 * 1024
+RANGE_MAX_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class MmapSource:
+    """以内存映射方式读取本地 GGUF 文件，只有实际访问的页面会被读入内存"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def ensure(self, end):
+        """返回至少覆盖 [0, end) 的缓冲区"""
+        if end > len(self.mmap):
+            raise ValueError(f"{self.path} 在第 {end} 字节前结束，GGUF 文件不完整")
+        return self.mmap
+
+    def close(self):
+        self.mmap.close()
+
+
+class RangeSource:
+    """
+    通过 HTTP Range 请求按需读取远程 blob 的开头部分，不下载整个模型文件。
+    已读取的前缀保存在内存中，每次不够时继续请求下一段，段长度从 chunk_size 开始翻倍。
+    get(url, headers) 返回 requests.Response，缺省使用独立的 requests.Session；
+    第一次请求跟随重定向后的地址会被记住，后续分段直接请求该地址。
+    get 应以 stream=True 发送请求：服务器忽略 Range 返回 200 时只检查状态码和 Content-Range 就关闭响应，
+    不会下载整个模型文件
+    """
+
+    def __init__(self, url, get=None, chunk_size=RANGE_CHUNK_BYTES, max_chunk_size=RANGE_MAX_CHUNK_BYTES):
+        self.url = url
+        self.get = get or self._session_get
+        self.session = None
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.buffer = bytearray()
+        self.total_size = None
+        self.requests = 0
+
+    def _session_get(self, url, headers):
+        if self.session is None:
+            self.session = requests.Session()
+        return self.session.get(url, headers=headers, timeout=30, stream=True)
+
+    def ensure(self, end):
+        """返回至少覆盖 [0, end) 的缓冲区，不够时发送 Range 请求补齐"""
+        while len(self.buffer) < end:
+            if self.total_size is not None and len(self.buffer) >= self.total_size:
+                raise ValueError(f"{self.url} 在第 {end} 字节前结束，GGUF 文件不完整")
+            start = len(self.buffer)
+            stop = max(end, start + self.chunk_size) - 1
+            response = self.get(self.url, {"Range": f"bytes={start}-{stop}"})
+            self.requests += 1
+            try:
+                if response.status_code == 416:
+                    raise ValueError(f"{self.url} 在第 {end} 字节前结束，GGUF 文件不完整")
+                if response.status_code != 206:
+                    raise ValueError(f"{self.url} 返回 {response.status_code}，服务器不支持 Range 请求")
+                content_range = response.headers.get("Content-Range", "")
+                if not content_range.startswith(f"bytes {start}-"):
+                    raise ValueError(f"{self.url} 返回的 Content-Range 不符: {content_range!r}")
+                total = content_range.rsplit("/", 1)[-1]
+                if total.isdigit():
+                    self.total_size = int(total)
+                self.url = response.url or self.url
+                content = response.content
+            finally:
+                response.close()
+            if not content:
+                raise ValueError(f"{self.url} 返回了空的分段")
+            self.buffer.extend(content)
+            self.chunk_size = min(self.chunk_size * 2, self.max_chunk_size)
+        return self.buffer
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class _Cursor:
+    """按顺序读取 GGUF 元数据的游标"""
+
+    def __init__(self, source):
+        self.source = source
+        self.pos = 0
+
+    def unpack(self, packer):
+        buffer = self.source.ensure(self.pos + packer.size)
+        (value,) = packer.unpack_from(buffer, self.pos)
+        self.pos += packer.size
+        return value
+
+    def string(self):
+        length = self.unpack(U64)
+        buffer = self.source.ensure(self.pos + length)
+        start, self.pos = self.pos, self.pos + length
+        return bytes(buffer[start:self.pos]).decode("utf-8", errors="replace")
+
+    def value(self, value_type, max_array_length=MAX_ARRAY_LENGTH):
+        packer = SCALAR_STRUCTS.get(value_type)
+        if packer is not None:
+            return self.unpack(packer)
+        if value_type == STRING:
+            return self.string()
+        if value_type == ARRAY:
+            item_type = self.unpack(U32)
+            length = self.unpack(U64)
+            if length > max_array_length:
+                self.skip_array(item_type, length)
+                return {"array_type": item_type, "length": length}
+            return [self.value(item_type, max_array_length) for _ in range(length)]
+        raise ValueError(f"未知的 GGUF 值类型 {value_type}（位置 {self.pos}）")
+
+    def skip_array(self, item_type, length):
+        """跳过数组内容：定长类型直接移动游标，字符串需要逐个读取长度"""
+        packer = SCALAR_STRUCTS.get(item_type)
+        if packer is not None:
+            self.pos += packer.size * length
+            self.source.ensure(self.pos)
+        elif item_type == STRING:
+            for _ in range(length):
+                string_length = self.unpack(U64)
+                self.pos += string_length
+            self.source.ensure(self.pos)
+        else:
+            for _ in range(length):
+                self.value(item_type, max_array_length=0)
+
+
+def read_metadata(source, architecture_only=False, max_array_length=MAX_ARRAY_LENGTH):
+    """
+    解析 GGUF 文件头和元数据键值对，返回 {"version", "tensor_count", "metadata", "metadata_bytes"}，
+    metadata_bytes 为实际解析到的位置。architecture_only 为 True 时，读到全部架构字段、
+    或在架构字段之后遇到 tokenizer.* 键（llama.cpp 按 general.*、架构、tokenizer 的顺序写入）时提前停止，
+    这样远程读取时不会下载体积较大的词表
+    """
+    cursor = _Cursor(source)
+    magic = bytes(source.ensure(4)[:4])
+    if magic != GGUF_MAGIC:
+        raise ValueError(f"不是 GGUF 文件（魔数 {magic!r}）")
+    cursor.pos = 4
+    version = cursor.unpack(U32)
+    if version not in (2, 3):
+        raise ValueError(f"不支持的 GGUF 版本 {version}（只支持小端的版本 2、3）")
+    tensor_count = cursor.unpack(U64)
+    kv_count = cursor.unpack(U64)
+
+    metadata = {}
+    for _ in range(kv_count):
+        key = cursor.string()
+        value_type = cursor.unpack(U32)
+        if architecture_only and key.startswith("tokenizer.") and _has_required_fields(metadata):
+            break
+        metadata[key] = cursor.value(value_type, max_array_length)
+        if architecture_only and _has_all_fields(metadata):
+            break
+    return {"version": version, "tensor_count": tensor_count, "metadata": metadata, "metadata_bytes": cursor.pos}
+
+
+def _arch_keys(metadata, keys):
+    arch = metadata.get("general.architecture")
+    return [f"{arch}.{key}" for key in keys] if arch else None
+
+
+def _has_required_fields(metadata):
+    keys = _arch_keys(metadata, REQUIRED_ARCH_KEYS)
+    return keys is not None and all(key in metadata for key in keys)
+
+
+def _has_all_fields(metadata):
+    keys = _arch_keys(metadata, REQUIRED_ARCH_KEYS + OPTIONAL_ARCH_KEYS)
+    return keys is not None and all(key in metadata for key in keys)
+
+
+def _per_layer_mean(value):
+    """部分架构按层给出头数（数组），KV cache 计算只需要各层平均值"""
+    if isinstance(value, list):
+        return sum(value) / len(value) if value else None
+    return value
+
+
+def architecture_fields(metadata):
+    """
+    从元数据中提取显存估算需要的架构字段：architecture、context_length、num_layers、hidden_size、
+    head_count、head_count_kv、key_length、value_length、feed_forward_length、file_type，
+    以及 kv_values_per_token（每个 token 在所有层中 K 与 V 的元素个数）。缺少必需字段时返回 None
+    """
+    arch = metadata.get("general.architecture")
+    if not arch or not _has_required_fields(metadata):
+        return None
+    head_count = _per_layer_mean(metadata[f"{arch}.attention.head_count"])
+    head_count_kv = _per_layer_mean(metadata.get(f"{arch}.attention.head_count_kv", head_count))
+    hidden_size = metadata[f"{arch}.embedding_length"]
+    key_length = metadata.get(f"{arch}.attention.key_length") or hidden_size // max(1, int(head_count))
+    value_length = metadata.get(f"{arch}.attention.value_length") or key_length
+    num_layers = metadata[f"{arch}.block_count"]
+    return {
+        "architecture": arch,
+        "context_length": metadata[f"{arch}.context_length"],
+        "num_layers": num_layers,
+        "hidden_size": hidden_size,
+        "head_count": head_count,
+        "head_count_kv": head_count_kv,
+        "key_length": key_length,
+        "value_length": value_length,
+        "feed_forward_length": _per_layer_mean(metadata.get(f"{arch}.feed_forward_length")),
+        "file_type": metadata.get("general.file_type"),
+        "kv_values_per_token": num_layers * head_count_kv * (key_length + value_length),
+    }
+
+
+def read_architecture(location, get=None):
+    """读取本地路径或 http(s) URL 处 GGUF 文件的架构字段，返回 (字段, 读取的字节数)"""
+    remote = str(location).startswith(("http://", "https://"))
+    source = RangeSource(location, get=get) if remote else MmapSource(location)
+    try:
+        result = read_metadata(source, architecture_only=True)
+        bytes_read = len(source.buffer) if remote else result["metadata_bytes"]
+    finally:
+        source.close()
+    fields = architecture_fields(result["metadata"])
+    if fields is None:
+        raise ValueError(f"{location} 的元数据中没有完整的架构字段")
+    return fields, bytes_read
+
+
+def write_gguf(metadata, tensor_count=0, padding=0):
+    """
+    生成只包含元数据的 GGUF（版本 3）字节串，用于测试和替身服务。
+    值的类型按 Python 类型推断：bool、int（UINT32，超出范围时 UINT64）、float（FLOAT32）、str 和同类元素的 list；
+    padding 为追加在末尾的零字节数，用来模拟张量数据
+    """
+    def encode_string(text):
+        data = text.encode("utf-8")
+        return U64.pack(len(data)) + data
+
+    def value_type(value):
+        if isinstance(value, bool):
+            return BOOL
+        if isinstance(value, int):
+            return UINT32 if 0 <= value < 2 ** 32 else INT64 if value < 0 else UINT64
+        if isinstance(value, float):
+            return FLOAT32
+        if isinstance(value, str):
+            return STRING
+        if isinstance(value, list):
+            return ARRAY
+        raise TypeError(f"无法写入 GGUF 的值类型: {type(value).__name__}")
+
+    def encode_value(value_type_id, value):
+        if value_type_id == STRING:
+            return encode_string(value)
+        if value_type_id == ARRAY:
+            item_type = value_type(value[0]) if value else UINT32
+            if item_type == UINT32 and any(isinstance(item, int) and item >= 2 ** 32 for item in value):
+                item_type = UINT64
+            return (U32.pack(item_type) + U64.pack(len(value))
+                    + b"".join(encode_value(item_type, item) for item in value))
+        return SCALAR_STRUCTS[value_type_id].pack(value)
+
+    parts = [GGUF_MAGIC, U32.pack(3), U64.pack(tensor_count), U64.pack(len(metadata))]
+    for key, value in metadata.items():
+        type_id = value_type(value)
+        parts.append(encode_string(key) + U32.pack(type_id) + encode_value(type_id, value))
+    parts.append(b"\x00" * padding)
+    return b"".join(parts)
+
+
+def synthetic_metadata(arch, hidden_size, num_layers, head_count=None, head_count_kv=None,
+                       context_length=32768, vocab_size=1024):
+    """按给定结构生成一份与 llama.cpp 写入顺序一致的元数据（general.*、架构字段、tokenizer.*）"""
+    head_count = head_count or max(1, hidden_size // 128)
+    head_count_kv = head_count_kv or max(1, head_count // 4)
+    return {
+        "general.architecture": arch,
+        "general.name": f"synthetic-{arch}",
+        "general.file_type": 15,
+        f"{arch}.context_length": context_length,
+        f"{arch}.block_count": num_layers,
+        f"{arch}.embedding_length": hidden_size,
+        f"{arch}.feed_forward_length": hidden_size * 4,
+        f"{arch}.attention.head_count": head_count,
+        f"{arch}.attention.head_count_kv": head_count_kv,
+        f"{arch}.rope.freq_base": 1000000.0,
+        "tokenizer.ggml.model": "gpt2",
+        "tokenizer.ggml.tokens": [f"<token_{i}>" for i in range(vocab_size)],
+        "tokenizer.ggml.token_type": [1] * vocab_size,
+    }
+
+
+def save_architectures(architectures, path=DEFAULT_ARCHITECTURES_PATH):
+    """按 model_id 排序写回架构字段文件（先写临时文件再替换）"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(architectures.items())), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fetch_architectures(config_path="config.json", models_dir=None, families=None, known=None, workers=4, get=None):
+    """
+    为目录中尚未记录的每个 model_id 读取一次 registry 中模型层 blob 的 GGUF 头：
+    先读取标签的 manifest 得到模型层摘要，再用 Range 请求读取元数据。
+    返回 ({model_id: 字段}, 统计信息)，统计信息包括读取的 blob 数、总字节数和失败数。
+    registry 中的 model_id 与目录中的不同时，字段同时记录在两个 model_id 下，
+    目录中的 model_id 因此被视为已读取，重新抓取模型数据之前不会每次运行都再读一遍
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if get is None:
+        # Range 响应不能经过按 URL 缓存整个正文的 HttpCache
+        client = HttpClient.from_config(config.get("crawl"))
+
+        def get(url, headers):
+            # Range 请求以流式读取，RangeSource 检查状态码和 Content-Range 后才读取正文
+            response = client.get(url, headers=headers, stream="Range" in headers)
+            if response.status_code >= 400 and response.status_code != 416:
+                response.close()
+                response.raise_for_status()
+            return response
+
+    registry = RegistryClient(get, config.get("registry", {}).get("base_url", DEFAULT_REGISTRY_URL))
+    known = known or {}
+    pending = {}
+    for model_config, models in load_catalog(config_path, models_dir):
+        if families and model_config["name"] not in families:
+            continue
+        name = registry_name(model_config)
+        for model in models:
+            model_id = model.get("model_id")
+            if model_id and model_id not in known and model_id not in pending:
+                pending[model_id] = (name, model["model"].rsplit(":", 1)[-1])
+
+    stats = {"blobs": 0, "bytes": 0, "failures": 0}
+
+    def fetch(item):
+        model_id, (name, tag) = item
+        try:
+            manifest = registry.fetch_manifest(name, tag)
+            if not manifest.get("model_digest"):
+                raise ValueError("manifest 中没有模型层")
+            fields, bytes_read = read_architecture(registry.blob_url(name, manifest["model_digest"]), get=get)
+        except Exception as e:
+            logger.warning(f"读取 {name}:{tag} 的 GGUF 元数据失败: {e}")
+            return None
+        if manifest["model_id"] != model_id:
+            logger.warning(f"{name}:{tag} 的 model_id 已变化（{model_id} -> {manifest['model_id']}），请重新抓取模型数据")
+        logger.debug(f"{name}:{tag}: 读取 {bytes_read} 字节")
+        return model_id, manifest["model_id"], fields, bytes_read
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for result in executor.map(fetch, pending.items()):
+            if result is None:
+                stats["failures"] += 1
+                continue
+            model_id, registry_model_id, fields, bytes_read = result
+            results[model_id] = fields
+            results[registry_model_id] = fields
+            stats["blobs"] += 1
+            stats["bytes"] += bytes_read
+    return results, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取 GGUF 文件头中的模型架构信息")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    inspect_parser = subparsers.add_parser("inspect", help="显示本地文件或 URL 的 GGUF 元数据")
+    inspect_parser.add_argument("location", help="本地 GGUF 文件路径或 http(s) URL（使用 Range 请求）")
+    inspect_parser.add_argument("--all", action="store_true", help="显示全部元数据（默认只读取架构字段）")
+
+    fetch_parser = subparsers.add_parser("fetch", help="从 registry 读取目录中每个 model_id 的架构字段")
+    fetch_parser.add_argument("--config", default="config.json")
+    fetch_parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    fetch_parser.add_argument("--family", action="append", help="只处理指定名称的模型家族，可重复")
+    fetch_parser.add_argument("--output", default=DEFAULT_ARCHITECTURES_PATH, help="按 model_id 保存架构字段的 JSON 文件")
+    fetch_parser.add_argument("--workers", type=int, default=4)
+    fetch_parser.add_argument("--refresh", action="store_true", help="重新读取已记录的 model_id")
+
+    synth_parser = subparsers.add_parser("synthesize", help="生成只包含元数据的合成 GGUF 文件，用于测试")
+    synth_parser.add_argument("output")
+    synth_parser.add_argument("--arch", default="llama")
+    synth_parser.add_argument("--hidden", type=int, default=4096)
+    synth_parser.add_argument("--layers", type=int, default=32)
+    synth_parser.add_argument("--heads", type=int, default=32)
+    synth_parser.add_argument("--kv-heads", type=int, default=8)
+    synth_parser.add_argument("--context", type=int, default=32768)
+    synth_parser.add_argument("--vocab", type=int, default=32000)
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        if args.all:
+            remote = args.location.startswith(("http://", "https://"))
+            source = RangeSource(args.location) if remote else MmapSource(args.location)
+            try:
+                result = read_metadata(source)
+            finally:
+                source.close()
+            print(f"GGUF v{result['version']}，{result['tensor_count']} 个张量，元数据 {result['metadata_bytes']} 字节")
+            for key, value in result["metadata"].items():
+                print(f"  {key} = {value}")
+            return
+        fields, bytes_read = read_architecture(args.location)
+        print(f"读取 {bytes_read} 字节")
+        for key, value in fields.items():
+            print(f"  {key:<22} {value}")
+        return
+
+    if args.command == "synthesize":
+        metadata = synthetic_metadata(args.arch, args.hidden, args.layers, args.heads, args.kv_heads,
+                                      args.context, args.vocab)
+        with open(args.output, "wb") as f:
+            f.write(write_gguf(metadata))
+        print(f"已生成 {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+        return
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        logging_config = json.load(f).get("logging", {})
+    setup_logging(logging_config.get("level", "INFO"), json_format=logging_config.get("json", False))
+    known = {} if args.refresh else load_architectures(args.output)
+    results, stats = fetch_architectures(args.config, args.models_dir, args.family, known, args.workers)
+    known.update(results)
+    save_architectures(known, args.output)
+    logger.info(f"读取 {stats['blobs']} 个模型文件的元数据，共 {stats['bytes'] / 1024:.1f} KB，失败 {stats['failures']} 个；"
+                f"{args.output} 中共有 {len(known)} 个 model_id")
+
+
+if __name__ == "__main__":
+    main()
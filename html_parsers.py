@@ -0,0 +1,245 @@
+import logging
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # lxml 已列在 requirements.txt 中，未安装时回退到 html.parser
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# 抓取时真正需要的页面区域，其余节点在 strainer 模式下不会被构建
+TARGET_STRAINERS = {
+    # 主页面下拉列表中的默认模型
+    "default_models": SoupStrainer("nav", id="tags-nav"),
+    # tags 页面中的每一行模型
+    "tag_rows": SoupStrainer("div", class_="flex px-4 py-3"),
+    # 详情页中的模型信息区域和描述
+    "model_info": SoupStrainer(
+        "div", class_=["min-w-full divide-y divide-gray-200", "prose dark:prose-invert"]
+    ),
+}
+
+# BeautifulSoup 的 get_text 不包含这些元素中的文本
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+class SoupExtractor:
+    """
+    基于 BeautifulSoup 的页面提取器。
+    strain 为 True 时使用 SoupStrainer 只构建目标区域的节点；features 可以是 html.parser 或 lxml
+    """
+
+    def __init__(self, features="html.parser", strain=False):
+        self.features = features
+        self.strain = strain
+        self.name = f"bs4:{features}{'+strainer' if strain else ''}"
+
+    def soup(self, html, target=None):
+        """解析页面，target 为 TARGET_STRAINERS 中的键时只保留对应区域"""
+        if self.strain and target is not None:
+            return BeautifulSoup(html, self.features, parse_only=TARGET_STRAINERS[target])
+        return BeautifulSoup(html, self.features)
+
+    def default_models(self, html):
+        """返回主页面下拉列表中的默认模型名称（不含 View all 链接）"""
+        default_models = []
+        nav = self.soup(html, "default_models").find('nav', {'id': 'tags-nav'})
+        if nav:
+            for link in nav.find_all('a', href=True):
+                if '/tags' not in link['href']:  # 排除 "View all" 链接
+                    default_models.append(link.find('span', {'title': True})['title'])
+        return default_models
+
+    def tag_rows(self, html):
+        """
+        返回 tags 页面中的模型行，每行为 {"name", "href", "info_text"}，
+        没有链接的行为 None，没有信息区域时 info_text 为 None
+        """
+        rows = []
+        for div in self.soup(html, "tag_rows").find_all('div', class_='flex px-4 py-3'):
+            model_link = div.find('a')
+            if not model_link:
+                rows.append(None)
+                continue
+
+            raw_model_name_tag = model_link.find('div', class_='break-all')
+            if raw_model_name_tag:
+                raw_model_name = raw_model_name_tag.get_text(strip=True)
+            else:
+                raw_model_name = model_link.get_text(strip=True)
+
+            info_text = None
+            info_div = div.find('div', class_='flex items-baseline space-x-1 text-[13px] text-neutral-500')
+            if info_div:
+                span_tag = info_div.find('span')
+                if span_tag:
+                    info_text = span_tag.get_text(strip=True)
+
+            rows.append({
+                "name": raw_model_name,
+                "href": model_link.get('href', ''),
+                "info_text": info_text,
+            })
+        return rows
+
+    def model_info(self, html):
+        """返回详情页信息区域中的 (小写标签, 值) 列表和描述文本（没有时为 None）"""
+        soup = self.soup(html, "model_info")
+        items = []
+        model_info_div = soup.find('div', class_='min-w-full divide-y divide-gray-200')
+        if model_info_div:
+            for item in model_info_div.find_all('div', class_='flex sm:space-x-2 items-center'):
+                label = item.find('span', class_='hidden sm:block')
+                value = item.find('span', class_='text-neutral-400')
+                if label and value:
+                    items.append((label.get_text(strip=True).lower(), value.get_text(strip=True)))
+
+        description = None
+        desc_div = soup.find('div', class_='prose dark:prose-invert')
+        if desc_div:
+            description = desc_div.get_text(strip=True)
+        return items, description
+
+
+def _has_class(class_name):
+    """XPath 条件：class 列表中包含 class_name（对应 BeautifulSoup 的单个类名匹配）"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def _class_is(class_value):
+    """XPath 条件：class 属性整体等于 class_value（对应 BeautifulSoup 的多类名字符串匹配）"""
+    return f"normalize-space(@class)='{class_value}'"
+
+
+def _first(element, xpath):
+    """按文档顺序返回第一个匹配的节点，没有时返回 None"""
+    matches = element.xpath(f"({xpath})[1]")
+    return matches[0] if matches else None
+
+
+def _text(element):
+    """与 BeautifulSoup get_text(strip=True) 相同：拼接去除首尾空白后的文本，跳过注释和脚本"""
+    parts = []
+
+    def walk(node):
+        if not isinstance(node.tag, str) or node.tag in NON_TEXT_TAGS:
+            return
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(element)
+    return "".join(part.strip() for part in parts if part.strip())
+
+
+class LxmlExtractor:
+    """
+    基于 lxml.html 与 XPath 的快速提取器，只读取目标区域，不构建 BeautifulSoup 对象，
+    结果与 SoupExtractor 一致。soup() 供其余页面使用，返回 lxml 解析的 BeautifulSoup
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        self.soup_extractor = SoupExtractor("lxml", strain=True)
+
+    def soup(self, html, target=None):
+        return self.soup_extractor.soup(html, target)
+
+    def _document(self, html):
+        if not html or not html.strip():
+            return None
+        return lxml.html.document_fromstring(html)
+
+    def default_models(self, html):
+        default_models = []
+        document = self._document(html)
+        if document is None:
+            return default_models
+        nav = _first(document, ".//nav[@id='tags-nav']")
+        if nav is not None:
+            for link in nav.xpath(".//a[@href]"):
+                if '/tags' not in link.get('href'):
+                    span = _first(link, ".//span[@title]")
+                    if span is None:
+                        raise TypeError(f"默认模型链接缺少 title: {link.get('href')}")
+                    default_models.append(span.get('title'))
+        return default_models
+
+    def tag_rows(self, html):
+        rows = []
+        document = self._document(html)
+        if document is None:
+            return rows
+        for div in document.xpath(f".//div[{_class_is('flex px-4 py-3')}]"):
+            model_link = _first(div, ".//a")
+            if model_link is None:
+                rows.append(None)
+                continue
+
+            raw_model_name_tag = _first(model_link, f".//div[{_has_class('break-all')}]")
+            if raw_model_name_tag is not None:
+                raw_model_name = _text(raw_model_name_tag)
+            else:
+                raw_model_name = _text(model_link)
+
+            info_text = None
+            info_div = _first(
+                div, f".//div[{_class_is('flex items-baseline space-x-1 text-[13px] text-neutral-500')}]"
+            )
+            if info_div is not None:
+                span_tag = _first(info_div, ".//span")
+                if span_tag is not None:
+                    info_text = _text(span_tag)
+
+            rows.append({
+                "name": raw_model_name,
+                "href": model_link.get('href', ''),
+                "info_text": info_text,
+            })
+        return rows
+
+    def model_info(self, html):
+        items = []
+        description = None
+        document = self._document(html)
+        if document is None:
+            return items, description
+
+        model_info_div = _first(document, f".//div[{_class_is('min-w-full divide-y divide-gray-200')}]")
+        if model_info_div is not None:
+            for item in model_info_div.xpath(f".//div[{_class_is('flex sm:space-x-2 items-center')}]"):
+                label = _first(item, f".//span[{_class_is('hidden sm:block')}]")
+                value = _first(item, f".//span[{_has_class('text-neutral-400')}]")
+                if label is not None and value is not None:
+                    items.append((_text(label).lower(), _text(value)))
+
+        desc_div = _first(document, f".//div[{_class_is('prose dark:prose-invert')}]")
+        if desc_div is not None:
+            description = _text(desc_div)
+        return items, description
+
+
+def get_html_parser(backend="html.parser"):
+    """
+    根据名称创建页面提取器：
+      - html.parser: BeautifulSoup + html.parser 构建完整文档树（默认）
+      - strainer: BeautifulSoup + SoupStrainer，只构建目标区域（安装了 lxml 时使用 lxml 解析）
+      - lxml: lxml.html + XPath 直接提取，不构建 BeautifulSoup 对象
+    未安装 lxml 时，lxml 回退到 strainer（html.parser）
+    """
+    if backend == "html.parser":
+        return SoupExtractor("html.parser")
+    if backend == "strainer":
+        return SoupExtractor("lxml" if lxml is not None else "html.parser", strain=True)
+    if backend == "lxml":
+        if lxml is None:
+            logger.warning("未安装 lxml，使用 html.parser + SoupStrainer 解析页面")
+            return SoupExtractor("html.parser", strain=True)
+        return LxmlExtractor()
+    raise ValueError(f"未知的 HTML 解析后端: {backend}")
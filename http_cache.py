@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+import requests
+
+# 会选择同一 URL 不同表示的请求头，参与缓存键的计算
+VARY_HEADERS = ("Accept", "Accept-Language")
+
+
+class CacheMissError(requests.exceptions.RequestException):
+    """离线（仅缓存）模式下请求的 URL 不在缓存中"""
+
+
+class HttpCache:
+    """
+    以 URL（以及 VARY_HEADERS 中的请求头）为键的磁盘 HTTP 缓存。
+
+    每个键对应两个文件：<sha256>.body 保存响应正文，<sha256>.json 保存 URL、
+    ETag、Last-Modified、编码和写入时间等元数据。带 Range 的请求只返回部分正文，不经过缓存。缓存未过期（ttl_seconds 内）时直接
+    返回缓存内容；过期后带 If-None-Match / If-Modified-Since 重新验证，服务器返回 304
+    时继续使用缓存正文。总大小超过 max_size_bytes 时按最近访问时间淘汰（LRU）。
+    offline 为 True 时不访问网络，缓存缺失直接抛出 CacheMissError，
+    因此缓存目录也可以当作可重放的测试数据使用。
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=3600, max_size_bytes=256 * 1024 * 1024, offline=False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.index = None  # key -> [正文大小, 最近访问时间]
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0, "bypassed": 0}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, cache_config):
+        """根据 config.json 中的 http_cache 配置创建缓存，未启用时返回 None"""
+        if not cache_config or not cache_config.get("enabled", False):
+            return None
+        return cls(
+            cache_config.get("dir", ".cache/http"),
+            ttl_seconds=cache_config.get("ttl_seconds", 3600),
+            max_size_bytes=int(cache_config.get("max_size_mb", 256) * 1024 * 1024),
+            offline=cache_config.get("offline", False),
+        )
+
+    @staticmethod
+    def _vary(headers):
+        """返回请求头中属于 VARY_HEADERS 的部分（名称按 VARY_HEADERS 的写法）"""
+        lowered = {name.lower(): value for name, value in (headers or {}).items()}
+        return {name: lowered[name.lower()] for name in VARY_HEADERS if name.lower() in lowered}
+
+    def _key(self, url, headers=None):
+        """没有 VARY_HEADERS 请求头时只按 URL 计算，与旧的缓存目录和录制的 fixtures 兼容"""
+        vary = self._vary(headers)
+        text = f"{url}\n{json.dumps(vary, sort_keys=True)}" if vary else url
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def _load_index(self):
+        """首次使用时扫描缓存目录，建立 LRU 索引（调用方需持有锁）"""
+        if self.index is not None:
+            return
+        self.index = {}
+        for meta_path in self.cache_dir.glob("*.json"):
+            body_path = meta_path.with_suffix(".body")
+            try:
+                stat = body_path.stat()
+            except OSError:
+                continue
+            self.index[meta_path.stem] = [stat.st_size, stat.st_mtime]
+
+    def lookup(self, url, headers=None):
+        """返回 (元数据, 正文)，不存在时返回 (None, None)"""
+        body_path, meta_path = self._paths(self._key(url, headers))
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        if meta.get("url") != url or meta.get("vary", {}) != self._vary(headers):
+            return None, None
+        return meta, body
+
+    def entries(self):
+        """遍历缓存中的所有条目，返回 (url, 元数据, 正文)"""
+        for meta_path in sorted(self.cache_dir.glob("*.json")):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                with open(meta_path.with_suffix(".body"), "rb") as f:
+                    body = f.read()
+            except (OSError, ValueError):
+                continue
+            yield meta["url"], meta, body
+
+    def is_fresh(self, meta):
+        """判断缓存条目是否仍在 TTL 内，ttl_seconds 为 None 时永不过期"""
+        if self.ttl_seconds is None:
+            return True
+        return time.time() - meta.get("stored_at", 0) < self.ttl_seconds
+
+    def store(self, url, response, headers=None):
+        """保存 200 响应的正文和验证信息，headers 为请求头"""
+        key = self._key(url, headers)
+        body_path, meta_path = self._paths(key)
+        meta = {
+            "url": url,
+            "vary": self._vary(headers),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type"),
+            "encoding": response.encoding,
+            "stored_at": time.time(),
+        }
+        self._write_atomic(body_path, response.content)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        with self.lock:
+            self._load_index()
+            self.index[key] = [len(response.content), time.time()]
+            self.stats["stored"] += 1
+            self._evict()
+
+    def refresh(self, url, meta, response, headers=None):
+        """304 重新验证成功后更新写入时间和验证信息"""
+        meta = dict(meta)
+        meta["stored_at"] = time.time()
+        meta["etag"] = response.headers.get("ETag") or meta.get("etag")
+        meta["last_modified"] = response.headers.get("Last-Modified") or meta.get("last_modified")
+        _, meta_path = self._paths(self._key(url, headers))
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        return meta
+
+    def _touch(self, url, headers=None):
+        """记录一次访问，用于 LRU 淘汰"""
+        key = self._key(url, headers)
+        body_path, _ = self._paths(key)
+        now = time.time()
+        try:
+            os.utime(body_path, (now, now))
+        except OSError:
+            return
+        with self.lock:
+            self._load_index()
+            if key in self.index:
+                self.index[key][1] = now
+
+    def _evict(self):
+        """总大小超过上限时删除最久未访问的条目（调用方需持有锁）"""
+        if not self.max_size_bytes:
+            return
+        total = sum(size for size, _ in self.index.values())
+        if total <= self.max_size_bytes:
+            return
+        for key, (size, _) in sorted(self.index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            del self.index[key]
+            total -= size
+            self.stats["evicted"] += 1
+
+    def _write_atomic(self, path, data):
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _build_response(self, url, meta, body):
+        """用缓存内容构造 requests.Response，调用方可以像处理网络响应一样使用"""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.encoding = meta.get("encoding") or "utf-8"
+        if meta.get("content_type"):
+            response.headers["Content-Type"] = meta["content_type"]
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    def fetch(self, url, send, revalidate=False, headers=None):
+        """
+        获取 url 的响应。send(extra_headers) 负责实际发送网络请求，
+        extra_headers 中包含条件请求头。revalidate 为 True 时即使缓存未过期也发送条件请求
+        （离线模式除外），用于内容可能在 TTL 内变化、又必须是最新的页面。
+        headers 为本次请求的请求头：VARY_HEADERS 参与缓存键，带 Range 的请求直接发送且不保存
+        """
+        if any(name.lower() == "range" for name in (headers or {})):
+            with self.lock:
+                self.stats["bypassed"] += 1
+            if self.offline:
+                raise CacheMissError(f"离线模式下不能发送 Range 请求: {url}")
+            return send({})
+
+        meta, body = self.lookup(url, headers)
+        if meta is not None and (self.offline or (self.is_fresh(meta) and not revalidate)):
+            self._touch(url, headers)
+            with self.lock:
+                self.stats["hits"] += 1
+            return self._build_response(url, meta, body)
+
+        if self.offline:
+            with self.lock:
+                self.stats["misses"] += 1
+            raise CacheMissError(f"离线模式下缓存中没有 {url}")
+
+        conditional_headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                conditional_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = send(conditional_headers)
+        if response.status_code == 304 and meta is not None:
+            meta = self.refresh(url, meta, response, headers)
+            self._touch(url, headers)
+            with self.lock:
+                self.stats["revalidated"] += 1
+            return self._build_response(url, meta, body)
+
+        with self.lock:
+            self.stats["misses"] += 1
+        if response.status_code == 200:
+            self.store(url, response, headers)
+        return response
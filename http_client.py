@@ -0,0 +1,256 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawl_metrics import SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# 视为临时错误、需要重试的状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """线程安全的令牌桶，按固定速率补充令牌，桶容量决定允许的突发请求数"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取走一个令牌，令牌不足或处于 Retry-After 暂停期时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if now < self.blocked_until:
+                    wait_time = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def slow_down(self, retry_after=None, min_rate=0.1):
+        """收到 429 时速率减半，并在 retry_after 秒内暂停发放令牌"""
+        with self.lock:
+            self.rate = max(min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def speed_up(self):
+        """请求成功后逐步恢复到配置的速率"""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+class HostRateLimiter:
+    """
+    按主机名分配令牌桶的限速器，requests_per_second <= 0 表示不限速。
+    不限速的主机在收到 429 后也会按 fallback_rate 建立令牌桶，之后自适应降速
+    """
+
+    def __init__(self, requests_per_second, burst=None, fallback_rate=1.0):
+        self.requests_per_second = float(requests_per_second)
+        self.burst = burst
+        self.fallback_rate = fallback_rate
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, url, create):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None and create:
+                rate = self.requests_per_second if self.requests_per_second > 0 else self.fallback_rate
+                bucket = TokenBucket(rate, self.burst)
+                self.buckets[host] = bucket
+            return bucket
+
+    def wait(self, url):
+        """在向 url 所在主机发送请求前调用"""
+        bucket = self._bucket(url, create=self.requests_per_second > 0)
+        if bucket is not None:
+            bucket.acquire()
+
+    def slow_down(self, url, retry_after=None):
+        """主机返回 429 时调用"""
+        self._bucket(url, create=True).slow_down(retry_after)
+
+    def speed_up(self, url):
+        """主机请求成功时调用"""
+        bucket = self._bucket(url, create=False)
+        if bucket is not None:
+            bucket.speed_up()
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头，支持秒数和 HTTP 日期两种格式，无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HttpClient:
+    """
+    ModelProcessor 共享的 HTTP 客户端：单个带连接池的 requests.Session（保持长连接），
+    连接错误、超时和 429/5xx 按带抖动的指数退避重试，429 的 Retry-After 会让对应主机降速。
+    传入 HttpCache 时，网络请求经由缓存发出；传入 CrawlMetrics 时记录每次请求的耗时、
+    响应大小和状态码，以及重试、限速/退避等待时间和缓存命中，按 family 标签分别累计
+    """
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_base=0.5, backoff_max=30.0,
+                 timeout=30.0, rate_limiter=None, cache=None, headers=None, verify=False, metrics=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or HostRateLimiter(0)
+        self.cache = cache
+        self.metrics = metrics
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+        self.stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_config(cls, crawl_config, cache=None, metrics=None):
+        """根据 config.json 中的 crawl 配置创建客户端"""
+        crawl_config = crawl_config or {}
+        return cls(
+            pool_size=int(crawl_config.get("pool_size", 10)),
+            max_retries=int(crawl_config.get("max_retries", 3)),
+            backoff_base=float(crawl_config.get("backoff_base_seconds", 0.5)),
+            backoff_max=float(crawl_config.get("backoff_max_seconds", 30)),
+            timeout=float(crawl_config.get("timeout_seconds", 30)),
+            cache=cache,
+            metrics=metrics,
+        )
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def backoff_delay(self, attempt):
+        """第 attempt 次重试前的等待时间：指数增长并加入随机抖动"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _send(self, url, headers, rate_limiter, family, stream=False):
+        """
+        发送请求，对临时错误重试，返回最后一次响应；重试耗尽仍为网络异常时抛出。
+        stream 为 True 时不预先读取正文，需要重试的响应直接关闭
+        """
+        rate_limiter = rate_limiter or self.rate_limiter
+        metrics = self.metrics
+        for attempt in range(self.max_retries + 1):
+            waited_at = time.perf_counter()
+            rate_limiter.wait(url)
+            started_at = time.perf_counter()
+            self._count("requests")
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                reason = e.__class__.__name__
+                if metrics is not None:
+                    self._record(family, reason, started_at, waited_at, None)
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"请求 {url} 失败 ({reason})，{delay:.1f} 秒后重试",
+                               extra={"url": url, "family": family, "reason": reason, "delay": delay})
+            else:
+                reason = response.status_code
+                if metrics is not None:
+                    self._record(family, reason, started_at, waited_at, response, stream)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    rate_limiter.speed_up(url)
+                    return response
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    return response
+                delay = self.backoff_delay(attempt)
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    rate_limiter.slow_down(url, retry_after)
+                    if retry_after is not None:
+                        delay = max(delay, min(retry_after, self.backoff_max))
+                response.close()
+                logger.warning(f"请求 {url} 返回 {response.status_code}，{delay:.1f} 秒后重试",
+                               extra={"url": url, "family": family, "status": response.status_code, "delay": delay})
+            self._count("retries")
+            if metrics is not None:
+                metrics.inc("retries_total", family=family or "", reason=str(reason))
+                metrics.inc("wait_seconds_total", delay, family=family or "", reason="backoff")
+            time.sleep(delay)
+
+    def _record(self, family, status, started_at, waited_at, response, stream=False):
+        """记录一次请求的限速等待、网络耗时、状态码和响应大小；流式响应的大小取自 Content-Length"""
+        family = family or ""
+        elapsed = time.perf_counter() - started_at
+        self.metrics.inc("wait_seconds_total", started_at - waited_at, family=family, reason="rate_limit")
+        self.metrics.inc("requests_total", family=family, status=str(status))
+        self.metrics.observe("request_seconds", elapsed, family=family)
+        if response is not None:
+            size = int(response.headers.get("Content-Length", 0)) if stream else len(response.content)
+            self.metrics.observe("response_bytes", size, buckets=SIZE_BUCKETS, family=family)
+
+    def get(self, url, headers=None, rate_limiter=None, family=None, revalidate=False, stream=False):
+        """
+        GET 请求，返回 requests.Response，是否 raise_for_status 由调用方决定。
+        family 为指标中的模型家族标签；revalidate 为 True 时缓存未过期也向服务器发送条件请求；
+        stream 为 True 时正文在读取 .content 时才下载，调用方负责关闭响应
+        """
+        headers = {**self.headers, **(headers or {})}
+        sent = []
+
+        def send(conditional_headers):
+            sent.append(url)
+            return self._send(url, {**headers, **conditional_headers}, rate_limiter, family, stream)
+
+        if self.cache is None:
+            return send({})
+        if self.metrics is None:
+            return self.cache.fetch(url, send, revalidate, headers)
+        result = "miss"
+        try:
+            response = self.cache.fetch(url, send, revalidate, headers)
+            if not sent:
+                result = "hit"
+            elif response.headers.get("X-Cache") == "HIT":
+                result = "revalidated"
+            return response
+        finally:
+            self.metrics.inc("cache_total", family=family or "", result=result)
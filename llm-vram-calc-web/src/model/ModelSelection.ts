@@ -2,21 +2,39 @@ import type { Config } from "../types/modelTypes";
 
 export class ModelSelection {
   private configUrl: string;
+  private fallbackUrl?: string;
 
-  constructor(configUrl: string) {
+  /**
+   * configUrl 通常为 web_export.py 生成的 manifest.json（分片文件名带内容哈希，显存已预先计算），
+   * 加载失败时使用 fallbackUrl（原有的 config.json 与逐家族 JSON）
+   */
+  constructor(configUrl: string, fallbackUrl?: string) {
     this.configUrl = configUrl;
+    this.fallbackUrl = fallbackUrl;
   }
 
   async loadConfig(): Promise<Config> {
     try {
-      const response = await fetch(this.configUrl);
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: Config = await response.json();
-      return data;
+      return await this.fetchConfig(this.configUrl);
     } catch (error) {
+      if (this.fallbackUrl) {
+        try {
+          return await this.fetchConfig(this.fallbackUrl);
+        } catch (fallbackError) {
+          throw new Error(`Failed to load config: ${fallbackError}`);
+        }
+      }
       throw new Error(`Failed to load config: ${error}`);
     }
   }
+
+  private async fetchConfig(url: string): Promise<Config> {
+    // manifest 本身不带哈希，需要每次向服务器确认是否更新
+    const response = await fetch(url, { cache: "no-cache" });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data: Config = await response.json();
+    return data;
+  }
 } 
\ No newline at end of file
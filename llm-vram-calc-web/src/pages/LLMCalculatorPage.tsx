@@ -288,6 +288,7 @@ interface ModelDetail {
   parameters: string; // 参数量
   quantization: string; // 量化方式
   quantization_info: string; // 量化信息
+  vram?: number; // web_export.py 预先计算的显存需求（GB）
   configName?: string; // 来自 config 的模型名称，用于匹配
 }
 
@@ -797,7 +798,10 @@ function LLMCalculatorPage() {
 
   // 加载配置
   useEffect(() => {
-    const modelSelection = new ModelSelection(`${process.env.PUBLIC_URL}/modeldata/config.json`);
+    const modelSelection = new ModelSelection(
+      `${process.env.PUBLIC_URL}/modeldata/bundle/manifest.json`,
+      `${process.env.PUBLIC_URL}/modeldata/config.json`
+    );
     setLoading(true); // 开始加载
     modelSelection.loadConfig()
       .then((data: Config) => {
@@ -924,10 +928,9 @@ function LLMCalculatorPage() {
         }
       })
       .map((detail) => {
-        const totalRequiredVram = calculateMemoryRequirement(
-          detail.file_size,
-          detail.quantization
-        );
+        const totalRequiredVram =
+          detail.vram ??
+          calculateMemoryRequirement(detail.file_size, detail.quantization);
 
         const { runStatus, statusText } = calculateRunStatus(totalRequiredVram);
 
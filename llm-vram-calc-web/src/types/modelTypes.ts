@@ -31,6 +31,8 @@ export interface ModelDetail {
   file_size: string;
   /** 模型的下载或详情 URL */
   url: string;
+  /** web_export.py 预先计算的显存需求（GB），与 calculateMemoryRequirement 一致 */
+  vram?: number;
 }
 
 export interface ModelConfig {
@@ -0,0 +1,200 @@
+import re
+import json
+import math
+from enum import Enum
+from pathlib import Path
+from urllib.parse import urlparse
+
+from ollama_registry import parse_file_size
+
+# gguf_reader.py 按 model_id 保存的 GGUF 架构字段
+DEFAULT_ARCHITECTURES_PATH = "modeldata/gguf_metadata.json"
+
+# 各量化格式每个权重的平均位数（llama.cpp 的块格式包含缩放因子，因此不是整数）
+BITS_PER_WEIGHT = {
+    "F32": 32.0, "F16": 16.0, "FP16": 16.0, "BF16": 16.0,
+    "Q8_0": 8.5,
+    "Q6_K": 6.56,
+    "Q5_K_M": 5.69, "Q5_K_S": 5.54, "Q5_0": 5.5, "Q5_1": 6.0,
+    "Q4_K_M": 4.85, "Q4_K_S": 4.58, "Q4_0": 4.5, "Q4_1": 5.0,
+    "Q3_K_L": 4.27, "Q3_K_M": 3.91, "Q3_K_S": 3.5,
+    "Q2_K": 3.35,
+}
+
+
+class Quantization(Enum):
+    """模型文件的量化格式，值为详情页上的名称（大写）；无法识别的名称为 UNKNOWN"""
+
+    F32 = "F32"
+    F16 = "F16"
+    FP16 = "FP16"
+    BF16 = "BF16"
+    Q8_0 = "Q8_0"
+    Q6_K = "Q6_K"
+    Q5_K_M = "Q5_K_M"
+    Q5_K_S = "Q5_K_S"
+    Q5_0 = "Q5_0"
+    Q5_1 = "Q5_1"
+    Q4_K_M = "Q4_K_M"
+    Q4_K_S = "Q4_K_S"
+    Q4_0 = "Q4_0"
+    Q4_1 = "Q4_1"
+    Q3_K_L = "Q3_K_L"
+    Q3_K_M = "Q3_K_M"
+    Q3_K_S = "Q3_K_S"
+    Q2_K = "Q2_K"
+    UNKNOWN = ""
+
+    @classmethod
+    def parse(cls, text):
+        """不区分大小写地解析量化名称，例如 q4_K_M -> Quantization.Q4_K_M"""
+        try:
+            return cls((text or "").strip().upper())
+        except ValueError:
+            return cls.UNKNOWN
+
+    @property
+    def bits_per_weight(self):
+        """每个权重的平均位数，UNKNOWN 为 NaN"""
+        return BITS_PER_WEIGHT.get(self.value, math.nan)
+
+
+def parse_parameter_count(parameters):
+    """把详情页的参数量（例如 "494M"、"7.62B"）换算为参数个数，无法解析时返回 None"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMBT]?)\s*", parameters or "", re.IGNORECASE)
+    if not match:
+        return None
+    scale = {"": 1, "K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}[match.group(2).upper()]
+    return float(match.group(1)) * scale
+
+
+# 尺寸标签或标签名开头的模型尺寸，例如 "1.5B"、"7b-instruct-q8_0"
+SIZE_PATTERN = re.compile(r"\s*(\d+(?:\.\d+)?)b(?![a-z])", re.IGNORECASE)
+
+
+def parse_size_label(text):
+    """从尺寸标签或标签名开头解析模型尺寸（十亿参数），例如 "1.5B" -> 1.5；latest 等无法解析的名称返回 None"""
+    match = SIZE_PATTERN.match(text or "")
+    return float(match.group(1)) if match else None
+
+
+def family_tag_prefix(model_config):
+    """模型家族在 ollama 中的名称，例如 base_url https://ollama.com/library/qwen2.5 对应 qwen2.5"""
+    return urlparse(model_config["base_url"]).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class ModelRecord:
+    """
+    规范化的模型记录，加载时一次性解析所有数值字段：
+    file_size 为字节数，parameters 为参数个数，quantization 为 Quantization，
+    size_billions 为尺寸标签（或标签名）对应的十亿参数数。无法解析的数值为 None
+    """
+
+    __slots__ = (
+        "family", "name", "model", "url", "model_id", "is_default",
+        "file_size", "file_size_label", "parameters", "quantization", "quantization_info",
+        "arch", "size_label", "size_billions", "description",
+    )
+
+    def __init__(self, family, name, model, url="", model_id="", is_default=False,
+                 file_size=None, file_size_label="", parameters=None,
+                 quantization=Quantization.UNKNOWN, quantization_info="", arch="",
+                 size_label="", size_billions=None, description=""):
+        self.family = family
+        self.name = name
+        self.model = model
+        self.url = url
+        self.model_id = model_id
+        self.is_default = is_default
+        self.file_size = file_size
+        self.file_size_label = file_size_label
+        self.parameters = parameters
+        self.quantization = quantization
+        self.quantization_info = quantization_info
+        self.arch = arch
+        self.size_label = size_label
+        self.size_billions = size_billions
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data, family="", prefix=""):
+        """
+        由模型 JSON 中的一项创建记录。prefix 为模型家族在 ollama 中的名称，
+        name 为带前缀的完整标签（例如 qwen2.5:7b）；已带前缀的 model 不会重复添加
+        """
+        model = data.get("model", "")
+        if prefix and not model.startswith(f"{prefix}:"):
+            name = f"{prefix}:{model}"
+        else:
+            name = model
+        tag = name.rsplit(":", 1)[-1]
+        size_label = data.get("size_label") or ""
+        if not size_label:
+            size_match = SIZE_PATTERN.match(tag)
+            size_label = f"{size_match.group(1)}B" if size_match else ""
+        file_size_label = data.get("file_size", "")
+        return cls(
+            family=family,
+            name=name,
+            model=model,
+            url=data.get("url", ""),
+            model_id=data.get("model_id", ""),
+            is_default=bool(data.get("is_default", False)),
+            file_size=parse_file_size(file_size_label),
+            file_size_label=file_size_label,
+            parameters=parse_parameter_count(data.get("parameters")),
+            quantization=Quantization.parse(data.get("quantization")),
+            quantization_info=data.get("quantization_info", ""),
+            arch=data.get("arch", ""),
+            size_label=size_label,
+            size_billions=parse_size_label(size_label),
+            description=data.get("description", ""),
+        )
+
+    def to_dict(self):
+        """可直接序列化为 JSON 的字典，quantization 为量化名称"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["quantization"] = self.quantization.value
+        return data
+
+    def __repr__(self):
+        return (f"ModelRecord({self.name!r}, file_size={self.file_size}, "
+                f"quantization={self.quantization.value or None}, is_default={self.is_default})")
+
+
+def load_catalog(config_path="config.json", models_dir=None):
+    """读取 config.json 中配置的模型家族及其模型 JSON，返回 [(模型家族配置, 模型列表)]"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if models_dir is None:
+        models_dir = config.get("output_dirs", {}).get("cleaned", "modeldata/cleaned")
+    catalog = []
+    for model_config in config["models"]:
+        path = Path(models_dir) / model_config["output_file"]
+        if not path.exists():
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            catalog.append((model_config, json.load(f)))
+    return catalog
+
+
+def records_from_catalog(catalog):
+    """把 load_catalog 的结果转换为 ModelRecord 列表"""
+    return [
+        ModelRecord.from_dict(model, family=model_config["name"], prefix=family_tag_prefix(model_config))
+        for model_config, models in catalog
+        for model in models
+    ]
+
+
+def load_records(config_path="config.json", models_dir=None):
+    """读取整个模型目录并返回 ModelRecord 列表"""
+    return records_from_catalog(load_catalog(config_path, models_dir))
+
+
+def load_architectures(path=DEFAULT_ARCHITECTURES_PATH):
+    """读取 gguf_reader.py 保存的架构字段 {model_id: 字段}，文件不存在时返回空字典"""
+    if not Path(path).exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
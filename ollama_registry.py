@@ -0,0 +1,97 @@
+import json
+import hashlib
+from urllib.parse import urlparse
+
+DEFAULT_REGISTRY_URL = "https://registry.ollama.ai"
+MANIFEST_ACCEPT = "application/vnd.docker.distribution.manifest.v2+json"
+CONFIG_MEDIA_TYPE = "application/vnd.docker.container.image.v1+json"
+MODEL_LAYER_MEDIA_TYPE = "application/vnd.ollama.image.model"
+
+
+def format_file_size(num_bytes):
+    """
+    按 ollama.com 的显示方式格式化字节数（十进制单位，无空格，小于 10 时保留一位小数），
+    例如 531000000 -> "531MB"，9000000000 -> "9.0GB"，16000000000 -> "16GB"
+    """
+    for unit, scale in (("TB", 1000 ** 4), ("GB", 1000 ** 3), ("MB", 1000 ** 2), ("KB", 1000)):
+        if num_bytes >= scale:
+            value = num_bytes / scale
+            if value >= 10:
+                return f"{int(value)}{unit}"
+            return f"{value:.1f}{unit}"
+    return f"{num_bytes}B"
+
+
+def parse_file_size(file_size):
+    """把 "4.7GB"、"994MB" 这样的显示大小换算为字节数（十进制单位），无法解析时返回 None"""
+    units = {"B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+    text = (file_size or "").strip().upper().replace(" ", "")
+    for unit in ("TB", "GB", "MB", "KB", "B"):
+        if text.endswith(unit):
+            try:
+                return int(round(float(text[:-len(unit)]) * units[unit]))
+            except ValueError:
+                return None
+    return None
+
+
+def normalize_quantization(file_type):
+    """把 registry config 中的 file_type 转换为网页上的量化名称（大写，例如 q4_K_M -> Q4_K_M）"""
+    return (file_type or "").upper()
+
+
+def registry_name(model_config):
+    """
+    返回模型家族在 registry 中的仓库名，例如 base_url
+    https://ollama.com/library/qwen2.5 对应 library/qwen2.5，可用 registry_name 配置覆盖
+    """
+    if model_config.get("registry_name"):
+        return model_config["registry_name"]
+    path = urlparse(model_config["base_url"]).path.strip("/")
+    return path if "/" in path else f"library/{path}"
+
+
+class RegistryClient:
+    """
+    读取 Ollama registry 的 manifest 与 config blob。
+    get(url, headers) 负责发送请求并在失败时抛出异常，由 ModelProcessor 提供（共享连接池、限速和缓存）
+    """
+
+    def __init__(self, get, base_url=DEFAULT_REGISTRY_URL):
+        self.get = get
+        self.base_url = base_url.rstrip("/")
+
+    def manifest_url(self, name, tag):
+        return f"{self.base_url}/v2/{name}/manifests/{tag}"
+
+    def blob_url(self, name, digest):
+        return f"{self.base_url}/v2/{name}/blobs/{digest}"
+
+    def fetch_manifest(self, name, tag):
+        """
+        获取标签的 manifest，返回 model_id（manifest 摘要的前 12 位，与网页显示一致）、
+        file_size（所有层大小之和的显示值）、config_digest 和 model_digest（GGUF 模型层的摘要）
+        """
+        response = self.get(self.manifest_url(name, tag), {"Accept": MANIFEST_ACCEPT})
+        manifest = json.loads(response.content)
+        layers = manifest.get("layers", [])
+        model_layer = next((layer for layer in layers if layer.get("mediaType") == MODEL_LAYER_MEDIA_TYPE), {})
+        return {
+            "model_id": hashlib.sha256(response.content).hexdigest()[:12],
+            "file_size": format_file_size(sum(layer.get("size", 0) for layer in layers)),
+            "config_digest": manifest.get("config", {}).get("digest"),
+            "model_digest": model_layer.get("digest"),
+        }
+
+    def fetch_config(self, name, digest):
+        """获取 config blob，返回 arch、parameters 和 quantization"""
+        response = self.get(self.blob_url(name, digest), {})
+        config = json.loads(response.content)
+        details = {}
+        if config.get("model_family"):
+            details["arch"] = config["model_family"]
+        if config.get("model_type"):
+            details["parameters"] = config["model_type"]
+        if config.get("file_type"):
+            details["quantization"] = normalize_quantization(config["file_type"])
+        return details
@@ -0,0 +1,323 @@
+import json
+import argparse
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from catalog_compiler import DEFAULT_CATALOG_PATH, open_catalog
+from model_records import load_records
+from vram_estimator import VramEstimator
+
+# 每张卡可用于模型的显存比例（为 CUDA 上下文、显存碎片等预留余量）
+DEFAULT_UTILIZATION = 0.9
+# 张量并行时每张卡额外的通信缓冲（GB）
+TENSOR_PARALLEL_OVERHEAD_GB = 0.5
+# 精确求解的规模上限，超过时使用启发式装箱
+EXACT_MAX_INSTANCES = 14
+EXACT_MAX_GPUS = 12
+EXACT_MAX_STEPS = 200000
+
+
+def expand_fleet(fleet):
+    """
+    把 [{"name": "A100-80G", "vram_gb": 80, "count": 8, "node": "node-1"}] 形式的集群描述
+    展开为每张卡一项；node 缺省时每一组视为一台机器，张量并行只在同一台机器内进行
+    """
+    gpus = []
+    for group_index, group in enumerate(fleet):
+        node = group.get("node", f"{group.get('name', 'gpu')}-{group_index}")
+        for i in range(int(group.get("count", 1))):
+            gpus.append({
+                "id": f"{node}/{i}",
+                "name": group.get("name", "gpu"),
+                "node": node,
+                "vram_gb": float(group["vram_gb"]),
+            })
+    return gpus
+
+
+class PlacementPlanner:
+    """
+    多卡部署规划器：根据目录中的模型记录和 VramEstimator 的估算结果，把模型实例装箱到集群的 GPU 上。
+    单卡放得下的实例使用最佳适应递减（best-fit decreasing，按剩余显存有序表二分查找），
+    单卡放不下的实例在同一台机器内按 2、4、8... 路张量并行切分；
+    小规模问题可以使用精确求解（最少占用 GPU 数）
+    """
+
+    def __init__(self, records, utilization=DEFAULT_UTILIZATION, kv_cache_bits=16):
+        self.records = records
+        self.utilization = utilization
+        self.kv_cache_bits = kv_cache_bits
+        self.estimator = VramEstimator(records)
+        self.by_name = {record.name: i for i, record in enumerate(records)}
+
+    @classmethod
+    def from_catalog(cls, config_path="config.json", models_dir=None, compiled=True, **kwargs):
+        if compiled:
+            catalog = open_catalog(config_path, models_dir, DEFAULT_CATALOG_PATH)
+            try:
+                return cls(catalog.records(), **kwargs)
+            finally:
+                catalog.close()
+        return cls(load_records(config_path, models_dir), **kwargs)
+
+    def resolve(self, spec):
+        """
+        返回模型规格对应的记录下标。model 为完整标签（例如 qwen2.5:7b）；
+        同时给出 quantization 时，在同一模型家族、同一尺寸中选择该量化的标签
+        """
+        name = spec["model"]
+        if name not in self.by_name:
+            raise ValueError(f"目录中没有模型 {name}")
+        index = self.by_name[name]
+        quantization = spec.get("quantization")
+        if not quantization or self.records[index].quantization.value == quantization.upper():
+            return index
+        base = self.records[index]
+        candidates = [
+            i for i, record in enumerate(self.records)
+            if record.family == base.family and record.size_label == base.size_label
+            and record.quantization.value == quantization.upper()
+        ]
+        if not candidates:
+            raise ValueError(f"{name} 没有 {quantization} 量化的版本")
+        return min(candidates, key=lambda i: (not self.records[i].is_default, len(self.records[i].name)))
+
+    def instance_demands(self, models):
+        """
+        展开模型规格（replicas 为副本数，concurrency 视为批大小，context 为上下文长度），
+        按 (上下文, 批大小) 的唯一组合批量估算显存，返回实例列表
+        """
+        resolved = [self.resolve(spec) for spec in models]
+        contexts = sorted({int(spec.get("context", 8192)) for spec in models})
+        batches = sorted({int(spec.get("concurrency", 1)) for spec in models})
+        estimate = self.estimator.estimate(contexts, batches, kv_cache_bits=self.kv_cache_bits)
+        context_index = {context: i for i, context in enumerate(contexts)}
+        batch_index = {batch: i for i, batch in enumerate(batches)}
+
+        instances = []
+        for spec, index in zip(models, resolved):
+            j = context_index[int(spec.get("context", 8192))]
+            k = batch_index[int(spec.get("concurrency", 1))]
+            weights = float(estimate["weights"][index, 0, 0])
+            kv_cache = float(estimate["kv_cache"][index, j, k])
+            activation = float(estimate["activation"][index, j, k])
+            if np.isnan(weights):
+                raise ValueError(f"{self.records[index].name} 缺少文件大小，无法估算显存")
+            for replica in range(int(spec.get("replicas", 1))):
+                instances.append({
+                    "instance": f"{self.records[index].name}#{replica}",
+                    "model": self.records[index].name,
+                    "weights_gb": weights,
+                    "kv_cache_gb": kv_cache,
+                    "activation_gb": activation,
+                    "memory_gb": weights + kv_cache + activation,
+                })
+        return instances
+
+    def shard_memory(self, instance, degree):
+        """degree 路张量并行时每张卡的显存：权重和 KV cache 均分，激活不切分，另加通信缓冲"""
+        if degree == 1:
+            return instance["memory_gb"]
+        return ((instance["weights_gb"] + instance["kv_cache_gb"]) / degree
+                + instance["activation_gb"] + TENSOR_PARALLEL_OVERHEAD_GB)
+
+    def plan(self, fleet, models, exact=None):
+        """
+        规划部署，返回字典：
+          - placements: 每个实例的 GPU 列表、张量并行路数和每卡显存
+          - unplaced: 无法放置的实例
+          - gpus: 每张卡的已用显存、剩余显存（headroom）和实例
+          - summary: 集群总显存、已用、剩余和利用率
+        exact 为 None 时，实例数和 GPU 数都不超过精确求解上限则使用精确求解
+        """
+        gpus = expand_fleet(fleet)
+        instances = self.instance_demands(models)
+        capacity = [gpu["vram_gb"] * self.utilization for gpu in gpus]
+        if exact is None:
+            exact = len(instances) <= EXACT_MAX_INSTANCES and len(gpus) <= EXACT_MAX_GPUS
+        assignments = None
+        method = "heuristic"
+        if exact:
+            assignments = self._solve_exact(instances, capacity)
+            if assignments is not None:
+                method = "exact"
+        if assignments is None:
+            assignments = self._solve_heuristic(instances, gpus, capacity)
+        return self._report(gpus, instances, assignments, capacity, method)
+
+    def _solve_heuristic(self, instances, gpus, capacity):
+        """最佳适应递减；单卡放不下时尝试同一机器内的张量并行"""
+        free = list(capacity)
+        # (剩余显存, GPU 下标) 的有序表，用于二分查找刚好放得下的卡
+        free_sorted = sorted((value, i) for i, value in enumerate(free))
+        nodes = {}
+        for i, gpu in enumerate(gpus):
+            nodes.setdefault(gpu["node"], []).append(i)
+        max_node_size = max((len(members) for members in nodes.values()), default=0)
+        max_capacity = max(capacity, default=0.0)
+
+        def take(i, amount):
+            del free_sorted[bisect_left(free_sorted, (free[i], i))]
+            free[i] -= amount
+            insort(free_sorted, (free[i], i))
+
+        assignments = {}
+        order = sorted(range(len(instances)), key=lambda n: instances[n]["memory_gb"], reverse=True)
+        for n in order:
+            demand = instances[n]["memory_gb"]
+            position = bisect_left(free_sorted, (demand, -1))
+            if position < len(free_sorted):
+                _, i = free_sorted[position]
+                take(i, demand)
+                assignments[n] = ([i], 1, demand)
+                continue
+
+            # 只有单卡容量放不下的实例才切分；集群已满导致放不下的实例保持未放置
+            degree = 2 if demand > max_capacity else max_node_size + 1
+            while degree <= max_node_size and n not in assignments:
+                shard = self.shard_memory(instances[n], degree)
+                best = None
+                for members in nodes.values():
+                    fitting = sorted((free[i], i) for i in members if free[i] >= shard)
+                    if len(fitting) >= degree:
+                        chosen = fitting[:degree]
+                        waste = sum(value for value, _ in chosen)
+                        if best is None or waste < best[0]:
+                            best = (waste, [i for _, i in chosen])
+                if best is not None:
+                    for i in best[1]:
+                        take(i, shard)
+                    assignments[n] = (best[1], degree, shard)
+                degree *= 2
+        return assignments
+
+    def _solve_exact(self, instances, capacity):
+        """
+        分支定界求解：所有实例均单卡放置，使占用的 GPU 数最少。
+        有实例需要张量并行、无解或超过搜索步数时返回 None
+        """
+        demands = [instance["memory_gb"] for instance in instances]
+        if any(demand > max(capacity, default=0) for demand in demands):
+            return None
+        order = sorted(range(len(demands)), key=lambda n: demands[n], reverse=True)
+        free = list(capacity)
+        counts = [0] * len(capacity)
+        current = {}
+        best = {"used": len(capacity) + 1, "assignments": None}
+        steps = [0]
+
+        # 占用卡数的下界：总需求除以最大单卡容量
+        lower_bound = max(1, -(-sum(demands) // max(capacity))) if demands else 0
+
+        def search(position, used):
+            steps[0] += 1
+            if steps[0] > EXACT_MAX_STEPS or used >= best["used"] or best["used"] <= lower_bound:
+                return
+            if position == len(order):
+                best["used"] = used
+                best["assignments"] = dict(current)
+                return
+            n = order[position]
+            tried = set()
+            for i in range(len(capacity)):
+                state = (capacity[i], free[i])
+                if free[i] < demands[n] or state in tried:
+                    continue
+                # 同样容量、同样剩余的卡等价，只尝试一次
+                tried.add(state)
+                free[i] -= demands[n]
+                counts[i] += 1
+                current[n] = ([i], 1, demands[n])
+                search(position + 1, used + (1 if counts[i] == 1 else 0))
+                del current[n]
+                counts[i] -= 1
+                free[i] += demands[n]
+
+        search(0, 0)
+        return best["assignments"]
+
+    def _report(self, gpus, instances, assignments, capacity, method):
+        used = [0.0] * len(gpus)
+        gpu_instances = [[] for _ in gpus]
+        placements = []
+        for n, (gpu_indexes, degree, per_gpu) in sorted(assignments.items()):
+            for i in gpu_indexes:
+                used[i] += per_gpu
+                gpu_instances[i].append(instances[n]["instance"])
+            placements.append({
+                "instance": instances[n]["instance"],
+                "model": instances[n]["model"],
+                "gpus": [gpus[i]["id"] for i in gpu_indexes],
+                "tensor_parallel": degree,
+                "memory_gb_per_gpu": round(per_gpu, 3),
+            })
+        unplaced = [
+            {"instance": instance["instance"], "memory_gb": round(instance["memory_gb"], 3)}
+            for n, instance in enumerate(instances) if n not in assignments
+        ]
+        gpu_report = [
+            {
+                "id": gpu["id"],
+                "name": gpu["name"],
+                "vram_gb": gpu["vram_gb"],
+                "used_gb": round(used[i], 3),
+                "headroom_gb": round(capacity[i] - used[i], 3),
+                "instances": gpu_instances[i],
+            }
+            for i, gpu in enumerate(gpus)
+        ]
+        total = sum(gpu["vram_gb"] for gpu in gpus)
+        total_used = sum(used)
+        return {
+            "method": method,
+            "placements": placements,
+            "unplaced": unplaced,
+            "gpus": gpu_report,
+            "summary": {
+                "gpus": len(gpus),
+                "gpus_used": sum(1 for value in used if value > 0),
+                "instances": len(instances),
+                "placed": len(placements),
+                "total_vram_gb": round(total, 3),
+                "used_gb": round(total_used, 3),
+                "headroom_gb": round(sum(capacity) - total_used, 3),
+                "utilization": round(total_used / total, 4) if total else 0.0,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规划多卡部署：把模型实例装箱到集群的 GPU 上")
+    parser.add_argument("plan", help="部署描述 JSON：{\"fleet\": [...], \"models\": [...]}")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--utilization", type=float, default=DEFAULT_UTILIZATION, help="每张卡可用于模型的显存比例")
+    parser.add_argument("--exact", dest="exact", action="store_true", default=None, help="强制使用精确求解")
+    parser.add_argument("--heuristic", dest="exact", action="store_false", help="强制使用启发式装箱")
+    parser.add_argument("--output", help="把完整结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with open(args.plan, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    planner = PlacementPlanner.from_catalog(args.config, args.models_dir, utilization=args.utilization)
+    result = planner.plan(plan["fleet"], plan["models"], exact=args.exact)
+
+    summary = result["summary"]
+    print(f"求解方式: {result['method']}")
+    print(f"实例 {summary['placed']}/{summary['instances']} 已放置，占用 {summary['gpus_used']}/{summary['gpus']} 张卡，"
+          f"显存利用率 {summary['utilization']:.1%}，剩余 {summary['headroom_gb']:.1f} GB")
+    for gpu in result["gpus"]:
+        if gpu["instances"]:
+            print(f"  {gpu['id']:<20} {gpu['used_gb']:>7.1f}/{gpu['vram_gb']:<6g} GB  剩余 {gpu['headroom_gb']:>6.1f} GB  "
+                  f"{', '.join(gpu['instances'])}")
+    for instance in result["unplaced"]:
+        print(f"  无法放置: {instance['instance']} ({instance['memory_gb']:.1f} GB)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import hashlib
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from catalog_compiler import source_files, source_hash
+from model_records import DEFAULT_ARCHITECTURES_PATH, load_architectures, load_records
+from vram_estimator import DEFAULT_KV_HEAD_RATIO, DEFAULT_PREFILL_CHUNK, GB, VramEstimator
+
+DEFAULT_FRONTIERS_PATH = ".cache/quant_frontiers.json"
+# 查找表的显存粒度（GB），查表结果不会超过预算
+TABLE_STEP_GB = 0.01
+# 运行期间检查模型 JSON 是否变化的最小间隔（秒）
+CHECK_INTERVAL_SECONDS = 2.0
+
+# 标签名末尾的量化后缀，例如 7b-instruct-q4_K_M 中的 q4_K_M
+QUANT_SUFFIX = re.compile(r"-(fp16|f16|bf16|q\d+_k(?:_[sml])?|q\d+_\d)$", re.IGNORECASE)
+SIZE_PREFIX = re.compile(r"^\d+(?:\.\d+)?b-?", re.IGNORECASE)
+
+
+def tag_variant(tag):
+    """
+    返回显式量化标签的变体名，例如 7b-instruct-q4_K_M -> instruct，0.5b-q8_0 -> ""；
+    不带量化后缀的别名标签（例如 7b、latest）返回 None
+    """
+    match = QUANT_SUFFIX.search(tag)
+    if not match:
+        return None
+    return SIZE_PREFIX.sub("", tag[:match.start()])
+
+
+def build_frontiers(records, architectures=None, kv_cache_bits=16, kv_head_ratio=DEFAULT_KV_HEAD_RATIO):
+    """
+    为每个 (模型家族, 尺寸标签, 变体) 计算量化的 Pareto 前沿：按权重显存升序，
+    只保留每权重位数严格更高的量化（显存更大但质量不更高的量化被支配）。
+    同时记录与量化无关的每 token KV cache 和激活显存系数，查询时按上下文长度直接计算。
+    系数取自 VramEstimator.estimate 在上下文 1、批大小 1 时的结果，两者都与上下文长度和批大小成正比，
+    因此与估算器（architectures 中有 GGUF 结构的模型使用真实的 KV 宽度）保持一致
+    """
+    estimator = VramEstimator(records, architectures)
+    per_token = estimator.estimate([1], [1], kv_cache_bits=kv_cache_bits, kv_head_ratio=kv_head_ratio)
+    kv_per_token = per_token["kv_cache"][:, 0, 0]
+    activation_per_token = per_token["activation"][:, 0, 0]
+    # 默认别名（例如 qwen2.5:7b）对应的 model_id，用于确定每个尺寸的默认变体
+    default_ids = {record.model_id for record in records if record.is_default}
+    groups = {}
+    for i, record in enumerate(records):
+        tag = record.name.rsplit(":", 1)[-1]
+        variant = tag_variant(tag)
+        bits = record.quantization.bits_per_weight
+        weights_gb = estimator.file_size_bytes[i] / GB
+        if variant is None or not record.size_label or np.isnan(bits) or np.isnan(weights_gb):
+            continue
+        key = f"{record.family}|{record.size_label}|{variant}"
+        group = groups.setdefault(key, {
+            "family": record.family,
+            "size_label": record.size_label,
+            "variant": variant,
+            "default": False,
+            "kv_per_token_gb": float(kv_per_token[i]),
+            "activation_per_token_gb": float(activation_per_token[i]),
+            "candidates": [],
+        })
+        group["default"] = group["default"] or record.model_id in default_ids
+        group["candidates"].append({
+            "name": record.name,
+            "quantization": record.quantization.value,
+            "bits_per_weight": bits,
+            "weights_gb": float(weights_gb),
+        })
+
+    frontiers = {}
+    for key, group in groups.items():
+        points = []
+        for candidate in sorted(group.pop("candidates"), key=lambda c: (c["weights_gb"], -c["bits_per_weight"])):
+            if not points or candidate["bits_per_weight"] > points[-1]["bits_per_weight"]:
+                points.append(candidate)
+        group["points"] = points
+        frontiers[key] = group
+    return frontiers
+
+
+class QuantRecommender:
+    """
+    量化推荐：给定模型家族、尺寸、显存预算和上下文长度，返回预算内质量最高（每权重位数最高）的量化。
+    architectures_path 存在时使用其中的 GGUF 结构计算 KV cache，与 VramEstimator.from_catalog 一致。
+    前沿按源数据和 GGUF 元数据的内容哈希缓存到磁盘，任一变化后自动重建；每个前沿预先生成
+    "可用权重显存 -> 前沿下标" 的查找表，单次查询为常数时间
+    """
+
+    def __init__(self, config_path="config.json", models_dir=None, cache_path=DEFAULT_FRONTIERS_PATH,
+                 check_interval=CHECK_INTERVAL_SECONDS, architectures_path=DEFAULT_ARCHITECTURES_PATH):
+        self.config_path = config_path
+        self.models_dir = models_dir
+        self.architectures_path = architectures_path
+        self.cache_path = cache_path
+        self.check_interval = check_interval
+        self.rebuilds = 0
+        self.load()
+
+    def _signature(self):
+        """源文件和 GGUF 元数据文件的 (路径, 修改时间, 大小)，用于低成本地发现变化"""
+        _, _, paths = source_files(self.config_path, self.models_dir)
+        signature = []
+        for path in [*paths, Path(self.architectures_path)]:
+            if not path.exists():
+                signature.append((str(path), None, None))
+                continue
+            stat = path.stat()
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _digest(self):
+        """源数据哈希与 GGUF 元数据文件内容的组合哈希，作为缓存是否有效的依据"""
+        digest = hashlib.sha256(source_hash(self.config_path, self.models_dir))
+        path = Path(self.architectures_path)
+        if path.exists():
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def load(self):
+        """读取缓存的前沿，缓存不存在或源数据哈希不一致时重新计算并写回缓存"""
+        self.signature = self._signature()
+        self.checked_at = time.monotonic()
+        digest = self._digest()
+        cached = None
+        if Path(self.cache_path).exists():
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = None
+        if cached and cached.get("source_hash") == digest:
+            frontiers = cached["frontiers"]
+        else:
+            frontiers = build_frontiers(load_records(self.config_path, self.models_dir),
+                                        load_architectures(self.architectures_path))
+            self.rebuilds += 1
+            Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"source_hash": digest, "frontiers": frontiers}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        self.frontiers = frontiers
+        self.tables = {key: self._table(group["points"]) for key, group in frontiers.items()}
+        self.default_variants = {}
+        for key, group in frontiers.items():
+            size_key = (group["family"], group["size_label"])
+            if group["default"] or size_key not in self.default_variants:
+                self.default_variants[size_key] = group["variant"]
+
+    def _table(self, points):
+        """table[i] 为权重显存不超过 i * TABLE_STEP_GB 的最佳前沿下标，-1 表示没有"""
+        largest = points[-1]["weights_gb"] if points else 0.0
+        size = int(np.ceil(largest / TABLE_STEP_GB)) + 1
+        thresholds = np.array([point["weights_gb"] for point in points])
+        steps = np.arange(size) * TABLE_STEP_GB
+        return (np.searchsorted(thresholds, steps, side="right") - 1).astype(np.int16)
+
+    def refresh_if_changed(self):
+        """距离上次检查超过 check_interval 秒时比较源文件签名，变化则重新加载"""
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return False
+        self.checked_at = now
+        if self._signature() == self.signature:
+            return False
+        self.load()
+        return True
+
+    def recommend(self, family, size_label, budget_gb, context_length=8192, batch_size=1, variant=None):
+        """
+        返回 {"name", "quantization", "bits_per_weight", "weights_gb", "memory_gb"}，
+        预算内没有可用量化时返回 None。variant 缺省时使用该尺寸默认标签所属的变体（例如 instruct）
+        """
+        self.refresh_if_changed()
+        if variant is None:
+            variant = self.default_variants.get((family, size_label))
+        key = f"{family}|{size_label}|{variant}"
+        group = self.frontiers.get(key)
+        if group is None:
+            raise KeyError(f"没有 {family} {size_label} {variant or ''} 的量化数据")
+        overhead = (group["kv_per_token_gb"] * context_length * batch_size
+                    + group["activation_per_token_gb"] * batch_size * min(context_length, DEFAULT_PREFILL_CHUNK))
+        available = budget_gb - overhead
+        if available < 0:
+            return None
+        table = self.tables[key]
+        index = table[min(int(available / TABLE_STEP_GB), len(table) - 1)]
+        if index < 0:
+            return None
+        point = group["points"][index]
+        return dict(point, memory_gb=point["weights_gb"] + overhead)
+
+    def frontier(self, family, size_label, variant=None):
+        """返回前沿上的所有量化（按显存升序）"""
+        if variant is None:
+            variant = self.default_variants.get((family, size_label))
+        return self.frontiers[f"{family}|{size_label}|{variant}"]["points"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为指定显存预算推荐量化")
+    parser.add_argument("family", help="模型家族名称，例如 \"qwen 2.5\"")
+    parser.add_argument("size_label", help="尺寸标签，例如 7B")
+    parser.add_argument("budget", type=float, help="显存预算（GB）")
+    parser.add_argument("--context", type=int, default=8192)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--variant", help="标签变体，例如 instruct、base，默认与默认标签一致")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--architectures", default=DEFAULT_ARCHITECTURES_PATH,
+                        help="gguf_reader.py 保存的 GGUF 架构字段，文件存在时用于计算 KV cache")
+    args = parser.parse_args()
+
+    recommender = QuantRecommender(args.config, args.models_dir, architectures_path=args.architectures)
+    try:
+        points = recommender.frontier(args.family, args.size_label, args.variant)
+        result = recommender.recommend(args.family, args.size_label, args.budget, args.context, args.batch, args.variant)
+    except KeyError as e:
+        parser.error(str(e))
+    print("Pareto 前沿（权重显存 / 每权重位数）:")
+    for point in points:
+        marker = "  <- 推荐" if result and point["name"] == result["name"] else ""
+        print(f"  {point['name']:<44} {point['quantization']:<8} {point['weights_gb']:>8.2f} GB  "
+              f"{point['bits_per_weight']:>5.2f} bpw{marker}")
+    if result is None:
+        print(f"{args.budget:g} GB 内没有可用的量化（上下文 {args.context}，批大小 {args.batch}）")
+    else:
+        print(f"推荐 {result['name']}（{result['quantization']}），预计显存 {result['memory_gb']:.2f} GB")
+
+
+if __name__ == "__main__":
+    main()
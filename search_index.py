@@ -0,0 +1,373 @@
+import os
+import re
+import time
+import argparse
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+
+from catalog_compiler import source_hash
+from model_records import family_tag_prefix, load_catalog, records_from_catalog
+
+DEFAULT_INDEX_PATH = ".cache/search_index.npz"
+FORMAT_VERSION = 1
+
+# 中文按连续汉字的二元组（单个汉字为一元组）切分，英文和标签名按字母数字串切分，
+# 带 . 或 _ 的串（qwen2.5、q5_k_m）同时收录整体和各部分
+TOKEN_PATTERN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+(?:[._][a-z0-9]+)*")
+CJK_PATTERN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it its of on or that the this to with".split()
+)
+# 各字段中出现的词的权重，同一个词在多个字段出现时取最大值
+FIELD_WEIGHTS = (
+    ("name", 3.0),
+    ("family", 2.0),
+    ("arch", 2.0),
+    ("quantization", 2.0),
+    ("size_label", 2.0),
+    ("description", 1.0),
+    ("family_description", 1.0),
+)
+# 精确、前缀和模糊匹配的得分系数
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+# 参与模糊匹配的最短查询词；长度不超过 FUZZY_SHORT_LENGTH 的词允许 1 处编辑，更长的词允许 2 处
+FUZZY_MIN_LENGTH = 3
+FUZZY_SHORT_LENGTH = 5
+# 每个查询词最多展开的前缀 / 模糊候选词数
+MAX_EXPANSIONS = 64
+# 字符串列表序列化时的分隔符
+SEPARATOR = "\x00"
+
+
+def tokenize(text):
+    """把中英文混合文本切分为索引词（小写），不去重"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer((text or "").lower()):
+        token = match.group()
+        if CJK_PATTERN.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif token not in STOPWORDS:
+            tokens.append(token)
+            if "." in token or "_" in token:
+                tokens.extend(part for part in re.split(r"[._]", token) if len(part) >= 2)
+    return tokens
+
+
+def trigrams(term):
+    """词的字符三元组集合（首尾加边界符），用于模糊匹配"""
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """a 与 b 的编辑距离（插入、删除、替换和相邻交换各算 1 处），超过 limit 时返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _document_fields(record, model_config):
+    family_description = " ".join(
+        filter(None, (model_config.get("description"), model_config.get("description_en")))
+    )
+    return {
+        "name": record.name,
+        "family": f"{record.family} {family_tag_prefix(model_config)}",
+        "arch": record.arch,
+        "quantization": f"{record.quantization.value} {record.quantization_info}",
+        "size_label": record.size_label,
+        "description": record.description,
+        "family_description": family_description,
+    }
+
+
+def _pack_strings(strings):
+    return np.frombuffer(SEPARATOR.join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack_strings(array):
+    text = array.tobytes().decode("utf-8")
+    return text.split(SEPARATOR) if text else []
+
+
+def _csr(rows, dtype):
+    """把 [[值, ...], ...] 转换为 (offsets, values) 形式的压缩行"""
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    values = np.fromiter((value for row in rows for value in row), dtype=dtype, count=int(offsets[-1]))
+    return offsets, values
+
+
+class SearchIndex:
+    """
+    模型名称和描述的倒排索引：词 -> (文档, 权重) 的压缩行数组，以及词表上的三元组索引。
+    文档为目录中的每个标签，索引的字段包括标签名、模型家族、arch、量化、尺寸、详情页描述
+    以及 config.json 中的中英文描述。支持精确、前缀和模糊匹配（三元组 Dice 相似度），
+    多个查询词之间为"与"关系，按 idf × 字段权重 × 匹配系数求和排序；可按模型家族、量化和尺寸过滤。
+    索引保存为单个 .npz 文件，加载时不需要重新分词
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.source_hash = arrays["source_hash"].tobytes()
+        self.names = _unpack_strings(arrays["names"])
+        self.families = _unpack_strings(arrays["families"])
+        self.quantizations = _unpack_strings(arrays["quantizations"])
+        self.size_labels = _unpack_strings(arrays["size_labels"])
+        self.family_ids = arrays["family_ids"]
+        self.quantization_ids = arrays["quantization_ids"]
+        self.size_billions = arrays["size_billions"]
+        self.file_sizes = arrays["file_sizes"]
+        self.is_default = arrays["is_default"]
+        self.terms = _unpack_strings(arrays["terms"])
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.posting_offsets = arrays["posting_offsets"]
+        self.posting_docs = arrays["posting_docs"]
+        self.posting_weights = arrays["posting_weights"]
+        self.idf = arrays["idf"]
+        self.trigram_ids = {trigram: i for i, trigram in enumerate(_unpack_strings(arrays["trigrams"]))}
+        self.trigram_offsets = arrays["trigram_offsets"]
+        self.trigram_terms = arrays["trigram_terms"]
+        self.term_lengths = np.array([len(term) for term in self.terms], dtype=np.int16)
+        self.family_lookup = {family.lower(): i for i, family in enumerate(self.families)}
+        self.quantization_lookup = {quantization.upper(): i for i, quantization in enumerate(self.quantizations)}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, catalog, digest=b""):
+        """由 load_catalog 的结果建立索引"""
+        records = records_from_catalog(catalog)
+        configs = [model_config for model_config, models in catalog for _ in models]
+
+        postings = {}
+        for doc, (record, model_config) in enumerate(zip(records, configs)):
+            weights = {}
+            for field, weight in FIELD_WEIGHTS:
+                for token in tokenize(_document_fields(record, model_config)[field]):
+                    if weights.get(token, 0.0) < weight:
+                        weights[token] = weight
+            for token, weight in weights.items():
+                postings.setdefault(token, []).append((doc, weight))
+
+        terms = sorted(postings)
+        posting_offsets, posting_docs = _csr([[doc for doc, _ in postings[term]] for term in terms], np.int32)
+        _, posting_weights = _csr([[weight for _, weight in postings[term]] for term in terms], np.float32)
+        document_frequency = np.diff(posting_offsets)
+        idf = np.log1p(len(records) / np.maximum(document_frequency, 1)).astype(np.float32)
+
+        term_trigrams = [trigrams(term) if not CJK_PATTERN.match(term) else set() for term in terms]
+        trigram_terms = {}
+        for term_id, grams in enumerate(term_trigrams):
+            for gram in grams:
+                trigram_terms.setdefault(gram, []).append(term_id)
+        trigram_list = sorted(trigram_terms)
+        trigram_offsets, trigram_term_ids = _csr([trigram_terms[gram] for gram in trigram_list], np.int32)
+
+        families = list(dict.fromkeys(record.family for record in records))
+        quantizations = list(dict.fromkeys(record.quantization.value for record in records))
+        family_index = {family: i for i, family in enumerate(families)}
+        quantization_index = {quantization: i for i, quantization in enumerate(quantizations)}
+        return cls({
+            "version": np.array([FORMAT_VERSION], dtype=np.int32),
+            "source_hash": np.frombuffer(digest, dtype=np.uint8),
+            "names": _pack_strings([record.name for record in records]),
+            "families": _pack_strings(families),
+            "quantizations": _pack_strings(quantizations),
+            "size_labels": _pack_strings([record.size_label for record in records]),
+            "family_ids": np.array([family_index[record.family] for record in records], dtype=np.int16),
+            "quantization_ids": np.array([quantization_index[record.quantization.value] for record in records],
+                                         dtype=np.int16),
+            "size_billions": np.array([np.nan if record.size_billions is None else record.size_billions
+                                       for record in records], dtype=np.float64),
+            "file_sizes": np.array([-1 if record.file_size is None else record.file_size for record in records],
+                                   dtype=np.int64),
+            "is_default": np.array([record.is_default for record in records], dtype=bool),
+            "terms": _pack_strings(terms),
+            "posting_offsets": posting_offsets,
+            "posting_docs": posting_docs,
+            "posting_weights": posting_weights,
+            "idf": idf,
+            "trigrams": _pack_strings(trigram_list),
+            "trigram_offsets": trigram_offsets,
+            "trigram_terms": trigram_term_ids,
+        })
+
+    def save(self, path):
+        """保存为未压缩的 .npz（np.load 直接读取数组，无需重新分词）"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_path, **self.arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"][0]) != FORMAT_VERSION:
+                raise ValueError(f"{path} 的索引格式版本不受支持")
+            return cls({name: data[name] for name in data.files})
+
+    # ---- 查询 ----
+
+    def _candidates(self, token, prefix, fuzzy):
+        """
+        查询词对应的 {词下标: 匹配系数}：依次尝试精确、前缀和模糊匹配，前一级有结果时不再展开，
+        避免较少见（idf 较高）的相近词得分超过精确匹配
+        """
+        term_id = self.term_ids.get(token)
+        if term_id is not None:
+            return {term_id: 1.0}
+        candidates = {}
+        if prefix:
+            start = bisect_left(self.terms, token)
+            for term_id in range(start, min(start + MAX_EXPANSIONS, len(self.terms))):
+                if not self.terms[term_id].startswith(token):
+                    break
+                candidates[term_id] = PREFIX_FACTOR
+        if candidates:
+            return candidates
+        if fuzzy and len(token) >= FUZZY_MIN_LENGTH and not CJK_PATTERN.match(token):
+            # 三元组索引给出至少共享一个三元组的词，按共享数从多到少取候选，再用编辑距离确认
+            grams = [self.trigram_ids[gram] for gram in trigrams(token) if gram in self.trigram_ids]
+            if grams:
+                hits = np.concatenate([
+                    self.trigram_terms[self.trigram_offsets[gram]:self.trigram_offsets[gram + 1]] for gram in grams
+                ])
+                term_ids, common = np.unique(hits, return_counts=True)
+                limit = 1 if len(token) <= FUZZY_SHORT_LENGTH else 2
+                lengths = self.term_lengths[term_ids]
+                keep = np.abs(lengths - len(token)) <= limit
+                term_ids, common = term_ids[keep], common[keep]
+                for i in np.argsort(-common, kind="stable")[:MAX_EXPANSIONS]:
+                    term_id = int(term_ids[i])
+                    distance = edit_distance(token, self.terms[term_id], limit)
+                    if distance <= limit:
+                        candidates[term_id] = FUZZY_FACTOR * (1 - distance / (len(token) + 1))
+        return candidates
+
+    def filter_mask(self, family=None, quantization=None, min_size=None, max_size=None):
+        """过滤条件对应的布尔数组；quantization 可以是单个量化或量化列表，尺寸单位为十亿参数"""
+        mask = np.ones(len(self.names), dtype=bool)
+        if family:
+            mask &= self.family_ids == self.family_lookup.get(family.lower(), -1)
+        if quantization:
+            values = [quantization] if isinstance(quantization, str) else quantization
+            ids = [self.quantization_lookup.get(value.upper(), -1) for value in values]
+            mask &= np.isin(self.quantization_ids, ids)
+        if min_size is not None:
+            mask &= self.size_billions >= min_size
+        if max_size is not None:
+            mask &= self.size_billions <= max_size
+        return mask
+
+    def search(self, query, limit=10, prefix=True, fuzzy=True, **filters):
+        """
+        返回得分从高到低的 [{"name", "family", "size_label", "quantization", "file_size", "is_default", "score"}]。
+        每个查询词取其匹配到的词中得分最高的一个，文档需匹配所有查询词；查询为空时按过滤条件列出模型。
+        模糊匹配允许短词 1 处、长词 2 处拼写错误（例如 qwn -> qwen、deepsek -> deepseek）
+        """
+        mask = self.filter_mask(**filters)
+        scores = np.zeros(len(self.names), dtype=np.float32)
+        for token in dict.fromkeys(tokenize(query)):
+            token_scores = np.zeros(len(self.names), dtype=np.float32)
+            for term_id, factor in self._candidates(token, prefix, fuzzy).items():
+                start, end = self.posting_offsets[term_id], self.posting_offsets[term_id + 1]
+                docs = self.posting_docs[start:end]
+                np.maximum.at(token_scores, docs, self.posting_weights[start:end] * (factor * self.idf[term_id]))
+            mask &= token_scores > 0
+            scores += token_scores
+        docs = np.flatnonzero(mask)
+        # 同分时默认标签在前，其余按目录顺序
+        docs = docs[np.lexsort((docs, ~self.is_default[docs], -scores[docs]))][:limit or None]
+        return [self._result(int(doc), float(scores[doc])) for doc in docs]
+
+    def _result(self, doc, score):
+        file_size = int(self.file_sizes[doc])
+        return {
+            "name": self.names[doc],
+            "family": self.families[self.family_ids[doc]],
+            "size_label": self.size_labels[doc],
+            "quantization": self.quantizations[self.quantization_ids[doc]],
+            "file_size": None if file_size < 0 else file_size,
+            "is_default": bool(self.is_default[doc]),
+            "score": round(score, 4),
+        }
+
+
+def build_index(config_path="config.json", models_dir=None, path=DEFAULT_INDEX_PATH):
+    """由 ModelProcessor 输出的模型 JSON 和 config.json 建立索引并保存，返回 SearchIndex"""
+    index = SearchIndex.build(load_catalog(config_path, models_dir), source_hash(config_path, models_dir))
+    index.save(path)
+    return index
+
+
+def open_index(config_path="config.json", models_dir=None, path=DEFAULT_INDEX_PATH):
+    """读取保存的索引，不存在、格式不符或源数据已变化时重新建立"""
+    if Path(path).exists():
+        try:
+            index = SearchIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            index = None
+        if index is not None and index.source_hash == source_hash(config_path, models_dir):
+            return index
+    return build_index(config_path, models_dir, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按名称、arch、量化和中英文描述搜索模型")
+    parser.add_argument("query", nargs="?", default="", help="搜索词，例如 \"coder 32b q5\"、\"代码生成\"、\"qwn\"")
+    parser.add_argument("--family", help="只搜索指定模型家族，例如 \"qwen 2.5\"")
+    parser.add_argument("--quant", action="append", help="只搜索指定量化，可重复，例如 --quant Q4_K_M --quant Q8_0")
+    parser.add_argument("--min-size", type=float, help="最小尺寸（十亿参数）")
+    parser.add_argument("--max-size", type=float, help="最大尺寸（十亿参数）")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--exact", action="store_true", help="只做精确匹配，不做前缀和模糊匹配")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="索引文件路径")
+    parser.add_argument("--rebuild", action="store_true", help="重新建立索引")
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    if args.rebuild:
+        index = build_index(args.config, args.models_dir, args.index)
+    else:
+        index = open_index(args.config, args.models_dir, args.index)
+    loaded_at = time.perf_counter()
+    results = index.search(
+        args.query, limit=args.limit, prefix=not args.exact, fuzzy=not args.exact,
+        family=args.family, quantization=args.quant, min_size=args.min_size, max_size=args.max_size,
+    )
+    searched_at = time.perf_counter()
+
+    for result in results:
+        marker = "*" if result["is_default"] else " "
+        size = f"{result['file_size'] / 1e9:.1f} GB" if result["file_size"] is not None else "-"
+        print(f"{result['score']:>7.2f} {marker} {result['name']:<44} {result['quantization']:<8} {size:>9}  "
+              f"{result['family']}")
+    print(f"{len(results)} 个结果（{len(index)} 个模型，{len(index.terms)} 个索引词）；"
+          f"加载 {(loaded_at - started_at) * 1000:.1f} ms，查询 {(searched_at - loaded_at) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,8 @@ setup(
         'charset-normalizer>=3.3.0',
         'idna>=3.6',
         'soupsieve>=2.5',
+        'numpy>=1.20.0',
+        'lxml>=4.9.0',
     ],
     author="jammyfu",
     description="LLM模型数据获取和显存计算工具",
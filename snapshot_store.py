@@ -0,0 +1,314 @@
+import os
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_SNAPSHOT_DIR = "modeldata/snapshots"
+HEAD_NAME = "HEAD"
+HISTORY_NAME = "history.jsonl"
+# 模型家族内按标签名哈希的前缀分桶，diff 时只比较哈希不同的桶
+BUCKET_PREFIX_LENGTH = 1
+# 显示用的快照 ID 长度
+SHORT_ID_LENGTH = 12
+# diff 中优先列出的字段
+DIFF_FIELDS = ("file_size", "quantization", "is_default", "model_id")
+
+
+def canonical(data):
+    """
+    紧凑的 JSON：无多余空格，保留键的顺序（回滚后的文件与原文件逐字节一致）。
+    get_model.py 写出的记录键顺序固定，同样的记录得到同样的字节
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _bucket(name):
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()[:BUCKET_PREFIX_LENGTH]
+
+
+def _family_json(models):
+    """与 get_model.py 写出的模型 JSON 格式一致"""
+    return json.dumps(models, indent=2, ensure_ascii=False)
+
+
+class SnapshotStore:
+    """
+    按内容寻址的模型目录快照。每条标签记录以规范化 JSON 的 SHA-256 存为对象（记录中包含 model_id
+    摘要），各快照之间共享相同的对象；每个模型家族是一棵两层的 Merkle 树：家族节点记录标签顺序和
+    各桶的哈希，桶节点记录 (标签名, 记录哈希)。快照只保存每个家族节点的哈希，因此：
+      - 未变化的家族、未变化的桶在 diff 时只比较一次哈希，耗时与变化量成正比而不是目录大小；
+      - 回滚只重写与当前快照不同的家族文件。
+    HEAD 记录当前快照，history.jsonl 按时间顺序记录所有快照（回滚后仍可回到较新的快照）
+    """
+
+    def __init__(self, root=DEFAULT_SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / f"{digest[2:]}.json"
+
+    def put(self, data):
+        """写入对象并返回其哈希；同样内容的对象已存在时不再写入"""
+        body = canonical(data)
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(path, body)
+        return digest
+
+    def get(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(f.read())
+
+    def head(self):
+        """当前快照 ID，没有快照时返回 None"""
+        path = self.root / HEAD_NAME
+        return path.read_text(encoding="utf-8").strip() if path.exists() else None
+
+    def _set_head(self, snapshot_id):
+        self.root.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.root / HEAD_NAME, f"{snapshot_id}\n".encode("utf-8"))
+
+    def history(self):
+        """按创建顺序返回所有快照的摘要 [{"id", "parent", "created_at", "message", "models"}]"""
+        path = self.root / HISTORY_NAME
+        if not path.exists():
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def resolve(self, ref):
+        """
+        把引用解析为完整的快照 ID：HEAD、HEAD~N（沿 parent 回溯 N 次）或快照 ID 的前缀。
+        找不到或前缀不唯一时抛出 KeyError
+        """
+        base, _, steps = ref.partition("~")
+        if base == HEAD_NAME:
+            snapshot_id = self.head()
+            if snapshot_id is None:
+                raise KeyError("还没有任何快照")
+        else:
+            matches = {entry["id"] for entry in self.history() if entry["id"].startswith(base)}
+            if len(matches) != 1:
+                raise KeyError(f"快照 {base} {'不存在' if not matches else '不唯一'}")
+            snapshot_id = matches.pop()
+        for _ in range(int(steps) if steps else int("~" in ref)):
+            snapshot_id = self.get(snapshot_id)["parent"]
+            if snapshot_id is None:
+                raise KeyError(f"{ref} 超出了快照历史")
+        return snapshot_id
+
+    def snapshot(self, snapshot_id):
+        """快照内容：{"parent", "created_at", "message", "families": {文件名: {"tree", "sha256", "models"}}}"""
+        return self.get(snapshot_id)
+
+    def _put_family(self, models):
+        """写入一个模型家族的记录、桶节点和家族节点，返回家族节点哈希"""
+        buckets = {}
+        order = []
+        for model in models:
+            name = model.get("model", "")
+            order.append(name)
+            buckets.setdefault(_bucket(name), []).append([name, self.put(model)])
+        bucket_hashes = {prefix: self.put(sorted(entries)) for prefix, entries in sorted(buckets.items())}
+        return self.put({"buckets": bucket_hashes, "order": order})
+
+    def commit(self, models_dir, output_files, message=""):
+        """
+        为 models_dir 中的模型家族文件创建快照并移动 HEAD，返回快照 ID。
+        文件内容的 SHA-256 与 HEAD 中记录的相同时直接复用其家族树，不再解析 JSON；
+        与 HEAD 完全相同时不创建新快照，返回 HEAD
+        """
+        parent = self.head()
+        previous = self.snapshot(parent)["families"] if parent else {}
+        families = {}
+        for output_file in output_files:
+            path = Path(models_dir) / output_file
+            if not path.exists():
+                continue
+            data = path.read_bytes()
+            file_hash = hashlib.sha256(data).hexdigest()
+            known = previous.get(output_file)
+            if known is not None and known["sha256"] == file_hash:
+                families[output_file] = known
+                continue
+            models = json.loads(data)
+            families[output_file] = {"tree": self._put_family(models), "sha256": file_hash, "models": len(models)}
+
+        if parent and families == previous:
+            return parent
+        created_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        snapshot_id = self.put({"parent": parent, "created_at": created_at, "message": message, "families": families})
+        entry = {
+            "id": snapshot_id, "parent": parent, "created_at": created_at, "message": message,
+            "models": sum(family["models"] for family in families.values()),
+        }
+        with open(self.root / HISTORY_NAME, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._set_head(snapshot_id)
+        return snapshot_id
+
+    def diff(self, old_id, new_id):
+        """
+        比较两个快照，返回 {文件名: {"added": [标签], "removed": [标签], "changed": [{"model", "fields"}]}}，
+        只包含有变化的家族。fields 为 {字段: [旧值, 新值]}，DIFF_FIELDS 排在前面。
+        家族节点或桶节点的哈希相同即跳过，只为哈希不同的记录读取对象
+        """
+        old_families = self.snapshot(old_id)["families"]
+        new_families = self.snapshot(new_id)["families"]
+        result = {}
+        for output_file in sorted(set(old_families) | set(new_families)):
+            old_tree = old_families.get(output_file, {}).get("tree")
+            new_tree = new_families.get(output_file, {}).get("tree")
+            if old_tree == new_tree:
+                continue
+            old_buckets = self.get(old_tree)["buckets"] if old_tree else {}
+            new_buckets = self.get(new_tree)["buckets"] if new_tree else {}
+            changes = {"added": [], "removed": [], "changed": []}
+            for prefix in sorted(set(old_buckets) | set(new_buckets)):
+                if old_buckets.get(prefix) == new_buckets.get(prefix):
+                    continue
+                old_entries = dict(self.get(old_buckets[prefix])) if prefix in old_buckets else {}
+                new_entries = dict(self.get(new_buckets[prefix])) if prefix in new_buckets else {}
+                for name, digest in new_entries.items():
+                    if name not in old_entries:
+                        changes["added"].append(name)
+                    elif old_entries[name] != digest:
+                        fields = _changed_fields(self.get(old_entries[name]), self.get(digest))
+                        # 只有键顺序不同的记录不算变化
+                        if fields:
+                            changes["changed"].append({"model": name, "fields": fields})
+                changes["removed"].extend(name for name in old_entries if name not in new_entries)
+            if any(changes.values()):
+                changes["added"].sort()
+                changes["removed"].sort()
+                changes["changed"].sort(key=lambda change: change["model"])
+                result[output_file] = changes
+        return result
+
+    def checkout(self, snapshot_id, models_dir):
+        """
+        把模型家族文件恢复为 snapshot_id 的内容并移动 HEAD（不删除历史，之后仍可回到较新的快照）。
+        只重写内容与目标不同的家族文件，快照中没有的家族文件会被删除。返回重写或删除的文件名列表
+        """
+        target = self.snapshot(snapshot_id)["families"]
+        current = self.snapshot(self.head())["families"] if self.head() else {}
+        touched = []
+        for output_file in sorted(set(current) | set(target)):
+            path = Path(models_dir) / output_file
+            family = target.get(output_file)
+            if family is None:
+                if path.exists():
+                    path.unlink()
+                    touched.append(output_file)
+                continue
+            if path.exists() and hashlib.sha256(path.read_bytes()).hexdigest() == family["sha256"]:
+                continue
+            _write_atomic(path, self.materialize(family["tree"]).encode("utf-8"))
+            touched.append(output_file)
+        self._set_head(snapshot_id)
+        return touched
+
+    def materialize(self, tree):
+        """按家族节点记录的标签顺序还原模型家族的 JSON 文本"""
+        node = self.get(tree)
+        records = {}
+        for bucket_hash in node["buckets"].values():
+            records.update(dict(self.get(bucket_hash)))
+        return _family_json([self.get(records[name]) for name in node["order"]])
+
+
+def _changed_fields(old, new):
+    keys = [key for key in DIFF_FIELDS if key in old or key in new]
+    keys += sorted((set(old) | set(new)) - set(DIFF_FIELDS))
+    return {key: [old.get(key), new.get(key)] for key in keys if old.get(key) != new.get(key)}
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def output_files(config):
+    """config.json 中配置的模型家族文件名"""
+    return [model_config["output_file"] for model_config in config["models"]]
+
+
+def print_diff(diff):
+    if not diff:
+        print("没有变化")
+        return
+    for output_file, changes in diff.items():
+        print(f"{output_file}: 新增 {len(changes['added'])} 个, 删除 {len(changes['removed'])} 个, "
+              f"变化 {len(changes['changed'])} 个")
+        for name in changes["added"]:
+            print(f"  + {name}")
+        for name in changes["removed"]:
+            print(f"  - {name}")
+        for change in changes["changed"]:
+            fields = ", ".join(f"{key}: {old!r} -> {new!r}" for key, (old, new) in change["fields"].items())
+            print(f"  ~ {change['model']}  {fields}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型目录快照：创建、查看历史、比较和回滚")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--store", help=f"快照目录，默认使用 config.json 中的 snapshots.dir（{DEFAULT_SNAPSHOT_DIR}）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    commit_parser = subparsers.add_parser("commit", help="为当前模型 JSON 创建快照")
+    commit_parser.add_argument("-m", "--message", default="")
+    subparsers.add_parser("log", help="按时间顺序列出所有快照")
+    diff_parser = subparsers.add_parser("diff", help="比较两个快照（默认 HEAD~1 与 HEAD）")
+    diff_parser.add_argument("old", nargs="?", default="HEAD~1")
+    diff_parser.add_argument("new", nargs="?", default="HEAD")
+    diff_parser.add_argument("--json", action="store_true", help="输出 JSON")
+    checkout_parser = subparsers.add_parser("rollback", help="把模型 JSON 恢复为指定快照")
+    checkout_parser.add_argument("ref", help="快照 ID 前缀、HEAD~N 等")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    models_dir = args.models_dir or config.get("output_dirs", {}).get("cleaned", "modeldata/cleaned")
+    store = SnapshotStore(args.store or config.get("snapshots", {}).get("dir", DEFAULT_SNAPSHOT_DIR))
+
+    try:
+        if args.command == "commit":
+            parent = store.head()
+            snapshot_id = store.commit(models_dir, output_files(config), args.message)
+            if snapshot_id == parent:
+                print(f"与当前快照 {snapshot_id[:SHORT_ID_LENGTH]} 相同，未创建新快照")
+            else:
+                print(f"已创建快照 {snapshot_id[:SHORT_ID_LENGTH]}")
+                if parent:
+                    print_diff(store.diff(parent, snapshot_id))
+        elif args.command == "log":
+            head = store.head()
+            for entry in store.history():
+                marker = "*" if entry["id"] == head else " "
+                print(f"{marker} {entry['id'][:SHORT_ID_LENGTH]}  {entry['created_at']}  "
+                      f"{entry['models']:>5} 个模型  {entry['message']}")
+        elif args.command == "diff":
+            diff = store.diff(store.resolve(args.old), store.resolve(args.new))
+            if args.json:
+                print(json.dumps(diff, ensure_ascii=False, indent=2))
+            else:
+                print_diff(diff)
+        elif args.command == "rollback":
+            snapshot_id = store.resolve(args.ref)
+            touched = store.checkout(snapshot_id, models_dir)
+            print(f"已回滚到快照 {snapshot_id[:SHORT_ID_LENGTH]}，重写 {len(touched)} 个文件")
+            for output_file in touched:
+                print(f"  {output_file}")
+    except KeyError as e:
+        parser.error(e.args[0])
+
+
+if __name__ == "__main__":
+    main()
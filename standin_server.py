@@ -0,0 +1,257 @@
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gguf_reader import synthetic_metadata, write_gguf
+from http_cache import HttpCache
+from model_records import parse_parameter_count
+from ollama_registry import (
+    CONFIG_MEDIA_TYPE, MANIFEST_ACCEPT, MODEL_LAYER_MEDIA_TYPE, parse_file_size, registry_name
+)
+from vram_estimator import HIDDEN_PER_LAYER
+
+
+class StandinServer:
+    """
+    在后台线程中运行的本地替身 HTTP 服务，用于在不访问 ollama.com / registry.ollama.ai 的情况下测试抓取逻辑。
+    routes 为 {路径: (状态码, 响应头字典, 正文 bytes)}；latency 为每个请求增加的延迟（秒），
+    error_rate 为随机返回 503 的概率。200 路由支持单段 Range 请求（返回 206），
+    range_requests 为 False 时忽略 Range 请求头、总是返回完整正文，模拟不支持 Range 的服务器；
+    bytes_sent 记录发送的正文总字节数。可以作为上下文管理器使用
+    """
+
+    def __init__(self, routes=None, latency=0.0, error_rate=0.0, host="127.0.0.1", port=0, range_requests=True):
+        self.routes = dict(routes or {})
+        self.latency = latency
+        self.error_rate = error_rate
+        self.range_requests = range_requests
+        self.requests = []
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_route(self, path, body, content_type="application/json", status=200, headers=None):
+        """注册一个固定响应，body 可以是 str 或 bytes"""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.routes[path] = (status, {"Content-Type": content_type, **(headers or {})}, body)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append(self.path)
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.error_rate and random.random() < server.error_rate:
+                    self._respond(503, {"Content-Type": "text/plain"}, b"stand-in error")
+                    return
+                route = server.routes.get(self.path)
+                if route is None:
+                    self._respond(404, {"Content-Type": "text/plain"}, b"not found")
+                    return
+                status, headers, body = route
+                range_header = self.headers.get("Range")
+                if status == 200 and range_header and server.range_requests:
+                    byte_range = parse_byte_range(range_header, len(body))
+                    if byte_range is None:
+                        self._respond(416, {"Content-Range": f"bytes */{len(body)}"}, b"")
+                        return
+                    start, end = byte_range
+                    headers = {**headers, "Content-Range": f"bytes {start}-{end}/{len(body)}"}
+                    self._respond(206, headers, body[start:end + 1])
+                    return
+                self._respond(status, headers, body)
+
+            def _respond(self, status, headers, body):
+                with server.lock:
+                    server.bytes_sent += len(body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if server.range_requests:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def parse_byte_range(header, size):
+    """
+    解析单段 Range 请求头（bytes=a-b、bytes=a-、bytes=-n），返回闭区间 (start, end)；
+    无法满足时返回 None
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+def _json_bytes(data):
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def add_registry_model(server, name, tag, file_size, arch, parameters, quantization, gguf=None):
+    """
+    为 registry 仓库 name 增加一个标签：manifest、config blob 共两个路由，返回 manifest 摘要；
+    传入 gguf（bytes）时同时以该内容提供模型层 blob（只包含元数据，用于测试 Range 读取）
+    """
+    config = _json_bytes({
+        "model_format": "gguf",
+        "model_family": arch,
+        "model_families": [arch],
+        "model_type": parameters,
+        "file_type": quantization,
+    })
+    config_digest = f"sha256:{hashlib.sha256(config).hexdigest()}"
+    model_size = parse_file_size(file_size) or 0
+    model_digest = f"sha256:{hashlib.sha256(f'{name}:{tag}:{model_size}'.encode()).hexdigest()}"
+    manifest = _json_bytes({
+        "schemaVersion": 2,
+        "mediaType": MANIFEST_ACCEPT,
+        "config": {"mediaType": CONFIG_MEDIA_TYPE, "digest": config_digest, "size": len(config)},
+        "layers": [{
+            "mediaType": MODEL_LAYER_MEDIA_TYPE,
+            "digest": model_digest,
+            "size": model_size,
+        }],
+    })
+    server.add_route(f"/v2/{name}/manifests/{tag}", manifest, content_type=MANIFEST_ACCEPT)
+    server.add_route(f"/v2/{name}/blobs/{config_digest}", config)
+    if gguf is not None:
+        server.add_route(f"/v2/{name}/blobs/{model_digest}", gguf, content_type="application/octet-stream")
+    return hashlib.sha256(manifest).hexdigest()
+
+
+def synthetic_gguf(arch, parameters, vocab_size=4096):
+    """按参数量推算结构（与 VramEstimator 的启发式一致），生成只包含元数据的 GGUF"""
+    parameter_count = parse_parameter_count(parameters) or 1e9
+    hidden_size = max(HIDDEN_PER_LAYER, int(round((parameter_count * HIDDEN_PER_LAYER / 12) ** (1 / 3) / 128)) * 128)
+    num_layers = max(1, hidden_size // HIDDEN_PER_LAYER)
+    return write_gguf(synthetic_metadata(arch or "llama", hidden_size, num_layers, vocab_size=vocab_size))
+
+
+def add_registry_from_catalog(server, config, models_dir, gguf=False):
+    """
+    根据 config.json 和对应的 modeldata JSON 文件为每个模型家族生成 registry 路由，返回生成的标签数；
+    gguf 为 True 时为每个标签提供合成的 GGUF 模型层 blob
+    """
+    count = 0
+    gguf_blobs = {}
+    for model_config in config["models"]:
+        path = Path(models_dir) / model_config["output_file"]
+        if not path.exists():
+            continue
+        name = registry_name(model_config)
+        with open(path, "r", encoding="utf-8") as f:
+            models = json.load(f)
+        for model in models:
+            if not model.get("quantization"):
+                continue
+            tag = model["model"].rsplit(":", 1)[-1]
+            blob = None
+            if gguf:
+                blob_key = (model.get("arch", ""), model.get("parameters", ""))
+                if blob_key not in gguf_blobs:
+                    gguf_blobs[blob_key] = synthetic_gguf(*blob_key)
+                blob = gguf_blobs[blob_key]
+            add_registry_model(
+                server, name, tag, model.get("file_size", ""), model.get("arch", ""),
+                model.get("parameters", ""), model["quantization"], gguf=blob
+            )
+            count += 1
+    return count
+
+
+def add_fixture_routes(server, fixtures_dir):
+    """
+    把 HttpCache 格式的目录（录制或合成的页面）注册为路由，按 URL 路径匹配，
+    返回注册的页面数
+    """
+    count = 0
+    for url, meta, body in HttpCache(fixtures_dir, ttl_seconds=None, max_size_bytes=0).entries():
+        path = urlparse(url).path
+        server.add_route(path, body, content_type=meta.get("content_type") or "text/html; charset=utf-8")
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动本地替身 registry / 页面服务")
+    parser.add_argument("--config", default="config.json", help="模型配置文件")
+    parser.add_argument("--models-dir", default="modeldata/new", help="用于生成 registry 数据的模型 JSON 目录")
+    parser.add_argument("--gguf", action="store_true", help="为每个标签提供合成的 GGUF 模型层 blob（支持 Range 请求）")
+    parser.add_argument("--fixtures", help="同时提供 HttpCache 格式目录中的页面（例如 bench_scraper.py 生成的 fixtures）")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求增加的延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 503 的概率")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    server = StandinServer(latency=args.latency, error_rate=args.error_rate, port=args.port)
+    count = add_registry_from_catalog(server, config, args.models_dir, gguf=args.gguf)
+    print(f"替身 registry 已启动: {server.base_url} ({count} 个标签)")
+    print("在 config.json 中设置 registry.base_url 为该地址，并把模型家族的 source 设为 registry")
+    if args.fixtures:
+        pages = add_fixture_routes(server, args.fixtures)
+        print(f"已加载 {pages} 个页面，可将 site_url 和模型家族的 tags_url 指向该地址")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
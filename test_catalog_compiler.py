@@ -0,0 +1,102 @@
+"""编译目录测试：与直接读取 JSON 的结果一致，以及按文件状态和内容哈希判断是否过期"""
+import json
+import os
+import shutil
+import struct
+
+import pytest
+
+from catalog_compiler import MAGIC, CompiledCatalog, StaleCatalogError, compile_catalog, open_catalog
+from catalog_index import CatalogIndex
+from conftest import MODELS_DIR, load_config
+from model_records import ModelRecord, load_records
+
+
+def as_tuple(record):
+    return tuple(getattr(record, name) for name in ModelRecord.__slots__)
+
+
+@pytest.fixture
+def catalog_sources(tmp_path):
+    """复制到临时目录的 config.json 和模型 JSON，返回 (config_path, models_dir, 编译文件路径)"""
+    models_dir = tmp_path / "models"
+    shutil.copytree(MODELS_DIR, models_dir)
+    config = load_config()
+    config["output_dirs"] = {"cleaned": str(models_dir)}
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return str(config_path), str(models_dir), str(tmp_path / "catalog.bin")
+
+
+def test_compiled_records_match_json(catalog_sources):
+    config_path, models_dir, path = catalog_sources
+    compile_catalog(config_path, models_dir, path)
+    catalog = CompiledCatalog(path)
+    expected = [as_tuple(record) for record in load_records(config_path, models_dir)]
+    assert [as_tuple(record) for record in catalog.records()] == expected
+    assert [as_tuple(catalog.record(i)) for i in range(len(catalog))] == expected
+    catalog.close()
+
+
+def test_compiled_index_matches_json_index(catalog_sources):
+    config_path, models_dir, path = catalog_sources
+    settings = {"context_length": 4096, "batch_size": 2, "architectures": {}}
+    from_json = CatalogIndex.from_catalog(config_path, models_dir, **settings)
+    from_compiled = CatalogIndex.from_compiled(config_path, models_dir, path, **settings)
+    for budget in (4, 16, 48):
+        for filters in ({}, {"family": "qwen 2.5"}, {"quantization": "Q4_K_M", "size_label": "7B"}):
+            assert [(as_tuple(r), v) for r, v in from_compiled.fits(budget, **filters)] == \
+                   [(as_tuple(r), v) for r, v in from_json.fits(budget, **filters)]
+
+
+def test_staleness_by_stat_then_hash(catalog_sources):
+    config_path, models_dir, path = catalog_sources
+    compile_catalog(config_path, models_dir, path)
+    catalog = CompiledCatalog(path)
+    assert catalog.sources_unchanged(config_path, models_dir)
+    assert not catalog.is_stale(config_path, models_dir)
+    # 其他目录的同名数据不能被当作未变化
+    assert not catalog.sources_unchanged(config_path, os.path.dirname(path))
+
+    # 只改变修改时间：需要比较哈希，但内容未变，不算过期
+    source = os.path.join(models_dir, "qwen_2.5_models.json")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not catalog.sources_unchanged(config_path, models_dir)
+    assert not catalog.is_stale(config_path, models_dir)
+    # open_catalog 重新编译以记录新的文件状态
+    reopened = open_catalog(config_path, models_dir, path)
+    assert reopened.sources_unchanged(config_path, models_dir)
+
+    with open(source, "r", encoding="utf-8") as f:
+        models = json.load(f)
+    models[0]["file_size"] = "999GB"
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(models, f)
+    assert reopened.is_stale(config_path, models_dir)
+    with pytest.raises(StaleCatalogError):
+        open_catalog(config_path, models_dir, path, rebuild=False)
+    rebuilt = open_catalog(config_path, models_dir, path)
+    assert "999GB" in rebuilt.column("file_size_label")
+
+    os.remove(os.path.join(models_dir, "llama_3.3_models.json"))
+    assert rebuilt.is_stale(config_path, models_dir)
+    for catalog in (catalog, reopened, rebuilt):
+        catalog.close()
+
+
+def test_old_format_version_is_stale(catalog_sources):
+    config_path, models_dir, path = catalog_sources
+    compile_catalog(config_path, models_dir, path)
+    # 把文件头中的格式版本改为 1
+    with open(path, "r+b") as f:
+        f.seek(len(MAGIC))
+        f.write(struct.pack("<I", 1))
+    with pytest.raises(StaleCatalogError):
+        CompiledCatalog(path)
+    with pytest.raises(StaleCatalogError):
+        open_catalog(config_path, models_dir, path, rebuild=False)
+    catalog = open_catalog(config_path, models_dir, path)
+    assert len(catalog) == len(load_records(config_path, models_dir))
+    catalog.close()
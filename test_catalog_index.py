@@ -0,0 +1,63 @@
+"""CatalogIndex 测试：bisect 查询结果与逐条筛选一致，条件不区分大小写"""
+import pytest
+
+from catalog_index import CatalogIndex
+from conftest import MODELS_DIR, ROOT
+from model_records import load_records
+from vram_estimator import VramEstimator
+
+BUDGETS = [0.5, 4, 8, 16, 24, 48, 80, 1000]
+FILTERS = [
+    {},
+    {"family": "qwen 2.5"},
+    {"size_label": "7B"},
+    {"quantization": "Q4_K_M"},
+    {"family": "qwen 2.5", "quantization": "Q8_0"},
+    {"family": "llama 3.2", "size_label": "3B", "quantization": "Q4_K_M"},
+    {"family": "no such family"},
+]
+
+
+@pytest.fixture(scope="module")
+def records():
+    return load_records(str(ROOT / "config.json"), str(MODELS_DIR))
+
+
+@pytest.fixture(scope="module")
+def index(records):
+    return CatalogIndex(records, context_length=8192, architectures={})
+
+
+def brute_force(records, budget, family=None, size_label=None, quantization=None):
+    vram = VramEstimator(records).estimate([8192], [1])["total"][:, 0, 0]
+    matches = [
+        (record.name, value) for record, value in zip(records, vram.tolist())
+        if value <= budget
+        and (family is None or record.family == family)
+        and (size_label is None or record.size_label == size_label)
+        and (quantization is None or record.quantization.value == quantization)
+    ]
+    return sorted(matches, key=lambda item: (item[1], item[0]))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_fits_matches_brute_force(records, index, filters):
+    for budget in BUDGETS:
+        result = [(record.name, value) for record, value in index.fits(budget, **filters)]
+        assert result == brute_force(records, budget, **filters)
+
+
+def test_filters_are_case_insensitive(index):
+    expected = index.fits(24, family="qwen 2.5", size_label="7B", quantization="Q4_K_M")
+    assert expected
+    assert index.fits(24, family="Qwen 2.5", size_label="7b", quantization="q4_k_m") == expected
+    assert index.fits(24, family="QWEN 2.5", size_label="7b") == index.fits(24, family="qwen 2.5", size_label="7B")
+
+
+def test_count_and_largest_fit(records, index):
+    assert index.count_fits(24) == len(brute_force(records, 24))
+    name, value = brute_force(records, 24, family="qwen 2.5")[-1]
+    record, largest = index.largest_fit(24, family="qwen 2.5")
+    assert (record.name, largest) == (name, value)
+    assert index.largest_fit(0.01) is None
+    assert index.fits_many([8, 24]) == {8: index.fits(8), 24: index.fits(24)}
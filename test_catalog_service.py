@@ -0,0 +1,93 @@
+"""CatalogService 测试：响应缓存、源数据变化后重新加载时缓存失效，以及计算期间重新加载不写入旧结果"""
+import asyncio
+import json
+import shutil
+
+import pytest
+
+from catalog_service import CatalogService
+from conftest import MODELS_DIR, load_config
+
+
+@pytest.fixture
+def service(tmp_path):
+    models_dir = tmp_path / "models"
+    shutil.copytree(MODELS_DIR, models_dir)
+    config = load_config()
+    config["output_dirs"] = {"cleaned": str(models_dir)}
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return CatalogService(
+        str(config_path), str(models_dir), catalog_path=str(tmp_path / "catalog.bin"),
+        architectures_path=str(tmp_path / "gguf_metadata.json"), check_interval=0.01,
+        search_index_path=str(tmp_path / "search_index.json"),
+    )
+
+
+def set_file_size(service, name, file_size):
+    source = f"{service.models_dir}/qwen_2.5_models.json"
+    with open(source, "r", encoding="utf-8") as f:
+        models = json.load(f)
+    for model in models:
+        if f"qwen2.5:{model['model']}" == name:
+            model["file_size"] = file_size
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(models, f)
+
+
+def lookup_file_size(response):
+    status, body, _ = response
+    assert status == 200
+    return json.loads(body)["models"][0]["file_size_label"]
+
+
+def test_responses_are_cached_by_normalized_query(service):
+    first = asyncio.run(service.handle("GET", "/fit?budget=24&family=Qwen%202.5&size=7b"))
+    second = asyncio.run(service.handle("GET", "/fit?size=7B&budget=24.0&family=qwen%202.5"))
+    assert first[0] == 200 and not first[2]
+    assert second == (200, first[1], True)
+    assert asyncio.run(service.handle("GET", "/fit"))[0] == 400
+    assert asyncio.run(service.handle("POST", "/fit?budget=24"))[0] == 405
+
+
+def test_reload_invalidates_cached_responses(service):
+    async def scenario():
+        before = await service.handle("GET", "/lookup?name=qwen2.5:7b")
+        assert (await service.handle("GET", "/lookup?name=qwen2.5:7b"))[2]
+        watcher = asyncio.create_task(service.watch())
+        set_file_size(service, "qwen2.5:7b", "9.9GB")
+        for _ in range(500):
+            if service.snapshot.generation > 1:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        after = await service.handle("GET", "/lookup?name=qwen2.5:7b")
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert service.stats["reloads"] == 1
+    assert lookup_file_size(before) != "9.9GB"
+    assert not after[2]
+    assert lookup_file_size(after) == "9.9GB"
+
+
+def test_result_computed_across_a_reload_is_not_cached(service):
+    estimate = service.estimate
+    query = json.dumps({"models": ["qwen2.5:7b"], "contexts": [4096]}).encode()
+
+    def estimate_then_reload(query):
+        # 模拟 watch() 在线程池计算期间换上新快照并清空缓存
+        result = estimate(query)
+        service.snapshot = service._load()
+        service.cache.clear()
+        return result
+
+    service.estimate = estimate_then_reload
+    status, _, _ = asyncio.run(service.handle("POST", "/estimate", query))
+    assert status == 200
+    assert not service.cache.entries
+
+    service.estimate = estimate
+    assert not asyncio.run(service.handle("POST", "/estimate", query))[2]
+    assert asyncio.run(service.handle("POST", "/estimate", query))[2]
@@ -0,0 +1,55 @@
+"""CrawlJournal 测试：追加、读回、修复中断留下的半行"""
+import json
+
+from crawl_journal import TAIL_CHUNK_SIZE, CrawlJournal
+
+
+def test_append_and_load_keeps_last_record_per_model(tmp_path):
+    journal = CrawlJournal.for_output(str(tmp_path / "qwen_2.5_models.json"))
+    journal.append({"model": "7b", "model_id": "a"})
+    journal.append({"model": "14b", "model_id": "b"})
+    journal.append({"model": "7b", "model_id": "c"})
+    journal.close()
+
+    assert journal.path.endswith("qwen_2.5_models.json.journal.jsonl")
+    assert sorted(journal.load(), key=lambda m: m["model"]) == [
+        {"model": "14b", "model_id": "b"}, {"model": "7b", "model_id": "c"}
+    ]
+
+
+def test_torn_last_line_is_ignored_and_truncated(tmp_path):
+    path = tmp_path / "models.json.journal.jsonl"
+    complete = json.dumps({"model": "7b", "model_id": "a"})
+    path.write_text(complete + "\n" + '{"model": "14b", "mod', encoding="utf-8")
+
+    journal = CrawlJournal(str(path))
+    assert journal.load() == [{"model": "7b", "model_id": "a"}]
+
+    journal.append({"model": "14b", "model_id": "b"})
+    journal.close()
+    assert path.read_text(encoding="utf-8").splitlines() == [complete, json.dumps({"model": "14b", "model_id": "b"})]
+    assert [m["model"] for m in journal.load()] == ["7b", "14b"]
+
+
+def test_torn_line_longer_than_tail_chunk(tmp_path):
+    path = tmp_path / "models.json.journal.jsonl"
+    complete = json.dumps({"model": "7b"})
+    path.write_text(complete + "\n" + '{"description": "' + "x" * (3 * TAIL_CHUNK_SIZE), encoding="utf-8")
+
+    journal = CrawlJournal(str(path))
+    journal.append({"model": "14b"})
+    journal.close()
+    assert path.read_text(encoding="utf-8").splitlines() == [complete, json.dumps({"model": "14b"})]
+
+
+def test_journal_without_any_newline_is_emptied(tmp_path):
+    path = tmp_path / "models.json.journal.jsonl"
+    path.write_text('{"model": "7', encoding="utf-8")
+
+    journal = CrawlJournal(str(path))
+    assert journal.load() == []
+    journal.append({"model": "7b"})
+    journal.close()
+    assert path.read_text(encoding="utf-8") == json.dumps({"model": "7b"}) + "\n"
+    journal.remove()
+    assert not path.exists()
@@ -0,0 +1,153 @@
+"""ModelProcessor 针对替身服务的抓取测试：增量更新和中断后从日志恢复"""
+import json
+from urllib.parse import urlparse
+
+import pytest
+
+from bench_scraper import synthesize_fixtures
+from conftest import MODELS_DIR, load_config
+from crawl_journal import CrawlJournal
+from get_model import ModelProcessor
+from standin_server import add_fixture_routes
+
+FAMILY = "qwen 2.5"
+
+
+@pytest.fixture
+def models():
+    model_config = next(m for m in load_config()["models"] if m["name"] == FAMILY)
+    with open(MODELS_DIR / model_config["output_file"], "r", encoding="utf-8") as f:
+        return json.load(f)[:6]
+
+
+def serve_models(server, tmp_path, models):
+    """把 models 生成为主页面、tags 页面和详情页，替换替身服务上已有的同路径页面"""
+    model_config = next(m for m in load_config()["models"] if m["name"] == FAMILY)
+    run = len(list(tmp_path.glob("fixtures-*")))
+    models_dir, fixtures_dir = tmp_path / f"models-{run}", tmp_path / f"fixtures-{run}"
+    models_dir.mkdir()
+    with open(models_dir / model_config["output_file"], "w", encoding="utf-8") as f:
+        json.dump(models, f, ensure_ascii=False)
+    synthesize_fixtures({"models": [model_config]}, models_dir, fixtures_dir, filler_kb=1)
+    add_fixture_routes(server, fixtures_dir)
+
+
+def make_processor(server, tmp_path, http_cache=False):
+    """返回指向替身服务的 ModelProcessor 和对应的模型家族配置"""
+    config = load_config()
+    model_config = next(m for m in config["models"] if m["name"] == FAMILY)
+    model_config["tags_url"] = f"{server.base_url}{urlparse(model_config['tags_url']).path}"
+    config.update({
+        "output_dirs": {"cleaned": str(tmp_path / "out")},
+        "site_url": server.base_url,
+        "html_parser": "html.parser",
+        "crawl": {"concurrency": 2, "requests_per_second": 0, "max_retries": 0},
+        "http_cache": {"enabled": http_cache, "dir": str(tmp_path / "http"), "ttl_seconds": 3600},
+        "models": [model_config],
+    })
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return ModelProcessor(str(config_path)), model_config
+
+
+def read_output(processor, model_config):
+    with open(processor.get_file_path(model_config["output_file"]), "r", encoding="utf-8") as f:
+        return {m["model"]: m for m in json.load(f)}
+
+
+def detail_path(model):
+    return urlparse(model["url"]).path
+
+
+def test_diff_models_reports_added_removed_and_changed(server, tmp_path):
+    processor, _ = make_processor(server, tmp_path)
+    old = [{"model": "7b", "model_id": "a"}, {"model": "14b", "model_id": "b"}, {"model": "32b", "model_id": "c"}]
+    new = [{"model": "7b", "model_id": "a"}, {"model": "14b", "model_id": "x"}, {"model": "72b", "model_id": "d"}]
+    assert processor.diff_models(old, new) == {"added": ["72b"], "removed": ["32b"], "changed": ["14b"]}
+
+
+def test_incremental_refresh_fetches_only_changed_details(server, tmp_path, models):
+    serve_models(server, tmp_path, models)
+    processor, model_config = make_processor(server, tmp_path)
+    assert processor.process_model(model_config, "full")["status"] == "saved"
+    assert len(server.requests) == 2 + len({m["model_id"] for m in models})
+
+    changed = [dict(m) for m in models[:-1]]
+    changed[0]["model_id"] = "0123456789ab"
+    serve_models(server, tmp_path, changed)
+    server.requests.clear()
+
+    summary = processor.process_model(model_config, "incremental")
+    assert summary["status"] == "saved"
+    assert summary["models"] == len(changed)
+    tags_path = urlparse(model_config["tags_url"]).path
+    assert sorted(server.requests) == sorted([tags_path.replace("/tags", ""), tags_path, detail_path(changed[0])])
+
+    saved = read_output(processor, model_config)
+    assert set(saved) == {m["model"] for m in changed}
+    assert saved[changed[0]["model"]]["model_id"] == "0123456789ab"
+    for model in changed:
+        assert saved[model["model"]]["quantization"] == model["quantization"]
+        assert saved[model["model"]]["parameters"] == model["parameters"]
+
+
+def test_incremental_refresh_revalidates_listing_pages_in_fresh_cache(server, tmp_path, models):
+    serve_models(server, tmp_path, models)
+    processor, model_config = make_processor(server, tmp_path, http_cache=True)
+    processor.process_model(model_config, "full")
+    server.requests.clear()
+
+    assert processor.process_model(model_config, "incremental")["status"] == "saved"
+    tags_path = urlparse(model_config["tags_url"]).path
+    assert server.requests == [tags_path.replace("/tags", ""), tags_path]
+
+
+def test_skip_mode_keeps_existing_output(server, tmp_path, models):
+    serve_models(server, tmp_path, models)
+    processor, model_config = make_processor(server, tmp_path)
+    processor.process_model(model_config, "full")
+    server.requests.clear()
+
+    assert processor.process_model(model_config, "skip")["status"] == "skipped"
+    assert server.requests == []
+
+
+def write_interrupted_journal(processor, model_config, completed):
+    """模拟上次运行中断：日志中有 completed 这些已完成的模型，最后一行只写了一半"""
+    journal = CrawlJournal.for_output(processor.get_file_path(model_config["output_file"]))
+    lines = [json.dumps(model, ensure_ascii=False) for model in completed]
+    with open(journal.path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + '\n{"model": "torn", "url": "http')
+    return journal, lines
+
+
+def test_resume_reuses_journal_and_fetches_the_rest(server, tmp_path, models):
+    serve_models(server, tmp_path, models)
+    processor, model_config = make_processor(server, tmp_path)
+    write_interrupted_journal(processor, model_config, models[:3])
+
+    assert processor.process_model(model_config, "full")["status"] == "saved"
+    fetched = {path for path in server.requests if ":" in path}
+    assert fetched == {detail_path(m) for m in models[3:]}
+    saved = read_output(processor, model_config)
+    assert set(saved) == {m["model"] for m in models}
+    assert all(saved[m["model"]]["quantization"] == m["quantization"] for m in models)
+    # 最终 JSON 写出后日志被删除
+    assert not (tmp_path / "out" / f"{model_config['output_file']}.journal.jsonl").exists()
+
+
+def test_resume_appends_only_newly_fetched_models(server, tmp_path, models):
+    serve_models(server, tmp_path, models)
+    processor, model_config = make_processor(server, tmp_path)
+    journal, lines = write_interrupted_journal(processor, model_config, models[:3])
+
+    try:
+        processor.fetch_family_data(model_config, journal=journal)
+    finally:
+        journal.close()
+    with open(journal.path, "r", encoding="utf-8") as f:
+        journal_lines = f.read().splitlines()
+    # 半行被截掉，已在日志中的模型不再重复写入
+    assert journal_lines[:3] == lines
+    assert sorted(json.loads(line)["model"] for line in journal_lines[3:]) == sorted(m["model"] for m in models[3:])
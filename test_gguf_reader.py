@@ -0,0 +1,97 @@
+"""GGUF 读取测试：本地 mmap 与 HTTP Range 读取、服务器不支持 Range 时的处理，以及从替身 registry 读取整个家族"""
+import json
+
+import pytest
+
+from conftest import MODELS_DIR, load_config
+from gguf_reader import (
+    MmapSource, RangeSource, architecture_fields, fetch_architectures, read_architecture, read_metadata,
+    synthetic_metadata, write_gguf,
+)
+from model_records import load_records
+from standin_server import StandinServer, add_registry_from_catalog
+from vram_estimator import VramEstimator
+
+PADDING = 4 * 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def blob():
+    return write_gguf(synthetic_metadata("llama", 4096, 32, vocab_size=256), padding=PADDING)
+
+
+def test_local_file_read_via_mmap(tmp_path, blob):
+    path = tmp_path / "model.gguf"
+    path.write_bytes(blob)
+    fields, bytes_read = read_architecture(str(path))
+    assert fields == architecture_fields(synthetic_metadata("llama", 4096, 32, vocab_size=256))
+    assert fields["kv_values_per_token"] == 32 * 8 * (128 + 128)
+    # 遇到 tokenizer.* 键时提前停止，不解析词表
+    assert bytes_read < len(blob) - PADDING
+
+
+def test_full_metadata_round_trip(tmp_path):
+    metadata = synthetic_metadata("qwen2", 3584, 28, head_count=28, head_count_kv=4, vocab_size=16)
+    path = tmp_path / "model.gguf"
+    path.write_bytes(write_gguf(metadata, tensor_count=3))
+    source = MmapSource(str(path))
+    try:
+        result = read_metadata(source)
+    finally:
+        source.close()
+    assert result["tensor_count"] == 3
+    assert result["metadata"] == pytest.approx(metadata)
+
+
+def test_header_read_over_range(server, blob):
+    server.add_route("/blobs/model.gguf", blob, content_type="application/octet-stream")
+
+    fields, bytes_read = read_architecture(f"{server.base_url}/blobs/model.gguf")
+    assert fields["architecture"] == "llama"
+    assert fields["hidden_size"] == 4096
+    assert fields["num_layers"] == 32
+    assert fields["head_count_kv"] == 8
+    # 只读取了元数据所在的开头部分，没有下载填充的张量数据
+    assert bytes_read < len(blob)
+    assert server.bytes_sent < len(blob)
+
+
+def test_server_ignoring_range_is_rejected_without_reading_body(blob):
+    with StandinServer(range_requests=False) as server:
+        server.add_route("/blobs/model.gguf", blob, content_type="application/octet-stream")
+        source = RangeSource(f"{server.base_url}/blobs/model.gguf")
+        responses = []
+
+        def get(url, headers):
+            responses.append(source._session_get(url, headers))
+            return responses[-1]
+
+        source.get = get
+        with pytest.raises(ValueError, match="不支持 Range"):
+            source.ensure(16)
+        source.close()
+    assert responses[0].status_code == 200
+    # 以流式方式请求，检查状态码后直接关闭，正文没有被读取
+    assert responses[0].raw.tell() < len(blob)
+    assert responses[0].raw.closed
+    assert not source.buffer
+
+
+def test_fetch_architectures_from_standin_registry(server, tmp_path):
+    config = load_config()
+    config["models"] = [m for m in config["models"] if m["name"] == "llama 3.2"]
+    config["registry"] = {"base_url": server.base_url}
+    config["crawl"] = {"max_retries": 0}
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    add_registry_from_catalog(server, config, MODELS_DIR, gguf=True)
+
+    results, stats = fetch_architectures(str(config_path), str(MODELS_DIR), workers=2)
+    records = load_records(str(config_path), str(MODELS_DIR))
+    model_ids = {record.model_id for record in records if record.model_id}
+    assert stats["failures"] == 0 and stats["blobs"] == len(model_ids)
+    assert model_ids <= set(results)
+    # 估算器对每个有 GGUF 字段的模型使用其中的结构
+    estimator = VramEstimator(records, results)
+    assert estimator.gguf_count == sum(1 for record in records if record.model_id in results)
@@ -0,0 +1,78 @@
+"""页面提取后端一致性测试：strainer 和 lxml 的输出必须与完整的 BeautifulSoup 文档树一致"""
+from urllib.parse import urlparse
+
+import pytest
+
+from bench_scraper import synthesize_fixtures
+from conftest import MODELS_DIR, load_config
+from html_parsers import get_html_parser, lxml
+from http_cache import HttpCache
+
+BACKENDS = ["strainer", pytest.param("lxml", marks=pytest.mark.skipif(lxml is None, reason="未安装 lxml"))]
+
+EDGE_CASES = {
+    "main": (
+        '<html><body><nav id="tags-nav">'
+        '<a href="/library/qwen2.5:7b"><span class="x" title="7b">7b <b>new</b></span></a>'
+        '<a href="/library/qwen2.5/tags">View all</a></nav></body></html>'
+    ),
+    "tags": (
+        '<html><body>'
+        '<div class="flex px-4 py-3"><a class="group" href="/library/qwen2.5:7b">'
+        '<div class="break-all text-sm"> 7b </div></a>'
+        '<div class="flex items-baseline space-x-1 text-[13px] text-neutral-500">'
+        '<span> 845dbda0ea48 • 4.7GB\n • 32K context window </span></div></div>'
+        '<div class="flex px-4 py-3"><span>no link</span></div>'
+        '<div class="flex px-4 py-3"><a href="/library/qwen2.5:latest">latest</a></div>'
+        '</body></html>'
+    ),
+    "detail": (
+        '<html><body><div class="min-w-full divide-y divide-gray-200">'
+        '<div class="flex sm:space-x-2 items-center"><span class="hidden sm:block">Arch</span>'
+        '<span class="text-neutral-400 font-mono">qwen2</span></div>'
+        '<div class="flex sm:space-x-2 items-center"><span class="hidden sm:block">Parameters</span></div>'
+        '</div><div class="prose dark:prose-invert"><p>Qwen &amp; <em>friends</em></p>'
+        '<script>ignored()</script><p>second</p></div></body></html>'
+    ),
+}
+
+METHODS = {"main": "default_models", "tags": "tag_rows", "detail": "model_info"}
+
+
+def page_kind(url):
+    path = urlparse(url).path
+    if path.endswith("/tags"):
+        return "tags"
+    return "detail" if ":" in path else "main"
+
+
+@pytest.fixture(scope="module")
+def pages(tmp_path_factory):
+    """为两个模型家族合成的主页面、tags 页面和详情页，返回 [(页面类型, html)]"""
+    config = load_config()
+    families = {"qwen 2.5", "llama 3.2"}
+    fixtures_dir = tmp_path_factory.mktemp("fixtures")
+    config = {"models": [m for m in config["models"] if m["name"] in families]}
+    synthesize_fixtures(config, MODELS_DIR, fixtures_dir, filler_kb=2)
+    return [(page_kind(url), body.decode("utf-8"))
+            for url, _, body in HttpCache(fixtures_dir, ttl_seconds=None, max_size_bytes=0).entries()]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_match_full_tree_on_synthesized_pages(pages, backend):
+    reference, extractor = get_html_parser("html.parser"), get_html_parser(backend)
+    assert {kind for kind, _ in pages} == set(METHODS)
+    for kind, html in pages:
+        method = METHODS[kind]
+        assert getattr(extractor, method)(html) == getattr(reference, method)(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("kind", sorted(EDGE_CASES))
+def test_backends_match_full_tree_on_edge_cases(backend, kind):
+    reference, extractor = get_html_parser("html.parser"), get_html_parser(backend)
+    method, html = METHODS[kind], EDGE_CASES[kind]
+    expected = getattr(reference, method)(html)
+    assert expected
+    assert getattr(extractor, method)(html) == expected
+    assert getattr(extractor, method)("") == getattr(reference, method)("")
@@ -0,0 +1,110 @@
+"""HttpCache 测试：TTL 命中、条件请求重新验证、按请求头区分的缓存键和 offline 重放"""
+import pytest
+import requests
+
+from http_cache import CacheMissError, HttpCache
+from http_client import HttpClient
+
+URL = "https://ollama.com/library/qwen2.5/tags"
+
+
+def make_response(status, body=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.url = URL
+    response._content = body
+    response.encoding = "utf-8"
+    response.headers.update(headers or {})
+    return response
+
+
+class Sender:
+    """记录每次 send 收到的条件请求头，并按顺序返回预设的响应"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, conditional_headers):
+        self.calls.append(conditional_headers)
+        return self.responses.pop(0)
+
+
+def test_fresh_entry_is_served_without_sending(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.fetch(URL, Sender(make_response(200, b"tags", {"ETag": '"v1"'})))
+
+    send = Sender()
+    response = cache.fetch(URL, send)
+    assert response.content == b"tags"
+    assert response.headers["X-Cache"] == "HIT"
+    assert send.calls == []
+    assert cache.stats["hits"] == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path):
+    cache = HttpCache(tmp_path, ttl_seconds=0)
+    cache.fetch(URL, Sender(make_response(200, b"tags", {"ETag": '"v1"'})))
+
+    send = Sender(make_response(304))
+    response = cache.fetch(URL, send)
+    assert send.calls == [{"If-None-Match": '"v1"'}]
+    assert response.content == b"tags"
+    assert cache.stats["revalidated"] == 1
+
+
+def test_revalidate_sends_conditional_request_for_fresh_entry(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.fetch(URL, Sender(make_response(200, b"tags", {"ETag": '"v1"'})))
+
+    send = Sender(make_response(200, b"new tags", {"ETag": '"v2"'}))
+    assert cache.fetch(URL, send, revalidate=True).content == b"new tags"
+    assert send.calls == [{"If-None-Match": '"v1"'}]
+    assert cache.fetch(URL, Sender()).content == b"new tags"
+
+
+def test_accept_header_selects_separate_entries(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.fetch(URL, Sender(make_response(200, b"<html>")))
+    cache.fetch(URL, Sender(make_response(200, b"{}")), headers={"Accept": "application/json"})
+
+    assert cache.fetch(URL, Sender()).content == b"<html>"
+    assert cache.fetch(URL, Sender(), headers={"accept": "application/json"}).content == b"{}"
+    assert cache.lookup(URL, {"Accept": "text/plain"}) == (None, None)
+
+
+def test_range_requests_bypass_the_cache(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.fetch(URL, Sender(make_response(200, b"whole body")))
+
+    send = Sender(make_response(206, b"whole", {"Content-Range": "bytes 0-4/10"}))
+    response = cache.fetch(URL, send, headers={"Range": "bytes=0-4"})
+    assert response.status_code == 206
+    assert send.calls == [{}]
+    assert cache.stats["bypassed"] == 1
+    assert cache.fetch(URL, Sender()).content == b"whole body"
+
+    cache.offline = True
+    with pytest.raises(CacheMissError):
+        cache.fetch(URL, Sender(), headers={"Range": "bytes=0-4"})
+
+
+def test_cache_replay_offline(server, tmp_path):
+    server.add_route("/library/qwen2.5/tags", "<html>tags</html>", content_type="text/html; charset=utf-8")
+    url = f"{server.base_url}/library/qwen2.5/tags"
+    cache_config = {"enabled": True, "dir": str(tmp_path / "http")}
+
+    online = HttpClient(max_retries=0, cache=HttpCache.from_config(cache_config))
+    assert online.get(url).text == "<html>tags</html>"
+    assert server.requests == ["/library/qwen2.5/tags"]
+
+    offline_cache = HttpCache.from_config({**cache_config, "offline": True})
+    offline = HttpClient(max_retries=0, cache=offline_cache)
+    response = offline.get(url)
+    assert response.text == "<html>tags</html>"
+    assert server.requests == ["/library/qwen2.5/tags"]
+    assert offline_cache.stats["hits"] == 1
+
+    with pytest.raises(CacheMissError):
+        offline.get(f"{server.base_url}/library/qwen2.5")
+    assert server.requests == ["/library/qwen2.5/tags"]
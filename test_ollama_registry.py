@@ -0,0 +1,77 @@
+"""registry 数据来源测试：manifest / config blob 解析，以及 ModelProcessor 通过替身 registry 抓取模型数据"""
+import json
+
+import pytest
+
+from conftest import MODELS_DIR, load_config
+from get_model import ModelProcessor
+from http_client import HttpClient
+from ollama_registry import RegistryClient, format_file_size, parse_file_size, registry_name
+from standin_server import add_registry_from_catalog, add_registry_model
+
+
+def _getter(client):
+    def get(url, headers):
+        response = client.get(url, headers)
+        response.raise_for_status()
+        return response
+    return get
+
+
+@pytest.mark.parametrize("text, num_bytes", [("531MB", 531000000), ("9.0GB", 9000000000), ("16GB", 16000000000)])
+def test_file_size_round_trip(text, num_bytes):
+    assert parse_file_size(text) == num_bytes
+    assert format_file_size(num_bytes) == text
+
+
+def test_registry_name():
+    assert registry_name({"base_url": "https://ollama.com/library/qwen2.5"}) == "library/qwen2.5"
+    assert registry_name({"base_url": "https://ollama.com/someone/model"}) == "someone/model"
+    assert registry_name({"base_url": "https://ollama.com/x", "registry_name": "library/y"}) == "library/y"
+
+
+def test_registry_manifest_round_trip(server):
+    digest = add_registry_model(server, "library/qwen2.5", "7b", "4.7GB", "qwen2", "7.6B", "Q4_K_M")
+    registry = RegistryClient(_getter(HttpClient(max_retries=0)), base_url=server.base_url)
+
+    manifest = registry.fetch_manifest("library/qwen2.5", "7b")
+    assert manifest["model_id"] == digest[:12]
+    assert manifest["file_size"] == "4.7GB"
+    assert manifest["model_digest"].startswith("sha256:")
+
+    details = registry.fetch_config("library/qwen2.5", manifest["config_digest"])
+    assert details == {"arch": "qwen2", "parameters": "7.6B", "quantization": "Q4_K_M"}
+
+
+def test_processor_reads_catalog_from_registry(server, tmp_path):
+    config = load_config()
+    model_config = next(m for m in config["models"] if m["name"] == "qwen 2.5")
+    with open(MODELS_DIR / model_config["output_file"], "r", encoding="utf-8") as f:
+        catalog = {m["model"]: m for m in json.load(f)}
+    add_registry_from_catalog(server, {"models": [model_config]}, MODELS_DIR)
+
+    tags = sorted(catalog)[:8]
+    model_config = dict(model_config, source="registry", tags=tags, default_tags=tags[:1])
+    config.update({
+        "output_dirs": {"cleaned": str(tmp_path / "out")},
+        "registry": {"base_url": server.base_url},
+        "crawl": {"concurrency": 4, "requests_per_second": 0, "max_retries": 0},
+        "http_cache": {"enabled": False},
+    })
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+
+    models = ModelProcessor(str(config_path)).fetch_family_data(model_config)
+    assert sorted(m["model"] for m in models) == tags
+    assert [m["model"] for m in models if m["is_default"]] == tags[:1]
+    for model in models:
+        expected = catalog[model["model"]]
+        for key in ("file_size", "arch", "parameters", "quantization"):
+            assert model[key] == expected[key]
+
+    manifests = [path for path in server.requests if "/manifests/" in path]
+    blobs = [path for path in server.requests if "/blobs/" in path]
+    assert len(manifests) == len(tags)
+    # 每个 config blob 只读取一次
+    assert len(blobs) == len(set(blobs))
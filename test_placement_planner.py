@@ -0,0 +1,76 @@
+"""PlacementPlanner 测试：精确求解与启发式装箱、张量并行、method 标记和容量约束"""
+import pytest
+
+from conftest import MODELS_DIR, ROOT
+from model_records import load_records
+from placement_planner import PlacementPlanner
+
+
+@pytest.fixture(scope="module")
+def planner():
+    return PlacementPlanner(load_records(str(ROOT / "config.json"), str(MODELS_DIR)))
+
+
+def synthetic_planner(demands):
+    """实例显存固定为 demands（GB）的规划器，utilization 为 1，便于构造装箱用例"""
+    planner = PlacementPlanner([], utilization=1.0)
+    planner.instance_demands = lambda models: [
+        {"instance": f"m{n}#0", "model": f"m{n}", "weights_gb": demand, "kv_cache_gb": 0.0,
+         "activation_gb": 0.0, "memory_gb": demand}
+        for n, demand in enumerate(demands)
+    ]
+    return planner
+
+
+def assert_within_capacity(result):
+    for gpu in result["gpus"]:
+        assert gpu["headroom_gb"] >= -1e-6
+
+
+def test_exact_solver_beats_best_fit_decreasing():
+    # 最佳适应递减需要 3 张卡：{5, 4}、{3, 3, 3}、{2}；最优解为 {5, 3, 2}、{4, 3, 3}
+    planner = synthetic_planner([5, 4, 3, 3, 3, 2])
+    fleet = [{"name": "gpu", "vram_gb": 10, "count": 4}]
+    heuristic = planner.plan(fleet, [], exact=False)
+    exact = planner.plan(fleet, [], exact=True)
+    assert heuristic["method"] == "heuristic" and heuristic["summary"]["gpus_used"] == 3
+    assert exact["method"] == "exact" and exact["summary"]["gpus_used"] == 2
+    assert exact["summary"]["placed"] == 6 and not exact["unplaced"]
+    assert_within_capacity(exact)
+    assert_within_capacity(heuristic)
+
+
+def test_exact_is_default_for_small_problems(planner):
+    fleet = [{"name": "RTX 4090", "vram_gb": 24, "count": 4}]
+    result = planner.plan(fleet, [{"model": "qwen2.5:7b", "replicas": 3}, {"model": "llama3.2:3b"}])
+    assert result["method"] == "exact"
+    assert result["summary"]["placed"] == 4
+    assert_within_capacity(result)
+
+
+def test_tensor_parallel_plan_is_reported_as_heuristic(planner):
+    fleet = [{"name": "H100", "vram_gb": 80, "count": 8, "node": "node-1"}]
+    result = planner.plan(fleet, [{"model": "deepseek-r1:671b"}, {"model": "qwen2.5:7b", "replicas": 2}])
+    assert result["method"] == "heuristic"
+    placements = {p["instance"]: p for p in result["placements"]}
+    assert placements["deepseek-r1:671b#0"]["tensor_parallel"] == 8
+    assert all(gpu.startswith("node-1/") for gpu in placements["deepseek-r1:671b#0"]["gpus"])
+    assert placements["qwen2.5:7b#0"]["tensor_parallel"] == 1
+    assert_within_capacity(result)
+
+
+def test_instances_that_do_not_fit_are_unplaced(planner):
+    # 张量并行只在同一台机器内进行，两台各 4 张卡的机器放不下 671b
+    fleet = [{"name": "A100", "vram_gb": 80, "count": 4, "node": "a"}, {"name": "A100", "vram_gb": 80, "count": 4, "node": "b"}]
+    result = planner.plan(fleet, [{"model": "deepseek-r1:671b"}])
+    assert [item["instance"] for item in result["unplaced"]] == ["deepseek-r1:671b#0"]
+    assert result["summary"]["gpus_used"] == 0
+
+
+def test_resolve_quantization_variant(planner):
+    index = planner.resolve({"model": "qwen2.5:7b", "quantization": "q8_0"})
+    record = planner.records[index]
+    assert record.quantization.value == "Q8_0"
+    assert record.family == planner.records[planner.by_name["qwen2.5:7b"]].family
+    with pytest.raises(ValueError):
+        planner.resolve({"model": "no-such-model:1b"})
@@ -0,0 +1,134 @@
+"""QuantRecommender 测试：Pareto 前沿、与 VramEstimator/CatalogIndex 一致的显存，以及源数据变化后的重建"""
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from catalog_index import CatalogIndex
+from conftest import MODELS_DIR, ROOT, load_config
+from model_records import load_records
+from quant_recommender import QuantRecommender, build_frontiers, tag_variant
+from vram_estimator import VramEstimator
+
+
+@pytest.fixture(scope="module")
+def records():
+    return load_records(str(ROOT / "config.json"), str(MODELS_DIR))
+
+
+@pytest.fixture
+def recommender(tmp_path):
+    return QuantRecommender(str(ROOT / "config.json"), str(MODELS_DIR), cache_path=str(tmp_path / "frontiers.json"),
+                            architectures_path=str(tmp_path / "gguf_metadata.json"))
+
+
+def qwen_7b_architectures(records):
+    """qwen 2.5 7B 的 GGUF 字段（GQA，KV 宽度为 512）；同一尺寸的各个量化结构相同，字段按 model_id 记录"""
+    fields = {"hidden_size": 3584, "num_layers": 28, "kv_values_per_token": 2 * 28 * 512, "context_length": 32768}
+    return {record.model_id: fields for record in records
+            if record.family == "qwen 2.5" and record.size_label == "7B"}
+
+
+@pytest.mark.parametrize("tag, expected", [
+    ("7b-instruct-q4_K_M", "instruct"),
+    ("0.5b-q8_0", ""),
+    ("70b-instruct-fp16", "instruct"),
+    ("7b", None),
+    ("latest", None),
+])
+def test_tag_variant(tag, expected):
+    assert tag_variant(tag) == expected
+
+
+def test_frontiers_are_pareto_optimal(records):
+    frontiers = build_frontiers(records)
+    assert frontiers
+    for group in frontiers.values():
+        points = group["points"]
+        assert all(a["weights_gb"] <= b["weights_gb"] for a, b in zip(points, points[1:]))
+        assert all(a["bits_per_weight"] < b["bits_per_weight"] for a, b in zip(points, points[1:]))
+
+
+def test_per_token_overhead_follows_architectures(records):
+    architectures = qwen_7b_architectures(records)
+    row = next(i for i, record in enumerate(records) if record.name == "qwen2.5:7b")
+    group = build_frontiers(records, architectures)["qwen 2.5|7B|instruct"]
+    expected = VramEstimator(records, architectures).estimate([1], [1])
+    assert group["kv_per_token_gb"] == pytest.approx(expected["kv_cache"][row, 0, 0])
+    assert group["activation_per_token_gb"] == pytest.approx(expected["activation"][row, 0, 0])
+    # GGUF 中的 KV 宽度（GQA）比按 hidden_size 估算的小
+    assert group["kv_per_token_gb"] < build_frontiers(records)["qwen 2.5|7B|instruct"]["kv_per_token_gb"]
+
+
+@pytest.mark.parametrize("context_length, batch_size", [(2048, 1), (16384, 1), (8192, 4)])
+def test_memory_matches_estimator_and_index(records, recommender, context_length, batch_size):
+    result = recommender.recommend("qwen 2.5", "7B", 12, context_length=context_length, batch_size=batch_size)
+    assert result is not None
+    row = next(i for i, record in enumerate(records) if record.name == result["name"])
+    total = VramEstimator(records).estimate([context_length], [batch_size])["total"][row, 0, 0]
+    assert result["memory_gb"] == pytest.approx(total)
+
+    index = CatalogIndex(records, context_length=context_length, batch_size=batch_size, architectures={})
+    fitting = {record.name for record, _ in index.fits(12, family="qwen 2.5", size_label="7B")}
+    assert result["name"] in fitting
+    # 前沿上质量更高的下一个量化放不下
+    points = recommender.frontier("qwen 2.5", "7B")
+    better = [point["name"] for point in points if point["bits_per_weight"] > result["bits_per_weight"]]
+    assert not set(better) & fitting
+
+
+def test_budget_too_small_and_unknown_model(recommender):
+    assert recommender.recommend("qwen 2.5", "7B", 0.5) is None
+    with pytest.raises(KeyError):
+        recommender.recommend("no such family", "7B", 8)
+
+
+def test_cache_is_reused_and_rebuilt_when_sources_change(tmp_path):
+    models_dir = tmp_path / "models"
+    shutil.copytree(MODELS_DIR, models_dir)
+    config = load_config()
+    config["output_dirs"] = {"cleaned": str(models_dir)}
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    options = {"cache_path": str(tmp_path / "frontiers.json"), "check_interval": 0,
+               "architectures_path": str(tmp_path / "gguf_metadata.json")}
+
+    first = QuantRecommender(str(config_path), str(models_dir), **options)
+    assert first.rebuilds == 1
+    second = QuantRecommender(str(config_path), str(models_dir), **options)
+    assert second.rebuilds == 0
+    assert second.frontiers == first.frontiers
+    before = second.recommend("qwen 2.5", "7B", 12)
+
+    # 把推荐结果的文件大小改得放不下，查询时发现源文件变化并重建
+    source = models_dir / "qwen_2.5_models.json"
+    with open(source, "r", encoding="utf-8") as f:
+        models = json.load(f)
+    for model in models:
+        if f"qwen2.5:{model['model']}" == before["name"]:
+            model["file_size"] = "40GB"
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(models, f)
+    after = second.recommend("qwen 2.5", "7B", 12)
+    assert second.rebuilds == 1
+    assert after["name"] != before["name"]
+    assert np.isfinite(after["memory_gb"]) and after["memory_gb"] <= 12
+
+
+def test_architectures_file_is_used_and_invalidates_cache(records, recommender):
+    recommender.check_interval = 0
+    before = recommender.recommend("qwen 2.5", "7B", 12, context_length=32768)
+    architectures = qwen_7b_architectures(records)
+    with open(recommender.architectures_path, "w", encoding="utf-8") as f:
+        json.dump(architectures, f)
+
+    after = recommender.recommend("qwen 2.5", "7B", 12, context_length=32768)
+    assert recommender.rebuilds == 2
+    row = next(i for i, record in enumerate(records) if record.name == after["name"])
+    total = VramEstimator(records, architectures).estimate([32768], [1])["total"][row, 0, 0]
+    assert after["memory_gb"] == pytest.approx(total)
+    # GQA 的 KV cache 更小，同样的预算可以放下更高质量的量化
+    assert before is None or after["bits_per_weight"] >= before["bits_per_weight"]
+    assert after["memory_gb"] < VramEstimator(records).estimate([32768], [1])["total"][row, 0, 0]
@@ -0,0 +1,114 @@
+"""SearchIndex 测试：分词、精确 / 前缀 / 模糊匹配的排序、过滤条件，以及保存后的读取和过期重建"""
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from conftest import MODELS_DIR, ROOT, load_config
+from model_records import load_catalog, load_records
+from search_index import SearchIndex, edit_distance, open_index, tokenize
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SearchIndex.build(load_catalog(str(ROOT / "config.json"), str(MODELS_DIR)))
+
+
+@pytest.fixture(scope="module")
+def records():
+    return load_records(str(ROOT / "config.json"), str(MODELS_DIR))
+
+
+def test_tokenize_mixed_text():
+    assert tokenize("Qwen2.5 代码生成 q5_K_M the model") == [
+        "qwen2.5", "qwen2", "代码", "码生", "生成", "q5_k_m", "q5", "model"
+    ]
+    assert tokenize("码") == ["码"]
+    assert tokenize("") == []
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("qwen", "qwen", 1, 0),
+    ("qwn", "qwen", 1, 1),
+    ("deepsek", "deepseek", 2, 1),
+    ("lama", "llama", 1, 1),
+    ("qwen", "qewn", 1, 1),
+    ("mistral", "llama", 2, 3),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
+
+
+def test_exact_matches_rank_first_and_defaults_break_ties(index):
+    results = index.search("qwen2.5 7b", limit=20)
+    assert results[0]["name"] == "qwen2.5:7b"
+    scores = [result["score"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+    # 同分的结果中默认标签排在前面
+    for previous, current in zip(results, results[1:]):
+        if previous["score"] == current["score"] and current["is_default"]:
+            assert previous["is_default"]
+    # 每个查询词都要匹配
+    assert all(result["size_label"] == "7B" for result in results)
+
+
+def test_prefix_and_fuzzy_matching(index):
+    prefix = index.search("deeps", limit=0)
+    assert prefix[0]["family"].startswith("deepseek")
+    assert {result["name"] for result in index.search("deepseek", limit=0)} <= {result["name"] for result in prefix}
+    fuzzy = index.search("deepsek r1", limit=0)
+    assert {result["name"] for result in fuzzy} == {result["name"] for result in index.search("deepseek r1", limit=0)}
+    assert fuzzy[0]["score"] < index.search("deepseek r1")[0]["score"]
+    assert "qwen2.5:7b" in [result["name"] for result in index.search("qwn 7b", limit=0)]
+    assert index.search("qwn", prefix=False, fuzzy=False) == []
+
+
+def test_chinese_description_search(index):
+    families = {result["family"] for result in index.search("代码生成", limit=0)}
+    assert {"qwen 2.5-coder", "deepseek r1"} <= families
+    assert "llama 3.2" not in families
+
+
+def test_filters_match_brute_force(index, records):
+    filters = {"family": "QWEN 2.5", "quantization": ["q8_0", "Q4_K_M"], "min_size": 3, "max_size": 7}
+    expected = {
+        record.name for record in records
+        if record.family == "qwen 2.5" and record.quantization.value in ("Q8_0", "Q4_K_M")
+        and record.size_billions is not None and 3 <= record.size_billions <= 7
+    }
+    assert expected
+    assert {result["name"] for result in index.search("", limit=0, **filters)} == expected
+    # 过滤条件与查询词同时生效
+    assert {result["name"] for result in index.search("instruct", limit=0, **filters)} == \
+           {name for name in expected if "instruct" in name}
+    assert index.search("", limit=0, family="no such family") == []
+    assert all(result["quantization"] == "Q8_0" for result in index.search("llama", limit=0, quantization="q8_0"))
+
+
+def test_saved_index_round_trip_and_rebuild(tmp_path):
+    models_dir = tmp_path / "models"
+    shutil.copytree(MODELS_DIR, models_dir)
+    config = load_config()
+    config["output_dirs"] = {"cleaned": str(models_dir)}
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    path = tmp_path / "search_index.npz"
+
+    built = open_index(str(config_path), str(models_dir), str(path))
+    loaded = SearchIndex.load(path)
+    for name, array in built.arrays.items():
+        np.testing.assert_array_equal(loaded.arrays[name], array)
+    assert loaded.search("coder 32b q5") == built.search("coder 32b q5")
+    assert open_index(str(config_path), str(models_dir), str(path)).source_hash == built.source_hash
+
+    source = models_dir / "llama_3.2_models.json"
+    with open(source, "r", encoding="utf-8") as f:
+        models = json.load(f)
+    models[0]["model"] = "3b-zzzunique-q4_K_M"
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(models, f)
+    rebuilt = open_index(str(config_path), str(models_dir), str(path))
+    assert [result["name"] for result in rebuilt.search("zzzunique")] == ["llama3.2:3b-zzzunique-q4_K_M"]
+    assert built.search("zzzunique") == []
@@ -0,0 +1,107 @@
+"""SnapshotStore 测试：commit、diff 与回滚的往返，回滚后的文件与原文件逐字节一致"""
+import json
+import shutil
+
+import pytest
+
+from conftest import MODELS_DIR, load_config
+from snapshot_store import SnapshotStore, output_files
+
+QWEN_FILE = "qwen_2.5_models.json"
+LLAMA_FILE = "llama_3.3_models.json"
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """复制到临时目录的模型 JSON 和一个空的快照库，返回 (store, models_dir, 模型家族文件名)"""
+    models_dir = tmp_path / "models"
+    shutil.copytree(MODELS_DIR, models_dir)
+    return SnapshotStore(tmp_path / "snapshots"), models_dir, output_files(load_config())
+
+
+def read_models(models_dir, output_file):
+    with open(models_dir / output_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_models(models_dir, output_file, models):
+    with open(models_dir / output_file, "w", encoding="utf-8") as f:
+        json.dump(models, f, indent=2, ensure_ascii=False)
+
+
+def test_commit_is_idempotent_and_resolves_refs(catalog):
+    store, models_dir, files = catalog
+    first = store.commit(models_dir, files, "初始")
+    assert store.head() == first
+    assert store.commit(models_dir, files, "没有变化") == first
+    assert [entry["id"] for entry in store.history()] == [first]
+
+    models = read_models(models_dir, QWEN_FILE)
+    models[0]["file_size"] = "1.0GB"
+    write_models(models_dir, QWEN_FILE, models)
+    second = store.commit(models_dir, files, "修改")
+    assert store.resolve("HEAD") == second
+    assert store.resolve("HEAD~1") == first
+    assert store.resolve(first[:8]) == first
+    with pytest.raises(KeyError):
+        store.resolve("HEAD~2")
+    # 未变化的家族复用同一棵树
+    old, new = store.snapshot(first)["families"], store.snapshot(second)["families"]
+    assert old[LLAMA_FILE] == new[LLAMA_FILE]
+    assert old[QWEN_FILE]["tree"] != new[QWEN_FILE]["tree"]
+
+
+def test_diff_reports_added_removed_and_changed(catalog):
+    store, models_dir, files = catalog
+    first = store.commit(models_dir, files)
+    models = read_models(models_dir, QWEN_FILE)
+    changed, removed = models[0], models.pop(1)
+    old_size = changed["file_size"]
+    changed["file_size"] = "1.0GB"
+    models.append({**removed, "model": "qwen2.5:99b-test-q4_K_M"})
+    write_models(models_dir, QWEN_FILE, models)
+    second = store.commit(models_dir, files)
+
+    diff = store.diff(first, second)
+    assert list(diff) == [QWEN_FILE]
+    assert diff[QWEN_FILE]["added"] == ["qwen2.5:99b-test-q4_K_M"]
+    assert diff[QWEN_FILE]["removed"] == [removed["model"]]
+    assert diff[QWEN_FILE]["changed"] == [{"model": changed["model"], "fields": {"file_size": [old_size, "1.0GB"]}}]
+    assert store.diff(second, second) == {}
+    reverse = store.diff(second, first)[QWEN_FILE]
+    assert reverse["added"] == [removed["model"]] and reverse["removed"] == ["qwen2.5:99b-test-q4_K_M"]
+
+
+def test_key_order_only_change_is_not_reported(catalog):
+    store, models_dir, files = catalog
+    first = store.commit(models_dir, files)
+    models = read_models(models_dir, QWEN_FILE)
+    models[0] = dict(reversed(list(models[0].items())))
+    write_models(models_dir, QWEN_FILE, models)
+    second = store.commit(models_dir, files)
+    assert second != first
+    assert store.diff(first, second) == {}
+
+
+def test_checkout_round_trip_restores_bytes(catalog):
+    store, models_dir, files = catalog
+    originals = {name: (models_dir / name).read_bytes() for name in files if (models_dir / name).exists()}
+    first = store.commit(models_dir, files)
+    # 以 get_model.py 相同的格式写出后提交的版本也应逐字节还原
+    models = read_models(models_dir, QWEN_FILE)
+    models[0]["file_size"] = "1.0GB"
+    write_models(models_dir, QWEN_FILE, models)
+    (models_dir / LLAMA_FILE).unlink()
+    second = store.commit(models_dir, files)
+    modified = (models_dir / QWEN_FILE).read_bytes()
+
+    touched = store.checkout(first, models_dir)
+    assert sorted(touched) == sorted([QWEN_FILE, LLAMA_FILE])
+    assert store.head() == first
+    assert {name: (models_dir / name).read_bytes() for name in originals} == originals
+
+    # 回滚不删除历史，可以回到较新的快照
+    assert store.checkout(store.resolve(second[:10]), models_dir) == sorted([QWEN_FILE, LLAMA_FILE])
+    assert (models_dir / QWEN_FILE).read_bytes() == modified
+    assert not (models_dir / LLAMA_FILE).exists()
+    assert len(store.history()) == 2
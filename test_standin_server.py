@@ -0,0 +1,77 @@
+"""
+替身服务与抓取基准测试工具的测试：Range 请求、fixtures 路由、错误注入和基准结果比较。
+全部请求只访问 127.0.0.1 上的替身服务
+"""
+import pytest
+import requests
+
+from bench_scraper import _load_pages, bench_end_to_end, compare_results, synthesize_fixtures
+from conftest import MODELS_DIR, load_config
+from standin_server import StandinServer, add_fixture_routes, parse_byte_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=1000-", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+
+def test_range_requests(server):
+    server.add_route("/blob", bytes(range(256)), content_type="application/octet-stream")
+
+    response = requests.get(f"{server.base_url}/blob", headers={"Range": "bytes=16-31"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 16-31/256"
+    assert response.content == bytes(range(16, 32))
+
+    assert requests.get(f"{server.base_url}/blob", headers={"Range": "bytes=300-"}).status_code == 416
+    assert requests.get(f"{server.base_url}/blob").content == bytes(range(256))
+    assert requests.get(f"{server.base_url}/missing").status_code == 404
+    assert server.requests == ["/blob"] * 3 + ["/missing"]
+
+
+def test_error_rate_injects_503():
+    with StandinServer(error_rate=1.0) as server:
+        server.add_route("/page", "ok")
+        assert requests.get(f"{server.base_url}/page").status_code == 503
+
+
+def test_synthesized_fixtures_are_served_by_path(server, tmp_path):
+    model_config = next(m for m in load_config()["models"] if m["name"] == "llama 3.2")
+    count = synthesize_fixtures({"models": [model_config]}, MODELS_DIR, tmp_path, filler_kb=1)
+    assert add_fixture_routes(server, tmp_path) == count
+
+    pages = _load_pages(tmp_path)
+    assert len(pages["main"]) == 1 and len(pages["tags"]) == 1
+    assert len(pages["detail"]) == count - 2
+    response = requests.get(model_config["tags_url"].replace("https://ollama.com", server.base_url))
+    assert response.status_code == 200
+    assert response.text == pages["tags"][0][1]
+
+
+def test_end_to_end_bench_reads_synthesized_pages(server, tmp_path):
+    model_config = next(m for m in load_config()["models"] if m["name"] == "llama 3.2")
+    count = synthesize_fixtures({"models": [model_config]}, MODELS_DIR, tmp_path, filler_kb=1)
+    add_fixture_routes(server, tmp_path)
+
+    results = bench_end_to_end(server, {"models": [model_config]}, None, "html.parser", {"max_retries": 0}, 4)
+    family = results[model_config["name"]]
+    # 主页面、tags 页面，加上每个 model_id 一个详情页
+    assert family["fetch_model_data"]["models"] == count - 2
+    assert 2 < family["fetch_model_data"]["requests"] <= count
+    assert set(family) == {"fetch_model_data", "fetch_and_parse_models"}
+
+
+def test_compare_results_flags_regressions():
+    baseline = {"throughput": {"pages_per_second": 100.0}, "parsers": {"lxml": {"detail": {"mean_ms": 2.0, "count": 5}}}}
+    current = {"throughput": {"pages_per_second": 70.0}, "parsers": {"lxml": {"detail": {"mean_ms": 2.1, "count": 9}}}}
+    rows = {name: regressed for name, _, _, _, regressed in compare_results(baseline, current, 0.1)}
+    assert rows == {"throughput.pages_per_second": True, "parsers.lxml.detail.mean_ms": False}
+
@@ -0,0 +1,31 @@
+"""VramEstimator 测试：向量化结果与网页计算器逐行移植的公式一致"""
+import numpy as np
+import pytest
+
+from conftest import MODELS_DIR, ROOT
+from model_records import Quantization, load_records
+from vram_estimator import WEB_MULTIPLIERS, VramEstimator, web_memory_gb
+
+
+@pytest.fixture(scope="module")
+def records():
+    return load_records(str(ROOT / "config.json"), str(MODELS_DIR))
+
+
+def test_web_multipliers_are_known_quantizations():
+    known = {quantization.value for quantization in Quantization}
+    assert set(WEB_MULTIPLIERS) <= known
+
+
+def test_vectorized_web_estimate_matches_row_by_row_port(records):
+    estimator = VramEstimator(records)
+    expected = [web_memory_gb(record.file_size_label, record.quantization.value) for record in records]
+    np.testing.assert_allclose(estimator.web_estimate(), expected)
+
+
+def test_estimate_shapes_and_monotonic_kv_cache(records):
+    estimate = VramEstimator(records).estimate(context_lengths=(2048, 8192), batch_sizes=(1, 4))
+    assert estimate["total"].shape == (len(records), 2, 2)
+    assert np.all(estimate["kv_cache"][:, 1, :] > estimate["kv_cache"][:, 0, :])
+    assert np.all(estimate["kv_cache"][:, :, 1] > estimate["kv_cache"][:, :, 0])
+    np.testing.assert_allclose(estimate["total"], estimate["weights"] + estimate["kv_cache"] + estimate["activation"])
@@ -0,0 +1,129 @@
+import argparse
+
+import numpy as np
+
+from vram_estimator import GB, VramEstimator
+
+# 常见 GPU 的显存、显存带宽（GB/s）和稠密 FP16 Tensor Core 峰值算力（TFLOPS）
+GPU_SPECS = {
+    "RTX3090": {"vram_gb": 24, "bandwidth_gbps": 936, "tflops": 71},
+    "RTX4060Ti-16G": {"vram_gb": 16, "bandwidth_gbps": 288, "tflops": 44},
+    "RTX4090": {"vram_gb": 24, "bandwidth_gbps": 1008, "tflops": 165},
+    "A10": {"vram_gb": 24, "bandwidth_gbps": 600, "tflops": 125},
+    "L4": {"vram_gb": 24, "bandwidth_gbps": 300, "tflops": 121},
+    "L40S": {"vram_gb": 48, "bandwidth_gbps": 864, "tflops": 362},
+    "A100-40G": {"vram_gb": 40, "bandwidth_gbps": 1555, "tflops": 312},
+    "A100-80G": {"vram_gb": 80, "bandwidth_gbps": 2039, "tflops": 312},
+    "H100-SXM": {"vram_gb": 80, "bandwidth_gbps": 3350, "tflops": 989},
+    "M2-Ultra": {"vram_gb": 192, "bandwidth_gbps": 800, "tflops": 27},
+}
+# 实际可达到的带宽和算力比例
+BANDWIDTH_EFFICIENCY = 0.8
+COMPUTE_EFFICIENCY = 0.5
+
+
+class ThroughputPredictor:
+    """
+    基于 roofline 模型的推理速度估算：每一步的耗时取访存时间（读取的字节数 / 带宽）
+    与计算时间（浮点运算数 / 算力）中较大的一个。
+      - decode：每步读取全部权重和当前 KV cache，计算量约为 2 * 参数量 * 批大小
+      - prefill：一次处理整个提示词，计算量为 2 * 参数量 * 提示词长度 * 批大小 加上注意力部分
+    所有结果都是形状 (模型数, 上下文数, 批大小数) 的数组
+    """
+
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+    @classmethod
+    def from_catalog(cls, config_path="config.json", models_dir=None):
+        return cls(VramEstimator.from_catalog(config_path, models_dir))
+
+    def predict(self, gpu, context_lengths=(2048,), batch_sizes=(1,), kv_cache_bits=16,
+                bandwidth_efficiency=BANDWIDTH_EFFICIENCY, compute_efficiency=COMPUTE_EFFICIENCY):
+        """
+        gpu 为 GPU_SPECS 中的名称或包含 bandwidth_gbps、tflops 的字典。返回字典：
+          - decode_tokens_per_second: 所有并发请求合计的生成速度
+          - prefill_tokens_per_second: 预填充速度
+          - ttft_seconds: 首 token 延迟（提示词长度等于上下文长度）
+          - memory_gb: VramEstimator 估算的显存
+          - decode_tokens_per_second_per_gb: 每 GB 显存的生成速度，用于比较候选模型
+        """
+        spec = GPU_SPECS[gpu] if isinstance(gpu, str) else gpu
+        bandwidth = spec["bandwidth_gbps"] * GB * bandwidth_efficiency
+        flops = spec["tflops"] * 1e12 * compute_efficiency
+
+        memory = self.estimator.estimate(context_lengths, batch_sizes, kv_cache_bits=kv_cache_bits)
+        contexts = np.asarray(context_lengths, dtype=np.float64).reshape(1, -1, 1)
+        batches = np.asarray(batch_sizes, dtype=np.float64).reshape(1, 1, -1)
+        parameters = self.estimator.parameters.reshape(-1, 1, 1)
+        layers = self.estimator.num_layers.reshape(-1, 1, 1)
+        hidden = self.estimator.hidden_size.reshape(-1, 1, 1)
+        weight_bytes = memory["weights"] * GB
+        kv_bytes = memory["kv_cache"] * GB
+
+        # decode：平均每步读取一半上下文长度的 KV cache
+        decode_bytes = weight_bytes + kv_bytes / 2
+        decode_flops = 2 * parameters * batches + 2 * layers * hidden * contexts * batches
+        decode_step = np.maximum(decode_bytes / bandwidth, decode_flops / flops)
+        decode_tokens_per_second = batches / decode_step
+
+        # prefill：权重只读一次，注意力计算量随提示词长度平方增长
+        prefill_flops = (2 * parameters * contexts * batches
+                         + 2 * layers * hidden * contexts * contexts * batches)
+        prefill_time = np.maximum((weight_bytes + kv_bytes) / bandwidth, prefill_flops / flops)
+
+        return {
+            "decode_tokens_per_second": decode_tokens_per_second,
+            "prefill_tokens_per_second": contexts * batches / prefill_time,
+            "ttft_seconds": prefill_time,
+            "memory_gb": memory["total"],
+            "decode_tokens_per_second_per_gb": decode_tokens_per_second / memory["total"],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按 roofline 模型估算模型在指定 GPU 上的推理速度")
+    parser.add_argument("--gpu", default="RTX4090", help=f"GPU 型号: {', '.join(GPU_SPECS)}")
+    parser.add_argument("--bandwidth", type=float, help="自定义显存带宽（GB/s），与 --tflops 一起使用")
+    parser.add_argument("--tflops", type=float, help="自定义 FP16 算力（TFLOPS）")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--context", type=int, default=4096)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--family", help="只显示指定名称的模型家族")
+    parser.add_argument("--fit", action="store_true", help="只显示显存能放进该 GPU 的模型")
+    parser.add_argument("--sort", choices=["decode", "per-gb", "ttft"], default="per-gb")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.bandwidth and args.tflops:
+        gpu = {"vram_gb": float("inf"), "bandwidth_gbps": args.bandwidth, "tflops": args.tflops}
+    elif args.gpu in GPU_SPECS:
+        gpu = GPU_SPECS[args.gpu]
+    else:
+        parser.error(f"未知的 GPU: {args.gpu}")
+
+    predictor = ThroughputPredictor.from_catalog(args.config, args.models_dir)
+    result = {key: value[:, 0, 0] for key, value in predictor.predict(gpu, [args.context], [args.batch]).items()}
+    records = predictor.estimator.records
+    candidates = [
+        i for i, record in enumerate(records)
+        if (not args.family or record.family == args.family)
+        and (not args.fit or result["memory_gb"][i] <= gpu["vram_gb"])
+        and not np.isnan(result["memory_gb"][i])
+    ]
+    sort_keys = {
+        "decode": lambda i: -result["decode_tokens_per_second"][i],
+        "per-gb": lambda i: -result["decode_tokens_per_second_per_gb"][i],
+        "ttft": lambda i: result["ttft_seconds"][i],
+    }
+    candidates.sort(key=sort_keys[args.sort])
+    print(f"{'模型':<48} {'显存(GB)':>9} {'生成(tok/s)':>12} {'tok/s/GB':>9} {'预填充(tok/s)':>14} {'TTFT(s)':>8}")
+    for i in candidates[:args.limit]:
+        print(f"{records[i].name:<48} {result['memory_gb'][i]:>9.2f} {result['decode_tokens_per_second'][i]:>12.1f} "
+              f"{result['decode_tokens_per_second_per_gb'][i]:>9.2f} {result['prefill_tokens_per_second'][i]:>14.0f} "
+              f"{result['ttft_seconds'][i]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import re
+import argparse
+
+import numpy as np
+
+from model_records import DEFAULT_ARCHITECTURES_PATH, load_architectures, load_records
+
+# 与网页计算器 calculateMemoryRequirement（llm-vram-calc-web/src/utils/memoryCalculator.ts）一致的量化倍数，
+# 未列出的量化（包括 F16）按 1.0 计算。键都是 Quantization 的取值：网页中的 Q6_K_M 分支
+# 在 ollama.com 上没有对应的量化，这里不列出
+WEB_MULTIPLIERS = {
+    "FP16": 2.0,
+    "Q8_0": 1.5,
+    "Q4_K_M": 1.2, "Q4_0": 1.2, "Q4_1": 1.2,
+    "Q5_K_M": 1.3, "Q5_0": 1.3, "Q5_1": 1.3,
+    "Q6_K": 1.4,
+    "Q2_K": 1.1,
+    "Q3_K_S": 1.15, "Q3_K_M": 1.15, "Q3_K_L": 1.15,
+}
+WEB_OVERHEAD = 1.1
+WEB_MIN_GB = 0.5
+WEB_SIZE_PATTERN = re.compile(r"(\d+\.?\d*)\s*(GB|TB)", re.IGNORECASE)
+
+GB = 1000 ** 3
+
+# 没有架构信息时按参数量估算 Transformer 结构：参数量约为 12 * 层数 * hidden^2，
+# 常见模型的 hidden / 层数约为 128
+HIDDEN_PER_LAYER = 128
+# KV 头数占注意力头数的比例（分组查询注意力，Qwen2.5 / Llama 3 约为 1/4 到 1/8）
+DEFAULT_KV_HEAD_RATIO = 0.25
+# 推理时每个 token 的激活缓冲约为 hidden 的若干倍（FP32 中间结果），按预填充分块长度计算
+ACTIVATION_BYTES_PER_HIDDEN = 16
+DEFAULT_PREFILL_CHUNK = 512
+
+
+def web_size_gb(file_size_label):
+    """网页计算器读取的文件大小（GB，TB 按 1024 换算），无法解析时为 NaN"""
+    size_match = WEB_SIZE_PATTERN.search(file_size_label or "")
+    if not size_match:
+        return np.nan
+    size = float(size_match.group(1))
+    if size_match.group(2).upper() == "TB":
+        size *= 1024
+    return size
+
+
+def web_memory_gb(file_size, quantization):
+    """网页计算器 calculateMemoryRequirement 的逐行移植，用于校验向量化结果"""
+    size_match = WEB_SIZE_PATTERN.search(file_size or "")
+    if not size_match:
+        return WEB_MIN_GB
+    size = float(size_match.group(1))
+    if size_match.group(2).upper() == "TB":
+        size *= 1024
+    memory_required = size * WEB_MULTIPLIERS.get((quantization or "").upper(), 1.0)
+    memory_required *= WEB_OVERHEAD
+    return max(memory_required, WEB_MIN_GB)
+
+
+class VramEstimator:
+    """
+    对整个模型目录批量估算显存。构造时把 ModelRecord 列表转换为 NumPy 列（文件大小、参数量、每权重位数、
+    网页计算器的量化倍数等），estimate() 一次性计算所有模型 × 上下文长度 × 批大小组合的
+    权重、KV cache 和激活显存，结果为形状 (模型数, 上下文数, 批大小数) 的数组（单位 GB）。
+    architectures 为 gguf_reader.py 读取的 {model_id: 架构字段}，有记录的模型使用 GGUF 中的真实结构
+    """
+
+    def __init__(self, records, architectures=None):
+        self.records = records
+        self.families = [record.family for record in records]
+        self.names = [record.name for record in records]
+        self.web_size_gb = np.array([web_size_gb(record.file_size_label) for record in records], dtype=np.float64)
+        self.web_multiplier = np.array(
+            [WEB_MULTIPLIERS.get(record.quantization.value, 1.0) for record in records], dtype=np.float64
+        )
+        self.file_size_bytes = np.array(
+            [np.nan if record.file_size is None else record.file_size for record in records], dtype=np.float64
+        )
+        self.bits_per_weight = np.array([record.quantization.bits_per_weight for record in records], dtype=np.float64)
+        self.parameters = np.array(
+            [np.nan if record.parameters is None else record.parameters for record in records], dtype=np.float64
+        )
+        model_ids = sorted({record.model_id for record in records})
+        lookup = {model_id: i for i, model_id in enumerate(model_ids)}
+        self._derive_structure(np.array([lookup[record.model_id] for record in records], dtype=np.int64),
+                               model_ids, architectures)
+
+    @classmethod
+    def from_compiled(cls, catalog, architectures=None):
+        """
+        直接从 CompiledCatalog 的列创建估算器，不生成 ModelRecord：数值列按列转换，
+        字符串列只解码不同的值（文件大小标签、model_id 等）。records 为 None
+        """
+        estimator = cls.__new__(cls)
+        estimator.records = None
+        family_codes, families = catalog.codes("family")
+        estimator.families = [families[code] for code in family_codes.tolist()]
+        estimator.names = catalog.column("name")
+        label_codes, labels = catalog.codes("file_size_label")
+        estimator.web_size_gb = np.array([web_size_gb(label) for label in labels], dtype=np.float64)[label_codes]
+        quantization_ids = catalog.columns["quantization"]
+        estimator.web_multiplier = np.array(
+            [WEB_MULTIPLIERS.get(quantization.value, 1.0) for quantization in catalog.quantizations], dtype=np.float64
+        )[quantization_ids]
+        estimator.bits_per_weight = np.array(
+            [quantization.bits_per_weight for quantization in catalog.quantizations], dtype=np.float64
+        )[quantization_ids]
+        file_size = catalog.columns["file_size"]
+        estimator.file_size_bytes = np.where(file_size < 0, np.nan, file_size.astype(np.float64))
+        estimator.parameters = catalog.columns["parameters"].astype(np.float64)
+        estimator._derive_structure(*catalog.codes("model_id"), architectures)
+        return estimator
+
+    def _derive_structure(self, model_id_codes, model_ids, architectures):
+        """补全参数量并推算模型结构，model_id_codes[i] 为第 i 行的 model_id 在 model_ids 中的下标"""
+        # 详情页没有参数量时按文件大小和每权重位数反推
+        missing = np.isnan(self.parameters)
+        self.parameters[missing] = self.file_size_bytes[missing] * 8 / self.bits_per_weight[missing]
+
+        # 按参数量估算的模型结构；kv_width 为每层每个 token 的 K（或 V）元素数，
+        # 没有 GGUF 元数据时为 NaN，估算时按 hidden * kv_head_ratio 计算
+        self.hidden_size = np.cbrt(self.parameters * HIDDEN_PER_LAYER / 12)
+        self.num_layers = np.maximum(1.0, np.round(self.hidden_size / HIDDEN_PER_LAYER))
+        self.kv_width = np.full(len(model_id_codes), np.nan)
+        self.max_context = np.full(len(model_id_codes), np.nan)
+        self.gguf_count = 0
+        for code, model_id in enumerate(model_ids):
+            fields = (architectures or {}).get(model_id)
+            if not fields:
+                continue
+            rows = model_id_codes == code
+            self.hidden_size[rows] = fields["hidden_size"]
+            self.num_layers[rows] = fields["num_layers"]
+            self.kv_width[rows] = fields["kv_values_per_token"] / (2 * fields["num_layers"])
+            self.max_context[rows] = fields["context_length"]
+            self.gguf_count += int(rows.sum())
+
+    @classmethod
+    def from_catalog(cls, config_path="config.json", models_dir=None, architectures_path=DEFAULT_ARCHITECTURES_PATH):
+        """从 config.json 与模型 JSON 目录创建估算器，数据只读取一次；architectures_path 存在时使用其中的 GGUF 结构"""
+        return cls(load_records(config_path, models_dir), load_architectures(architectures_path))
+
+    def __len__(self):
+        return len(self.names)
+
+    def web_estimate(self):
+        """与网页计算器默认模式一致的显存需求（GB），只依赖文件大小和量化"""
+        memory_required = self.web_size_gb * self.web_multiplier * WEB_OVERHEAD
+        return np.where(np.isnan(memory_required), WEB_MIN_GB, np.maximum(memory_required, WEB_MIN_GB))
+
+    def estimate(self, context_lengths=(2048,), batch_sizes=(1,), kv_cache_bits=16,
+                 kv_head_ratio=DEFAULT_KV_HEAD_RATIO, prefill_chunk=DEFAULT_PREFILL_CHUNK):
+        """
+        批量估算显存，返回字典：
+          - weights: 权重显存，等于模型文件大小，形状 (模型数, 1, 1)
+          - kv_cache: 2 * 层数 * KV 维度 * 上下文长度 * 批大小 * kv_cache_bits / 8，
+            KV 维度优先使用 GGUF 中的 head_count_kv * head_dim，否则为 hidden * kv_head_ratio
+          - activation: 预填充分块的激活缓冲，随批大小线性增长
+          - total: 三者之和
+          - web: 网页计算器默认模式的结果，形状 (模型数, 1, 1)
+        各项均为 GB（10^9 字节），可以直接按广播规则与显存预算比较
+        """
+        contexts = np.asarray(context_lengths, dtype=np.float64).reshape(1, -1, 1)
+        batches = np.asarray(batch_sizes, dtype=np.float64).reshape(1, 1, -1)
+        layers = self.num_layers.reshape(-1, 1, 1)
+        hidden = self.hidden_size.reshape(-1, 1, 1)
+        kv_width = np.where(np.isnan(self.kv_width), self.hidden_size * kv_head_ratio, self.kv_width).reshape(-1, 1, 1)
+
+        weights = (self.file_size_bytes / GB).reshape(-1, 1, 1)
+        kv_cache = 2 * layers * kv_width * contexts * batches * (kv_cache_bits / 8) / GB
+        activation = batches * np.minimum(contexts, prefill_chunk) * hidden * ACTIVATION_BYTES_PER_HIDDEN / GB
+        return {
+            "weights": weights,
+            "kv_cache": kv_cache,
+            "activation": activation,
+            "total": weights + kv_cache + activation,
+            "web": self.web_estimate().reshape(-1, 1, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量估算模型目录的显存需求")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--context", type=int, nargs="+", default=[2048], help="上下文长度，可指定多个")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1], help="批大小，可指定多个")
+    parser.add_argument("--kv-bits", type=int, default=16, help="KV cache 每个元素的位数")
+    parser.add_argument("--family", help="只显示指定名称的模型家族")
+    parser.add_argument("--architectures", default=DEFAULT_ARCHITECTURES_PATH,
+                        help="gguf_reader.py 生成的架构字段文件，存在时使用 GGUF 中的模型结构")
+    args = parser.parse_args()
+
+    estimator = VramEstimator.from_catalog(args.config, args.models_dir, args.architectures)
+    result = estimator.estimate(args.context, args.batch, kv_cache_bits=args.kv_bits)
+    print(f"{len(estimator)} 个模型 × {len(args.context)} 个上下文长度 × {len(args.batch)} 个批大小")
+    if estimator.gguf_count:
+        print(f"其中 {estimator.gguf_count} 个模型使用 GGUF 元数据中的结构")
+    print(f"{'模型':<48} {'网页(GB)':>9} {'权重':>8} {'上下文':>8} {'批':>4} {'KV':>8} {'激活':>8} {'合计':>8}")
+    for i, name in enumerate(estimator.names):
+        if args.family and estimator.families[i] != args.family:
+            continue
+        for j, context in enumerate(args.context):
+            for k, batch in enumerate(args.batch):
+                print(f"{name:<48} {result['web'][i, 0, 0]:>9.2f} {result['weights'][i, 0, 0]:>8.2f} "
+                      f"{context:>8} {batch:>4} {result['kv_cache'][i, j, k]:>8.2f} "
+                      f"{result['activation'][i, j, k]:>8.2f} {result['total'][i, j, k]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
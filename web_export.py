@@ -0,0 +1,184 @@
+import os
+import gzip
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只生成 gzip 版本
+    brotli = None
+
+from catalog_compiler import source_hash
+from model_records import load_catalog, records_from_catalog
+from vram_estimator import WEB_MIN_GB, WEB_MULTIPLIERS, WEB_OVERHEAD, VramEstimator
+
+DEFAULT_EXPORT_DIR = "llm-vram-calc-web/public/modeldata/bundle"
+# 网页中访问导出目录的路径（相对于 PUBLIC_URL）
+DEFAULT_PUBLIC_PATH = "modeldata/bundle"
+MANIFEST_NAME = "manifest.json"
+# 文件名中内容哈希的长度（十六进制字符数）
+HASH_LENGTH = 10
+# 网页计算器表格使用的字段，其余字段不导出
+EXPORT_FIELDS = (
+    "model", "url", "is_default", "model_id", "file_size", "arch",
+    "parameters", "quantization", "quantization_info",
+)
+# manifest 中保留的模型家族配置字段
+FAMILY_FIELDS = ("name", "key", "version", "description", "description_en")
+# 预先计算的显存保留的小数位数
+VRAM_DECIMALS = 3
+
+
+def minify(data):
+    """紧凑的 UTF-8 JSON（无缩进、无多余空格）"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_name(stem, data):
+    """按内容生成不可变文件名，例如 qwen_2.5_models.3f2a9c01be.json"""
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.json"
+
+
+def compressed_variants(data):
+    """返回 {扩展名: 压缩后的内容}；gzip 固定 mtime 以保证同样的输入得到同样的输出"""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_with_variants(output_dir, name, data, compress=False):
+    """
+    写出文件，compress 为 True 时同时写出压缩版本；返回 {"bytes", "gzip_bytes", "brotli_bytes"}
+    （压缩后的字节数总是计算，用于估算传输大小）。同名文件已存在时不再重写
+    """
+    sizes = {"bytes": len(data)}
+    for suffix, compressed in compressed_variants(data).items():
+        path = output_dir / f"{name}{suffix}"
+        if compress and (not path.exists() or name == MANIFEST_NAME):
+            _write_atomic(path, compressed)
+        sizes["gzip_bytes" if suffix == ".gz" else "brotli_bytes"] = len(compressed)
+    path = output_dir / name
+    if not path.exists() or name == MANIFEST_NAME:
+        _write_atomic(path, data)
+    return sizes
+
+
+def build_shards(catalog):
+    """
+    把 load_catalog 的结果转换为每个模型家族一个分片：只保留网页使用的字段，
+    并加入与网页计算器 calculateMemoryRequirement 一致的显存 vram（GB），网页不必再逐行计算。
+    返回 [(模型家族配置, 分片内容 bytes, 模型数)]
+    """
+    web_vram = VramEstimator(records_from_catalog(catalog)).web_estimate().tolist()
+    shards = []
+    offset = 0
+    for model_config, models in catalog:
+        rows = []
+        for model, vram in zip(models, web_vram[offset:offset + len(models)]):
+            row = {field: model[field] for field in EXPORT_FIELDS if field in model}
+            row["vram"] = round(vram, VRAM_DECIMALS)
+            rows.append(row)
+        offset += len(models)
+        shards.append((model_config, minify(rows), len(rows)))
+    return shards
+
+
+def export_bundle(config_path="config.json", models_dir=None, output_dir=DEFAULT_EXPORT_DIR,
+                  public_path=DEFAULT_PUBLIC_PATH, prune=True, compress=False):
+    """
+    导出网页计算器使用的数据包：每个模型家族一个按内容哈希命名的紧凑 JSON 分片，
+    以及列出分片的 manifest.json。manifest 兼容网页原有的 config.json 结构（output_dirs.dirs +
+    models[].output_file），每个模型家族额外记录模型数和各编码的字节数。
+    compress 为 True 时为每个文件附带 .gz / .br 预压缩版本，只有能按 Accept-Encoding 直接返回这些文件的
+    服务器（例如 nginx gzip_static / brotli_static）才会用到；GitHub Pages 等静态托管不会使用它们。
+    prune 为 True 时删除当前和上一版 manifest 都不再引用的分片，旧页面在部署期间仍能读取上一版数据。
+    返回 manifest 内容
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    catalog = load_catalog(config_path, models_dir)
+    families = []
+    for model_config, data, count in build_shards(catalog):
+        name = content_name(Path(model_config["output_file"]).stem, data)
+        family = {field: model_config[field] for field in FAMILY_FIELDS if field in model_config}
+        family["output_file"] = name
+        family["models"] = count
+        family.update(_write_with_variants(output_dir, name, data, compress))
+        families.append(family)
+
+    manifest = {
+        "version": 1,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source_hash": source_hash(config_path, models_dir).hex(),
+        "encodings": (["gzip"] + (["br"] if brotli is not None else [])) if compress else [],
+        "estimate": {
+            "field": "vram",
+            "method": "calculateMemoryRequirement",
+            "multipliers": WEB_MULTIPLIERS,
+            "overhead": WEB_OVERHEAD,
+            "min_gb": WEB_MIN_GB,
+        },
+        "output_dirs": {"dirs": public_path},
+        "models": families,
+    }
+    _write_with_variants(output_dir, MANIFEST_NAME, minify(manifest), compress)
+
+    if prune:
+        keep = {MANIFEST_NAME}
+        for family in families + previous.get("models", []):
+            keep.add(family["output_file"])
+        for path in output_dir.iterdir():
+            base = path.name.removesuffix(".gz").removesuffix(".br")
+            stale_variant = not compress and base != path.name
+            if path.is_file() and base.endswith(".json") and (base not in keep or stale_variant):
+                path.unlink()
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出网页计算器使用的数据包")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--models-dir", help="模型 JSON 目录，默认使用 config.json 中的 output_dirs.cleaned")
+    parser.add_argument("--output", default=DEFAULT_EXPORT_DIR, help="输出目录")
+    parser.add_argument("--public-path", default=DEFAULT_PUBLIC_PATH, help="网页中访问输出目录的路径（相对于 PUBLIC_URL）")
+    parser.add_argument("--no-prune", action="store_true", help="不删除不再引用的旧分片")
+    parser.add_argument(
+        "--compress", action="store_true",
+        help="同时写出 .gz / .br 预压缩版本（需要服务器按 Accept-Encoding 直接返回，GitHub Pages 不支持）"
+    )
+    args = parser.parse_args()
+
+    manifest = export_bundle(args.config, args.models_dir, args.output, args.public_path,
+                             prune=not args.no_prune, compress=args.compress)
+    if args.compress and brotli is None:
+        print("未安装 brotli（pip install brotli），只生成 gzip 版本")
+    print(f"{'分片':<40} {'模型数':>6} {'JSON':>9} {'gzip':>9} {'brotli':>9}")
+    totals = {"bytes": 0, "gzip_bytes": 0, "brotli_bytes": 0}
+    for family in manifest["models"]:
+        print(f"{family['output_file']:<40} {family['models']:>6} {family['bytes']:>9} {family['gzip_bytes']:>9} "
+              f"{family.get('brotli_bytes', '-'):>9}")
+        for key in totals:
+            totals[key] += family.get(key, 0)
+    print(f"{'合计':<40} {'':>6} {totals['bytes']:>9} {totals['gzip_bytes']:>9} {totals['brotli_bytes'] or '-':>9}")
+    print(f"已写入 {Path(args.output) / MANIFEST_NAME}")
+
+
+if __name__ == "__main__":
+    main()